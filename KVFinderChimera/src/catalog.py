@@ -0,0 +1,278 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""SQLite catalog of cavity results across runs.
+
+Each run (a ``<base_name>.KVFinder.results.toml`` and the
+``parameters.toml`` next to it) becomes one row of ``runs``, one row of
+``cavities`` per cavity and one row of ``residues`` per lining residue.
+Cavities are indexed by their descriptors and residues by
+(resname, chain, cavity), so a query such as "volume > 500 lined by HIS
+in chain A" is answered from the indexes without reading the results
+files. Like `pipeline`, this module has no ChimeraX or Qt dependency.
+"""
+
+import os
+import sqlite3
+
+import toml
+
+from .results_io import read_results
+
+COLUMNS = ["base_name", "input", "cavity", "volume", "area", "max_depth", "avg_depth", "avg_hydropathy"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    results_file TEXT UNIQUE NOT NULL,
+    mtime REAL,
+    base_name TEXT,
+    input TEXT,
+    ligand TEXT,
+    output TEXT,
+    step REAL,
+    probe_in REAL,
+    probe_out REAL,
+    removal_distance REAL,
+    volume_cutoff REAL,
+    ligand_cutoff REAL,
+    surface TEXT,
+    box_mode INTEGER,
+    ligand_mode INTEGER
+);
+CREATE TABLE IF NOT EXISTS cavities (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    volume REAL,
+    area REAL,
+    max_depth REAL,
+    avg_depth REAL,
+    avg_hydropathy REAL
+);
+CREATE TABLE IF NOT EXISTS residues (
+    cavity_id INTEGER NOT NULL REFERENCES cavities(id) ON DELETE CASCADE,
+    resnum TEXT,
+    chain TEXT,
+    resname TEXT
+);
+CREATE INDEX IF NOT EXISTS cavities_run ON cavities(run_id);
+CREATE INDEX IF NOT EXISTS cavities_volume ON cavities(volume);
+CREATE INDEX IF NOT EXISTS cavities_area ON cavities(area);
+CREATE INDEX IF NOT EXISTS cavities_max_depth ON cavities(max_depth);
+CREATE INDEX IF NOT EXISTS cavities_avg_hydropathy ON cavities(avg_hydropathy);
+CREATE INDEX IF NOT EXISTS residues_lookup ON residues(resname, chain, cavity_id);
+CREATE INDEX IF NOT EXISTS residues_cavity ON residues(cavity_id);
+"""
+
+
+def read_parameters(fn):
+    """Detection parameters from a ``parameters.toml`` file.
+
+    Returns
+    -------
+    dict
+        The parameters with the column names of ``runs``; empty when the
+        file does not exist.
+    """
+    if not os.path.exists(fn):
+        return {}
+    settings = toml.load(fn).get("SETTINGS", {})
+    modes = settings.get("modes", {})
+    probes = settings.get("probes", {})
+    cutoffs = settings.get("cutoffs", {})
+    return {
+        "step": settings.get("step_size", {}).get("step_size"),
+        "probe_in": probes.get("probe_in"),
+        "probe_out": probes.get("probe_out"),
+        "removal_distance": cutoffs.get("removal_distance"),
+        "volume_cutoff": cutoffs.get("volume_cutoff"),
+        "ligand_cutoff": cutoffs.get("ligand_cutoff"),
+        "surface": "SES" if modes.get("surface_mode", True) else "SAS",
+        "box_mode": int(modes.get("box_mode", False)),
+        "ligand_mode": int(modes.get("ligand_mode", False)),
+    }
+
+
+class Catalog(object):
+    """Indexed SQLite database of cavity results.
+
+    Parameters
+    ----------
+    fn : str
+        Path of the database, created when missing; usually
+        ``KV_Files/catalog.sqlite``.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.connection = sqlite3.connect(fn)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM cavities").fetchone()[0]
+
+    def ingest(self, results_file, parameters_file=None):
+        """Add a results file to the catalog, replacing an earlier ingestion of it.
+
+        Parameters
+        ----------
+        results_file : str
+            Path of a ``.KVFinder.results.toml`` file, or of its binary
+            ``.npz`` copy (see `results_io`).
+        parameters_file : str, optional
+            Path of the ``parameters.toml`` of the run. Defaults to the one
+            in the directory of the results file, if any.
+
+        Returns
+        -------
+        int
+            Number of cavities added.
+        """
+        results_file = os.path.abspath(results_file)
+        if parameters_file is None:
+            parameters_file = os.path.join(os.path.dirname(results_file), "parameters.toml")
+        # The binary copy of the results is much faster to read
+        binary = results_file[:-len(".toml")] + ".npz" if results_file.endswith(".toml") else None
+        if binary and os.path.exists(binary) and os.path.getmtime(binary) >= os.path.getmtime(results_file):
+            data = read_results(binary)
+        else:
+            data = read_results(results_file)
+        files = data.get("FILES", data.get("FILES_PATH", {}))
+        results = data.get("RESULTS", {})
+        parameters = read_parameters(parameters_file)
+        if data.get("PARAMETERS", {}).get("STEP") is not None:
+            parameters["step"] = data["PARAMETERS"]["STEP"]
+
+        run = {
+            "results_file": results_file,
+            "mtime": os.path.getmtime(results_file),
+            "base_name": os.path.basename(results_file).split(".KVFinder.results")[0],
+            "input": files.get("INPUT"),
+            "ligand": files.get("LIGAND"),
+            "output": files.get("OUTPUT"),
+            **parameters,
+        }
+        volume = results.get("VOLUME", {})
+        descriptors = [results.get(key, {}) for key in ("AREA", "MAX_DEPTH", "AVG_DEPTH", "AVG_HYDROPATHY")]
+        residues = results.get("RESIDUES", {})
+
+        with self.connection:
+            self.connection.execute("DELETE FROM runs WHERE results_file = ?", (results_file,))
+            columns = ", ".join(run)
+            run_id = self.connection.execute(
+                f"INSERT INTO runs ({columns}) VALUES ({', '.join('?' * len(run))})", tuple(run.values())
+            ).lastrowid
+            for name in sorted(volume):
+                cavity_id = self.connection.execute(
+                    "INSERT INTO cavities (run_id, name, volume, area, max_depth, avg_depth, avg_hydropathy) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, name, volume[name], *(descriptor.get(name) for descriptor in descriptors)),
+                ).lastrowid
+                self.connection.executemany(
+                    "INSERT INTO residues (cavity_id, resnum, chain, resname) VALUES (?, ?, ?, ?)",
+                    ((cavity_id, str(resnum), chain, resname) for resnum, chain, resname, *_ in residues.get(name, [])),
+                )
+        return len(volume)
+
+    def scan(self, directory):
+        """Ingest every results file under a directory that is new or changed since it was ingested.
+
+        Returns
+        -------
+        int
+            Number of results files ingested.
+        """
+        known = dict(self.connection.execute("SELECT results_file, mtime FROM runs"))
+        count = 0
+        for root, _, files in os.walk(directory):
+            for fn in files:
+                if not fn.endswith(".KVFinder.results.toml"):
+                    continue
+                path = os.path.abspath(os.path.join(root, fn))
+                if known.get(path) != os.path.getmtime(path):
+                    self.ingest(path)
+                    count += 1
+        return count
+
+    def remove(self, results_file):
+        """Remove a results file and its cavities from the catalog."""
+        with self.connection:
+            self.connection.execute("DELETE FROM runs WHERE results_file = ?", (os.path.abspath(results_file),))
+
+    def query(self, min_volume=None, max_volume=None, min_area=None, min_depth=None, max_hydropathy=None, resname=None, chain=None, base_name=None, limit=None):
+        """Find cavities by descriptors and lining residues.
+
+        Parameters
+        ----------
+        min_volume, max_volume : float, optional
+            Volume range (A^3).
+        min_area : float, optional
+            Smallest area (A^2).
+        min_depth : float, optional
+            Smallest maximum depth (A).
+        max_hydropathy : float, optional
+            Largest average hydropathy.
+        resname : str, optional
+            Residue name that must line the cavity, e.g. ``"HIS"``.
+        chain : str, optional
+            Chain of that residue, or of any lining residue when ``resname``
+            is not given.
+        base_name : str, optional
+            Only cavities of runs with this base name.
+        limit : int, optional
+            Largest number of cavities returned.
+
+        Returns
+        -------
+        list
+            One dictionary per cavity with the `COLUMNS` keys, largest
+            volume first.
+        """
+        conditions, values = [], []
+        for column, operator, value in (
+            ("c.volume", ">=", min_volume),
+            ("c.volume", "<=", max_volume),
+            ("c.area", ">=", min_area),
+            ("c.max_depth", ">=", min_depth),
+            ("c.avg_hydropathy", "<=", max_hydropathy),
+            ("r.base_name", "=", base_name),
+        ):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                values.append(value)
+        if resname or chain:
+            lining = [f"{column} = ?" for column, value in (("resname", resname), ("chain", chain)) if value]
+            conditions.append(f"c.id IN (SELECT cavity_id FROM residues WHERE {' AND '.join(lining)})")
+            values.extend(value for value in (resname, chain) if value)
+
+        sql = (
+            "SELECT r.base_name, r.input, c.name AS cavity, c.volume, c.area, c.max_depth, c.avg_depth, c.avg_hydropathy"
+            " FROM cavities c JOIN runs r ON r.id = c.run_id"
+        )
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY c.volume DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(int(limit))
+        return [dict(row) for row in self.connection.execute(sql, values)]
+
+    def residues(self, results_file, cavity):
+        """Lining residues of a cavity of a run as ``[resnum, chain, resname]`` lists."""
+        rows = self.connection.execute(
+            "SELECT s.resnum, s.chain, s.resname FROM residues s JOIN cavities c ON c.id = s.cavity_id"
+            " JOIN runs r ON r.id = c.run_id WHERE r.results_file = ? AND c.name = ? ORDER BY s.rowid",
+            (os.path.abspath(results_file), cavity),
+        )
+        return [list(row) for row in rows]
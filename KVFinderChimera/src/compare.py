@@ -0,0 +1,188 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Cavity comparison of two structures on a shared grid.
+
+Both structures (apo/holo, mutant/wild-type, two conformations) are
+detected on the same grid, so their cavity points can be compared point by
+point: points in cavities of both structures are shared, points only in the
+first are lost and points only in the second are gained. Grids are compared
+through the sorted linear indices of their cavity points, so dense grids and
+`sparse.SparseCavities` give the same result, and per-cavity overlaps come
+from one `numpy.bincount` over the label pairs of the shared points. The
+structures must already be superposed, for instance with ``matchmaker``.
+Like `pipeline`, this module has no ChimeraX or Qt dependency.
+"""
+
+import csv
+
+import numpy as np
+import pyKVFinder
+
+from .pipeline import cavity_name
+from .sparse import SparseCavities
+
+COLUMNS = ["structure", "cavity", "volume", "shared_volume", "match", "jaccard", "volume_delta"]
+
+# Labels of the difference grid; exported as cavities KAA, KAB and KAC
+SHARED, LOST, GAINED = 2, 3, 4
+
+
+def _cavity_points(cavities):
+    """Sorted linear indices and labels of the cavity points of a dense or sparse grid."""
+    if isinstance(cavities, SparseCavities):
+        return cavities.cavity_points()
+    index = np.flatnonzero(cavities >= 2)
+    return index, cavities.ravel()[index]
+
+
+def _overlap(cavities_a, cavities_b):
+    """Cavity points of two grids and the positions of their shared points in each."""
+    if cavities_a.shape != cavities_b.shape:
+        raise ValueError(f"Cavity grids differ in shape: {cavities_a.shape} and {cavities_b.shape}")
+    index_a, labels_a = _cavity_points(cavities_a)
+    index_b, labels_b = _cavity_points(cavities_b)
+    _, shared_a, shared_b = np.intersect1d(index_a, index_b, assume_unique=True, return_indices=True)
+    return (index_a, labels_a, shared_a), (index_b, labels_b, shared_b)
+
+
+def difference(cavities_a, cavities_b):
+    """Label the cavity points of two grids by where they are found.
+
+    Parameters
+    ----------
+    cavities_a, cavities_b : numpy.ndarray or SparseCavities
+        Cavity grids of the first and second structure, with the same shape.
+
+    Returns
+    -------
+    SparseCavities
+        Points labelled like `pyKVFinder.detect` on an empty (0) background,
+        with `SHARED` points in cavities of both structures, `LOST` points
+        only in cavities of the first and `GAINED` points only in cavities
+        of the second.
+    """
+    (index_a, _, shared_a), (index_b, _, shared_b) = _overlap(cavities_a, cavities_b)
+    status_a = np.full(len(index_a), LOST, dtype=np.int32)
+    status_a[shared_a] = SHARED
+    gained = np.ones(len(index_b), dtype=bool)
+    gained[shared_b] = False
+    index = np.concatenate([index_a, index_b[gained]])
+    labels = np.concatenate([status_a, np.full(np.count_nonzero(gained), GAINED, dtype=np.int32)])
+    order = np.argsort(index, kind="stable")
+    return SparseCavities.from_points(cavities_a.shape, index[order], labels[order], background=0)
+
+
+def difference_grid(cavities_a, cavities_b):
+    """Dense grid of `difference`, with the shape of the cavity grids."""
+    return difference(cavities_a, cavities_b).to_dense()
+
+
+def compare_cavities(cavities_a, cavities_b, step):
+    """Compare the cavities of two structures detected on the same grid.
+
+    Parameters
+    ----------
+    cavities_a, cavities_b : numpy.ndarray or SparseCavities
+        Cavity grids of the first and second structure, with the same shape.
+    step : float
+        Grid spacing (A).
+
+    Returns
+    -------
+    summary : dict
+        Number of cavities of each structure (``ncavs_a``, ``ncavs_b``) and
+        shared, lost and gained volumes (A^3) over all cavities.
+    rows : list
+        One dictionary per cavity of either structure with the `COLUMNS`
+        keys: its volume, the volume it shares with cavities of the other
+        structure, the best matching cavity there with their Jaccard index,
+        and the volume change from the first to the second structure (minus
+        its volume for a lost cavity, its volume for a gained one).
+    """
+    voxel = step ** 3
+    (index_a, labels_a, shared_a), (index_b, labels_b, shared_b) = _overlap(cavities_a, cavities_b)
+    na = max(int(labels_a.max(initial=1)) - 1, 0)
+    nb = max(int(labels_b.max(initial=1)) - 1, 0)
+    sizes_a = np.bincount(labels_a - 2, minlength=na)
+    sizes_b = np.bincount(labels_b - 2, minlength=nb)
+
+    # Shared points of every (cavity of A, cavity of B) pair
+    keys = (labels_a[shared_a] - 2).astype(np.int64) * nb + (labels_b[shared_b] - 2)
+    pairs = np.bincount(keys, minlength=na * nb).reshape(na, nb)
+    union = sizes_a[:, None] + sizes_b[None, :] - pairs
+    jaccard = np.divide(pairs, union, out=np.zeros(pairs.shape), where=union > 0)
+
+    shared = len(shared_a)
+    summary = {
+        "ncavs_a": int(np.count_nonzero(sizes_a)),
+        "ncavs_b": int(np.count_nonzero(sizes_b)),
+        "shared_volume": round(float(shared * voxel), 2),
+        "lost_volume": round(float((len(index_a) - shared) * voxel), 2),
+        "gained_volume": round(float((len(index_b) - shared) * voxel), 2),
+    }
+
+    def cavity_rows(structure, sizes, shared, jaccard, other_sizes, sign):
+        rows = []
+        for i, size in enumerate(sizes):
+            if size == 0:
+                continue
+            best = int(np.argmax(jaccard[i])) if jaccard.shape[1] and jaccard[i].max() > 0 else None
+            delta = -size * voxel if best is None else (other_sizes[best] - size) * voxel
+            rows.append({
+                "structure": structure,
+                "cavity": cavity_name(i),
+                "volume": round(float(size * voxel), 2),
+                "shared_volume": round(float(shared[i] * voxel), 2),
+                "match": "" if best is None else cavity_name(best),
+                "jaccard": 0.0 if best is None else round(float(jaccard[i, best]), 3),
+                "volume_delta": round(float(sign * delta), 2),
+            })
+        return rows
+
+    # Deltas are second minus first structure for both sides of a match
+    rows = cavity_rows("A", sizes_a, pairs.sum(axis=1), jaccard, sizes_b, 1)
+    rows += cavity_rows("B", sizes_b, pairs.sum(axis=0), jaccard.T, sizes_a, -1)
+    return summary, rows
+
+
+def compare_structures(atomic_a, atomic_b, vertices, step=0.6, probe_in=1.4, probe_out=4.0, removal_distance=2.4, volume_cutoff=5.0, surface="SES", box_adjustment=False, nthreads=None):
+    """Detect the cavities of two superposed structures on one grid and compare them.
+
+    Parameters
+    ----------
+    atomic_a, atomic_b : numpy.ndarray
+        Atomic data of the first and second structure.
+    vertices : numpy.ndarray
+        Vertices of the shared grid; it must enclose the region of interest
+        of both structures (see `pipeline.vertices_from_coords`), or be the
+        box of `pyKVFinder.get_vertices_from_file` in box adjustment mode.
+    step, probe_in, probe_out, removal_distance, volume_cutoff, surface, box_adjustment, nthreads
+        Same as `pyKVFinder.detect`.
+
+    Returns
+    -------
+    cavities_a, cavities_b : SparseCavities
+        Cavity grids of both structures.
+    summary, rows
+        Same as `compare_cavities`.
+    """
+    grids = []
+    for atomic in (atomic_a, atomic_b):
+        _, cavities = pyKVFinder.detect(
+            atomic, vertices, step=step, probe_in=probe_in, probe_out=probe_out,
+            removal_distance=removal_distance, volume_cutoff=volume_cutoff, surface=surface,
+            box_adjustment=box_adjustment, nthreads=nthreads,
+        )
+        # Only the cavity points are kept, not the dense grid
+        grids.append(SparseCavities.from_dense(cavities, shell=False))
+        del cavities
+    summary, rows = compare_cavities(grids[0], grids[1], step)
+    return grids[0], grids[1], summary, rows
+
+
+def write_table(rows, fn):
+    """Write comparison rows to a CSV file."""
+    with open(fn, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
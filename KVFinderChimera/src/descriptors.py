@@ -0,0 +1,129 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Descriptor table of the Results tab.
+
+`DescriptorTable` keeps the descriptors of every cavity of a run as NumPy
+columns, so the results table sorts and filters thousands of cavities
+without a Python loop over them; only the rows on screen are formatted.
+Like `pipeline`, this module has no ChimeraX or Qt dependency.
+"""
+
+import re
+
+import numpy as np
+
+COLUMNS = ["cavity", "volume", "area", "avg_depth", "max_depth", "avg_hydropathy", "residues"]
+
+# Keys of the numeric columns in the RESULTS section of a results file
+_KEYS = ["VOLUME", "AREA", "AVG_DEPTH", "MAX_DEPTH", "AVG_HYDROPATHY"]
+
+# A filter term comparing a numeric column with a number, e.g. volume>500
+_CONDITION = re.compile(r"^({})(<=|>=|<|>|=)(-?\d*\.?\d+)$".format("|".join(COLUMNS[1:])))
+
+_OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "=": np.equal,
+}
+
+
+class DescriptorTable(object):
+    """Descriptors of the cavities of a run.
+
+    Parameters
+    ----------
+    names : list
+        Cavity names.
+    values : numpy.ndarray
+        An array with shape (n, 6) with the volume, area, average depth,
+        maximum depth, average hydropathy and number of residues of each
+        cavity; NaN where a descriptor was not computed.
+    residues : dict, optional
+        Residues of each cavity as ``[resnum, chain, resname]`` lists.
+    """
+
+    def __init__(self, names, values, residues=None):
+        self.names = np.asarray(names, dtype=str)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.names), len(COLUMNS) - 1)
+        self.residues = residues or {}
+        # Residue names lining each cavity, matched by text filters
+        self._lining = np.array(
+            [" " + " ".join(sorted({residue[2] for residue in self.residues.get(name, [])})) + " " for name in self.names],
+            dtype=str,
+        )
+
+    @classmethod
+    def from_results(cls, results):
+        """Table of the RESULTS section of a results file (see `results_io.read_results`)."""
+        residues = results.get("RESIDUES") or {}
+        names = sorted(results.get("VOLUME") or residues)
+        values = np.full((len(names), len(COLUMNS) - 1), np.nan)
+        for j, key in enumerate(_KEYS):
+            descriptor = results.get(key) or {}
+            values[:, j] = [descriptor.get(name, np.nan) for name in names]
+        if residues:
+            values[:, -1] = [len(residues.get(name, [])) for name in names]
+        return cls(names, values, residues)
+
+    def __len__(self):
+        return len(self.names)
+
+    def text(self, row, column):
+        """Text of a cell; empty for a descriptor that was not computed."""
+        if column == 0:
+            return str(self.names[row])
+        value = self.values[row, column - 1]
+        if np.isnan(value):
+            return ""
+        return str(int(value)) if COLUMNS[column] == "residues" else str(float(value))
+
+    def mask(self, text):
+        """Cavities matching a filter.
+
+        Parameters
+        ----------
+        text : str
+            Terms separated by spaces, all of which must match: a comparison
+            of a column with a number (e.g. ``volume>500``,
+            ``avg_hydropathy<=0``), or text found in the cavity name or in
+            the name of a lining residue (e.g. ``KAB``, ``HIS``).
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean mask of the cavities.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for term in text.split():
+            condition = _CONDITION.match(term.lower())
+            if condition:
+                column, operator, number = condition.groups()
+                with np.errstate(invalid="ignore"):
+                    mask &= _OPERATORS[operator](self.values[:, COLUMNS.index(column) - 1], float(number))
+            else:
+                term = term.upper()
+                mask &= (np.char.find(self.names, term) >= 0) | (np.char.find(self._lining, term) >= 0)
+        return mask
+
+    def rows(self, text="", column=0, descending=False):
+        """Indices of the cavities matching a filter, sorted by a column.
+
+        Parameters
+        ----------
+        text : str, optional
+            Filter, as in `mask`. Defaults to no filter.
+        column : int, optional
+            Index in `COLUMNS` of the sort column. Defaults to the name.
+        descending : bool, optional
+            Largest values first; cavities without the descriptor stay
+            last. Defaults to False.
+        """
+        rows = np.flatnonzero(self.mask(text)) if text.strip() else np.arange(len(self))
+        if column == 0:
+            keys = self.names[rows]
+            order = np.argsort(keys, kind="stable")
+            return rows[order[::-1]] if descending else rows[order]
+        keys = self.values[rows, column - 1]
+        return rows[np.argsort(-keys if descending else keys, kind="stable")]
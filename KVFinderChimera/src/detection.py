@@ -0,0 +1,345 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Detection strategies built on top of `pyKVFinder.detect`.
+
+Like `pipeline`, this module has no ChimeraX or Qt dependency.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyKVFinder
+
+from .pipeline import CellList, grid_dimensions, search_margin, subgrid_vertices
+
+
+def _tile_ranges(n, core):
+    """Split ``range(n)`` into consecutive (start, stop) chunks of ``core`` points."""
+    return [(start, min(start + core, n)) for start in range(0, n, core)]
+
+
+def _tile_padding(step, probe_out, removal_distance, rmax):
+    """Padding (grid points) around a tile core so that its points see every
+    probe position that can affect them."""
+    return int(np.ceil(search_margin(probe_out, removal_distance, rmax) / step)) + 1
+
+
+def tile_voxels(step, probe_out=4.0, removal_distance=2.4, tile_size=60.0, nworkers=2, rmax=2.0):
+    """Number of grid points held by the tiles processed at the same time.
+
+    Used to estimate the memory of `detect_tiled` before running it.
+    """
+    core = max(1, int(tile_size / step))
+    pad = _tile_padding(step, probe_out, removal_distance, rmax)
+    return nworkers * (core + 2 * pad) ** 3
+
+
+def _union_find_roots(nlabels, edges):
+    """Map every label to the root of its connected component."""
+    parent = np.arange(nlabels)
+
+    def find(label):
+        root = label
+        while parent[root] != root:
+            root = parent[root]
+        while parent[label] != root:
+            parent[label], label = root, parent[label]
+        return root
+
+    for a, b in edges:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    return np.array([find(label) for label in range(nlabels)])
+
+
+def relabel_cavities(cavities, step, volume_cutoff, edges=()):
+    """Merge cavity labels, drop small cavities and renumber them from 2.
+
+    Parameters
+    ----------
+    cavities : numpy.ndarray
+        Cavity grid; labels >= 2 are cavities. Modified in place.
+    step : float
+        Grid spacing (A).
+    volume_cutoff : float
+        Cavities smaller than this volume (A^3) are turned into bulk points.
+    edges : iterable, optional
+        Pairs of labels that belong to the same cavity.
+
+    Returns
+    -------
+    int
+        The number of cavities left.
+    """
+    nlabels = int(cavities.max()) + 1 if cavities.size else 0
+    if nlabels <= 2:
+        return 0
+    lut = _union_find_roots(nlabels, edges)
+
+    # Volume of each merged cavity
+    counts = np.bincount(lut[cavities[cavities >= 2]], minlength=nlabels)
+    keep = (counts > 0) & (counts * step ** 3 >= volume_cutoff) & (np.arange(nlabels) >= 2)
+
+    # Renumber kept roots consecutively, in label order
+    new_labels = np.full(nlabels, -1, dtype=np.int32)
+    roots = np.flatnonzero(keep)
+    new_labels[roots] = np.arange(2, len(roots) + 2, dtype=np.int32)
+    lut = new_labels[lut]
+    lut[:2] = [0, 1]
+
+    mask = cavities >= 2
+    cavities[mask] = lut[cavities[mask]]
+    return len(roots)
+
+
+def _detect_regions(atomic, vertices, step, regions, pad, nworkers=None, nthreads=None, **kwargs):
+    """Run `pyKVFinder.detect` on padded regions of a grid and assemble their cores.
+
+    Parameters
+    ----------
+    atomic : numpy.ndarray
+        An array with atomic data.
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the vertices of the whole grid.
+    step : float
+        Grid spacing (A).
+    regions : list
+        (start, stop) grid index triples of non-overlapping region cores.
+    pad : int
+        Padding (grid points) added around each core for detection.
+    nworkers : int, optional
+        Number of regions processed at the same time. Defaults to 2.
+    nthreads : int, optional
+        Total number of threads; each region gets an equal share. Defaults to
+        the number of CPUs.
+    **kwargs
+        Detection parameters passed to `pyKVFinder.detect`; the volume
+        cutoff is not applied.
+
+    Returns
+    -------
+    numpy.ndarray
+        Grid with the cavity labels of every core, unique across regions.
+        Points outside the cores are bulk points (-1).
+    """
+    shape = grid_dimensions(vertices, step)
+    radii = atomic[:, 7].astype(np.float64)
+    rmax = float(radii.max()) if len(radii) else 0.0
+    margin = kwargs.get("probe_out", 4.0) + rmax
+    index = CellList(atomic[:, 4:7].astype(np.float64))
+
+    if nworkers is None:
+        nworkers = min(2, len(regions))
+    nworkers = max(1, nworkers)
+    if nthreads is None:
+        nthreads = os.cpu_count() or 1
+    region_threads = max(1, nthreads // nworkers)
+
+    def run_region(region):
+        core_start, core_stop = region
+        start = np.maximum(np.asarray(core_start) - pad, 0)
+        stop = np.minimum(np.asarray(core_stop) + pad, shape)
+        region_vertices = subgrid_vertices(vertices, step, start, tuple(int(n) for n in stop - start))
+        region_atomic = atomic[index.query_grid(region_vertices, margin)]
+        if len(region_atomic) == 0:
+            return region, 0, None
+        ncavs, cavities = pyKVFinder.detect(
+            region_atomic, region_vertices, step=step, volume_cutoff=0.0,
+            nthreads=region_threads, **kwargs
+        )
+        lo = np.asarray(core_start) - start
+        hi = lo + (np.asarray(core_stop) - np.asarray(core_start))
+        return region, ncavs, cavities[lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]].copy()
+
+    cavities = np.full(shape, -1, dtype=np.int32)
+    offset = 0
+    with ThreadPoolExecutor(max_workers=nworkers) as executor:
+        for (core_start, core_stop), ncavs, core_cavities in executor.map(run_region, regions):
+            if core_cavities is None:
+                continue
+            # Make labels unique across regions
+            core_cavities[core_cavities >= 2] += offset
+            offset += ncavs
+            (x0, y0, z0), (x1, y1, z1) = core_start, core_stop
+            cavities[x0:x1, y0:y1, z0:z1] = core_cavities
+            del core_cavities
+    return cavities
+
+
+def detect_tiled(atomic, vertices, step=0.6, probe_in=1.4, probe_out=4.0, removal_distance=2.4, volume_cutoff=5.0, latomic=None, ligand_cutoff=5.0, surface="SES", tile_size=60.0, nworkers=None, nthreads=None):
+    """Detect cavities tile by tile on a large grid.
+
+    The grid defined by ``vertices`` is split into boxes of ``tile_size``
+    (A). Each box is padded so that Probe Out and the removal distance see
+    the same neighbourhood as on the global grid, and detection runs on it
+    with only the atoms near the padded box. The cores of the tiles are
+    then assembled, cavity labels touching across tile faces are merged and
+    the volume cutoff is applied to the merged cavities.
+
+    The working memory of `pyKVFinder.detect` is bounded by the padded tile
+    size times the number of workers; only the int32 label grid covers the
+    whole box.
+
+    Parameters
+    ----------
+    atomic : numpy.ndarray
+        An array with atomic data, as returned by `pyKVFinder.read_pdb`.
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the vertices of the whole grid.
+    step, probe_in, probe_out, removal_distance, volume_cutoff, latomic, ligand_cutoff, surface
+        Same as `pyKVFinder.detect`.
+    tile_size : float, optional
+        Edge length (A) of the tile cores. Defaults to 60.0.
+    nworkers : int, optional
+        Number of tiles processed at the same time. Defaults to 2.
+    nthreads : int, optional
+        Total number of threads; each tile gets an equal share. Defaults to
+        the number of CPUs.
+
+    Returns
+    -------
+    ncavs : int
+        Number of cavities.
+    cavities : numpy.ndarray
+        Cavity points in the 3D grid, labelled as in `pyKVFinder.detect`.
+    """
+    shape = grid_dimensions(vertices, step)
+    core = max(1, int(tile_size / step))
+    radii = atomic[:, 7].astype(np.float64)
+    rmax = float(radii.max()) if len(radii) else 0.0
+    pad = _tile_padding(step, probe_out, removal_distance, rmax)
+
+    tiles = []
+    for x0, x1 in _tile_ranges(shape[0], core):
+        for y0, y1 in _tile_ranges(shape[1], core):
+            for z0, z1 in _tile_ranges(shape[2], core):
+                tiles.append(((x0, y0, z0), (x1, y1, z1)))
+
+    cavities = _detect_regions(
+        atomic, vertices, step, tiles, pad, nworkers=nworkers, nthreads=nthreads,
+        probe_in=probe_in, probe_out=probe_out, removal_distance=removal_distance,
+        latomic=latomic, ligand_cutoff=ligand_cutoff, surface=surface,
+    )
+
+    # Stitch labels of cavities that touch across tile faces
+    edges = set()
+    for axis in range(3):
+        for boundary in range(core, shape[axis], core):
+            a = np.take(cavities, boundary - 1, axis=axis)
+            b = np.take(cavities, boundary, axis=axis)
+            touching = (a >= 2) & (b >= 2) & (a != b)
+            if touching.any():
+                edges.update(zip(a[touching].tolist(), b[touching].tolist()))
+
+    ncavs = relabel_cavities(cavities, step, volume_cutoff, edges)
+    return ncavs, cavities
+
+
+def cavity_bounding_boxes(cavities):
+    """Grid index bounding box of every cavity.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping each cavity label (>= 2) to its (start, stop)
+        grid index triples, ``stop`` being exclusive.
+    """
+    indices = np.argwhere(cavities >= 2)
+    if len(indices) == 0:
+        return {}
+    labels = cavities[tuple(indices.T)]
+    nlabels = int(labels.max()) + 1
+    lower = np.full((nlabels, 3), np.iinfo(np.int64).max, dtype=np.int64)
+    upper = np.full((nlabels, 3), -1, dtype=np.int64)
+    np.minimum.at(lower, labels, indices)
+    np.maximum.at(upper, labels, indices)
+    return {int(label): (lower[label], upper[label] + 1) for label in np.unique(labels)}
+
+
+def _merge_boxes(boxes):
+    """Merge (start, stop) boxes until no two of them overlap or touch."""
+    boxes = [(np.asarray(start), np.asarray(stop)) for start, stop in boxes]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for start, stop in boxes:
+            for i, (other_start, other_stop) in enumerate(result):
+                if np.all(start <= other_stop) and np.all(other_start <= stop):
+                    result[i] = (np.minimum(start, other_start), np.maximum(stop, other_stop))
+                    merged = True
+                    break
+            else:
+                result.append((start, stop))
+        boxes = result
+    return [(tuple(int(n) for n in start), tuple(int(n) for n in stop)) for start, stop in boxes]
+
+
+def detect_multiresolution(atomic, vertices, step=0.6, coarse_step=1.2, probe_in=1.4, probe_out=4.0, removal_distance=2.4, volume_cutoff=5.0, latomic=None, ligand_cutoff=5.0, surface="SES", nworkers=None, nthreads=None):
+    """Detect cavities on a coarse grid, then refine them at ``step``.
+
+    Detection first runs on the whole grid at ``coarse_step``. The bounding
+    box of every coarse cavity, grown by two coarse steps, becomes a region
+    of the fine grid; overlapping regions are merged and detection runs at
+    ``step`` only inside them, padded as in `detect_tiled`. Fine grid points
+    outside the regions are not computed and are left as bulk points (-1).
+
+    Cavities too narrow to be seen at ``coarse_step`` are not refined, so
+    the coarse step should stay well below the size of the smallest cavity
+    of interest.
+
+    Parameters
+    ----------
+    atomic : numpy.ndarray
+        An array with atomic data, as returned by `pyKVFinder.read_pdb`.
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the vertices of the whole grid.
+    step : float, optional
+        Fine grid spacing (A). Defaults to 0.6.
+    coarse_step : float, optional
+        Coarse grid spacing (A). Defaults to 1.2.
+    probe_in, probe_out, removal_distance, volume_cutoff, latomic, ligand_cutoff, surface
+        Same as `pyKVFinder.detect`.
+    nworkers : int, optional
+        Number of regions processed at the same time. Defaults to 2.
+    nthreads : int, optional
+        Total number of threads. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    ncavs : int
+        Number of cavities.
+    cavities : numpy.ndarray
+        Cavity points in the fine 3D grid, labelled as in `pyKVFinder.detect`.
+    """
+    shape = np.asarray(grid_dimensions(vertices, step))
+    parameters = dict(
+        probe_in=probe_in, probe_out=probe_out, removal_distance=removal_distance,
+        latomic=latomic, ligand_cutoff=ligand_cutoff, surface=surface,
+    )
+
+    # Coarse pass on the whole grid; keep every cavity, however small
+    ncoarse, coarse = pyKVFinder.detect(atomic, vertices, step=coarse_step, volume_cutoff=0.0, nthreads=nthreads, **parameters)
+    if ncoarse == 0:
+        return 0, np.full(tuple(shape), -1, dtype=np.int32)
+
+    # Coarse cavity boxes in fine grid indices, grown by two coarse steps
+    ratio = coarse_step / step
+    grow = int(np.ceil(2 * ratio))
+    regions = []
+    for start, stop in cavity_bounding_boxes(coarse).values():
+        fine_start = np.clip(np.floor(start * ratio).astype(int) - grow, 0, shape - 1)
+        fine_stop = np.clip(np.ceil((stop - 1) * ratio).astype(int) + 1 + grow, fine_start + 1, shape)
+        regions.append((fine_start, fine_stop))
+    del coarse
+    regions = _merge_boxes(regions)
+
+    radii = atomic[:, 7].astype(np.float64)
+    rmax = float(radii.max()) if len(radii) else 0.0
+    pad = _tile_padding(step, probe_out, removal_distance, rmax)
+    cavities = _detect_regions(atomic, vertices, step, regions, pad, nworkers=nworkers, nthreads=nthreads, **parameters)
+
+    ncavs = relabel_cavities(cavities, step, volume_cutoff)
+    return ncavs, cavities
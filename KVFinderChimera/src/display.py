@@ -0,0 +1,307 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Colors, labels and meshes for the cavity displays.
+
+`CavityAtoms` groups the points of the cavity PDB by cavity once, so that
+coloring selected cavities is an array assignment, with `palette_colors`
+for depth and hydropathy and `grid_values` to read the depths and
+hydropathy of the points from the grids of the run. The other cavity displays (the volume of the
+label grid and the per-cavity meshes) color each cavity with
+`cavity_colors`. `vertex_labels` finds which cavity a vertex of a contoured
+surface belongs to, and `cavity_meshes` triangulates each cavity separately
+with a marching cubes function such as ChimeraX's ``contour_surface``. The
+points of the cavity PDB are thinned by `lod_mask` while the camera moves.
+Like `pipeline`, this module has no ChimeraX or Qt dependency.
+"""
+
+import numpy as np
+
+from .detection import cavity_bounding_boxes
+from .pipeline import grid_axes, grid_coordinates
+
+# Colors of cavities KAA, KAB, ... in turn (RGBA)
+CAVITY_COLORS = np.array([
+    (31, 119, 180, 255),
+    (255, 127, 14, 255),
+    (44, 160, 44, 255),
+    (214, 39, 40, 255),
+    (148, 103, 189, 255),
+    (140, 86, 75, 255),
+    (227, 119, 194, 255),
+    (188, 189, 34, 255),
+    (23, 190, 207, 255),
+    (127, 127, 127, 255),
+], dtype=np.uint8)
+
+# Color of points that belong to no cavity
+NO_CAVITY_COLOR = np.array((255, 255, 255, 255), dtype=np.uint8)
+
+# Colors of selected cavities and of their surface points (HA)
+SELECTED_COLOR = np.array((0, 0, 255, 255), dtype=np.uint8)
+SURFACE_COLOR = np.array((255, 0, 0, 255), dtype=np.uint8)
+
+# ChimeraX palettes of depth (rainbow) and hydropathy (yellow:white:blue),
+# lowest value first
+DEPTH_PALETTE = np.array([(0, 0, 1, 1), (0, 1, 1, 1), (0, 1, 0, 1), (1, 1, 0, 1), (1, 0, 0, 1)], dtype=np.float64)
+HYDROPATHY_PALETTE = np.array([(1, 1, 0, 1), (1, 1, 1, 1), (0, 0, 1, 1)], dtype=np.float64)
+
+
+class CavityAtoms(object):
+    """Atoms of a cavity model grouped by cavity.
+
+    Parameters
+    ----------
+    atoms : chimerax.atomic.Atoms
+        Atoms of the cavity PDB, one residue (KAA, KAB, ...) per cavity
+        and surface points named HA.
+    """
+
+    def __init__(self, atoms):
+        self.atoms = atoms
+        names = np.asarray(atoms.residues.names)
+        order = np.argsort(names, kind="stable")
+        unique, starts = np.unique(names[order], return_index=True)
+        self._indices = {str(name): part for name, part in zip(unique, np.split(order, starts[1:]))}
+        # Whether each point is a surface point
+        self.surface = np.asarray(atoms.names) == "HA"
+
+    def __len__(self):
+        return len(self.atoms)
+
+    @property
+    def names(self):
+        """Cavity names, sorted."""
+        return sorted(self._indices)
+
+    def indices(self, cavities, surface_only=False):
+        """Indices in `atoms` of the points of some cavities.
+
+        Parameters
+        ----------
+        cavities : list
+            Cavity names; unknown names are ignored.
+        surface_only : bool, optional
+            Only the surface (HA) points. Defaults to False.
+        """
+        parts = [self._indices[name] for name in cavities if name in self._indices]
+        index = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        return index[self.surface[index]] if surface_only else index
+
+    def select(self, cavities, surface_only=False):
+        """Atoms collection of the points of some cavities (see `indices`)."""
+        return self.atoms.filter(self.indices(cavities, surface_only))
+
+    def color(self, cavities, rgba, surface_only=False):
+        """Color the points of some cavities.
+
+        Parameters
+        ----------
+        cavities : list
+            Cavity names.
+        rgba : numpy.ndarray
+            One RGBA color (uint8), or one per point in the order of
+            `indices`.
+        surface_only : bool, optional
+            Only the surface (HA) points. Defaults to False.
+        """
+        selected = self.select(cavities, surface_only)
+        if len(selected):
+            selected.colors = np.asarray(rgba, dtype=np.uint8)
+
+
+def palette_colors(values, palette, vmin=None, vmax=None):
+    """RGBA colors of values on a palette, like ``color byattribute``.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Values to color.
+    palette : numpy.ndarray
+        Colors (RGBA between 0 and 1) evenly spaced from ``vmin`` to
+        ``vmax``, with shape (n, 4).
+    vmin, vmax : float, optional
+        Values of the first and last colors; values outside are clamped.
+        Default to the range of ``values``.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array of uint8 with shape (n, 4).
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if len(values) == 0:
+        return np.zeros((0, 4), dtype=np.uint8)
+    vmin = values.min() if vmin is None else vmin
+    vmax = values.max() if vmax is None else vmax
+    if vmax > vmin:
+        position = np.clip((values - vmin) / (vmax - vmin), 0, 1) * (len(palette) - 1)
+    else:
+        position = np.full(len(values), 0.5 * (len(palette) - 1))
+    lower = np.minimum(np.floor(position).astype(np.int64), len(palette) - 2)
+    fraction = (position - lower)[:, None]
+    colors = (1 - fraction) * palette[lower] + fraction * palette[lower + 1]
+    return np.round(255 * colors).astype(np.uint8)
+
+
+def grid_values(grid, xyz, vertices, step):
+    """Values of a grid at the grid points nearest to some coordinates.
+
+    Parameters
+    ----------
+    grid : numpy.ndarray
+        A grid of the run, such as the depths or hydropathy.
+    xyz : numpy.ndarray
+        Coordinates (A) with shape (n, 3).
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the grid vertices.
+    step : float
+        Grid spacing (A).
+
+    Returns
+    -------
+    numpy.ndarray
+        Value of each point; 0 for points outside the grid.
+    """
+    ijk = np.rint(grid_coordinates(xyz, vertices, step)).astype(np.int64)
+    inside = np.all((ijk >= 0) & (ijk < grid.shape), axis=1)
+    values = np.zeros(len(ijk), dtype=np.float64)
+    values[inside] = grid[tuple(ijk[inside].T)]
+    return values
+
+
+def cavity_colors(labels):
+    """RGBA colors of cavity labels (2 for KAA, 3 for KAB, ...).
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        Labels of a cavity grid; labels below 2 get `NO_CAVITY_COLOR`.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array of uint8 with shape (n, 4).
+    """
+    labels = np.asarray(labels).ravel()
+    colors = CAVITY_COLORS[np.maximum(labels - 2, 0) % len(CAVITY_COLORS)]
+    colors[labels < 2] = NO_CAVITY_COLOR
+    return colors
+
+
+def vertex_labels(cavities, xyz, vertices, step):
+    """Cavity of each vertex of a surface contoured on a cavity grid.
+
+    A vertex of a contour between cavity points and other points lies in a
+    grid cell with at least one cavity point among its eight corners; it
+    gets the largest label of those corners.
+
+    Parameters
+    ----------
+    cavities : numpy.ndarray
+        Cavity grid, as returned by `pyKVFinder.detect`.
+    xyz : numpy.ndarray
+        Vertex coordinates (A) with shape (n, 3).
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the grid vertices.
+    step : float
+        Grid spacing (A).
+
+    Returns
+    -------
+    numpy.ndarray
+        Label of each vertex; 0 for vertices away from every cavity.
+    """
+    ijk = np.floor(grid_coordinates(xyz, vertices, step)).astype(np.int64)
+    upper = np.array(cavities.shape) - 1
+    labels = np.zeros(len(ijk), dtype=np.int32)
+    for corner in np.ndindex(2, 2, 2):
+        index = np.clip(ijk + corner, 0, upper)
+        np.maximum(labels, cavities[tuple(index.T)], out=labels)
+    return labels
+
+
+def cavity_meshes(cavities, vertices, step, contour, level=0.5):
+    """Triangle mesh of each cavity of a grid.
+
+    Each cavity is contoured on its own bounding box, with one empty point
+    of margin so that its surface is closed, as a 0/1 mask.
+
+    Parameters
+    ----------
+    cavities : numpy.ndarray
+        Cavity grid, as returned by `pyKVFinder.detect`.
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the grid vertices.
+    step : float
+        Grid spacing (A).
+    contour : callable
+        Marching cubes function, called as ``contour(array, level)`` on a
+        float32 array indexed (z, y, x); it returns the vertices as (x, y,
+        z) indices of that array and the triangles, like
+        ``chimerax.map._map.contour_surface``.
+    level : float, optional
+        Contour level of the mask. Defaults to 0.5.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping each cavity label (>= 2) to its vertices (A),
+        an array of float32 with shape (n, 3), and its triangles.
+    """
+    origin, axes = grid_axes(vertices)
+    meshes = {}
+    for label, (start, stop) in cavity_bounding_boxes(cavities).items():
+        start, stop = start - 1, stop + 1
+        lower = np.maximum(start, 0)
+        upper = np.minimum(stop, cavities.shape)
+        mask = np.zeros(tuple(stop - start), dtype=np.float32)
+        offset = lower - start
+        mask[tuple(slice(o, o + u - l) for o, l, u in zip(offset, lower, upper))] = (
+            cavities[tuple(slice(l, u) for l, u in zip(lower, upper))] == label
+        )
+        varray, tarray = contour(np.ascontiguousarray(mask.T), level)[:2]
+        xyz = origin + ((np.asarray(varray, dtype=np.float64) + start) * step) @ axes
+        meshes[label] = (xyz.astype(np.float32), np.asarray(tarray, dtype=np.int32))
+    return meshes
+
+
+def lod_mask(coords, surface, budget, step):
+    """Cavity points drawn at a reduced level of detail.
+
+    The surface points (HA) are kept; when there are more than ``budget``
+    of them, only one surface point per cube of 2, 3, ... grid steps is kept,
+    the smallest cube that brings them under the budget.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        Coordinates (A) of the cavity points with shape (n, 3).
+    surface : numpy.ndarray
+        Whether each point is a surface point.
+    budget : int
+        Largest number of points kept.
+    step : float
+        Grid spacing (A).
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean mask of the points kept.
+    """
+    mask = np.array(surface, dtype=bool)
+    if np.count_nonzero(mask) <= budget:
+        return mask
+    index = np.flatnonzero(mask)
+    points = np.asarray(coords, dtype=np.float64)[index]
+    points -= points.min(axis=0)
+    factor = 2
+    while True:
+        voxels = np.floor(points / (step * factor)).astype(np.int64)
+        keys = (voxels[:, 0] << 42) | (voxels[:, 1] << 21) | voxels[:, 2]
+        _, first = np.unique(keys, return_index=True)
+        if len(first) <= budget:
+            break
+        factor += 1
+    mask[:] = False
+    mask[index[first]] = True
+    return mask
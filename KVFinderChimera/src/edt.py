@@ -0,0 +1,242 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Cavity detection from Euclidean distance transforms.
+
+The space reached by a probe of radius R is a threshold on the distance
+from grid points to the van der Waals surface: probe centres are the points
+at least R from it and, for the solvent excluded surface, the space is
+every point closer than R to a centre. `DistanceField` computes the distance to
+the surface once per structure and grid, so the cavities of many
+Probe In / Probe Out / removal distance combinations only cost thresholds,
+a few more transforms and a connected component labelling each.
+
+The transform of the rasterized atoms overestimates the distance to the
+surface by less than a grid diagonal, so points within that margin of a
+probe radius get their exact distance to the atoms from a k-d tree before
+thresholding. The other steps follow `pyKVFinder.detect`:
+
+- Probe Out always defines the solvent excluded surface.
+- Points within ceil(removal distance / step) grid steps along each axis of
+  the Probe Out space are bulk.
+- Cavity points without a cavity neighbour along the axes are bulk.
+- Cavity points are clustered with their 26 neighbours, except on the faces
+  of the grid, and clusters below the volume cutoff become bulk.
+
+The results match `pyKVFinder.detect` up to differences in single boundary
+points; `compare_with_detect` measures the agreement on a given structure
+and benchmarks/check_edt.py over a range of parameters. Requires scipy,
+which ships with ChimeraX.
+"""
+
+import math
+import time
+
+import numpy as np
+import pyKVFinder
+from scipy import ndimage
+from scipy.spatial import cKDTree
+
+from .pipeline import grid_axes, grid_coordinates, grid_dimensions
+
+
+def _rasterize(ijk, radii, shape, budget=1 << 20):
+    """Mark the grid points within ``radii`` (grid units) of the points ``ijk``.
+
+    Points are processed in blocks of at most ``budget`` (point, offset)
+    pairs, about 60 bytes each, whatever the radius.
+    """
+    mask = np.zeros(shape, dtype=bool)
+    if len(ijk) == 0:
+        return mask
+    bound = np.asarray(shape) - 1
+    for radius in np.unique(radii):
+        centers = ijk[radii == radius]
+        half = int(np.ceil(radius)) + 1
+        axis = np.arange(-half, half + 1)
+        offsets = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+        chunk = max(1, budget // len(offsets))
+        for start in range(0, len(centers), chunk):
+            block = centers[start:start + chunk]
+            points = np.floor(block).astype(np.int64)[:, None, :] + offsets[None, :, :]
+            inside = ((points - block[:, None, :]) ** 2).sum(axis=2) <= radius ** 2
+            inside &= np.all((points >= 0) & (points <= bound), axis=2)
+            points = points[inside]
+            mask[points[:, 0], points[:, 1], points[:, 2]] = True
+    return mask
+
+
+class DistanceField(object):
+    """Distance from the points of a grid to the van der Waals surface.
+
+    Parameters
+    ----------
+    atomic : numpy.ndarray
+        An array with atomic data, as returned by `pyKVFinder.read_pdb`.
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the grid vertices.
+    step : float
+        Grid spacing (A).
+    latomic : numpy.ndarray, optional
+        Ligand atomic data; cavity points farther than ``ligand_cutoff``
+        from the ligand are discarded.
+    ligand_cutoff : float, optional
+        Ligand distance cutoff (A). Defaults to 5.0.
+    """
+
+    def __init__(self, atomic, vertices, step, latomic=None, ligand_cutoff=5.0):
+        self.vertices = np.asarray(vertices, dtype=np.float64)
+        self.step = step
+        self.shape = grid_dimensions(vertices, step)
+
+        coords = atomic[:, 4:7].astype(np.float64)
+        self._radii = atomic[:, 7].astype(np.float64)
+        occupied = _rasterize(grid_coordinates(coords, vertices, step), self._radii / step, self.shape)
+        self.distance = ndimage.distance_transform_edt(~occupied, sampling=step).astype(np.float32)
+        del occupied
+
+        # Exact distances replace transform values near probe radii on demand
+        self._tree = cKDTree(coords) if len(coords) else None
+        self._refined = np.zeros(self.shape, dtype=bool)
+        self._margin = step * np.sqrt(3)
+
+        self.ligand = None
+        if latomic is not None:
+            ijk = grid_coordinates(latomic[:, 4:7].astype(np.float64), vertices, step)
+            self.ligand = _rasterize(ijk, np.full(len(ijk), ligand_cutoff / step), self.shape)
+
+        self._spaces = {}
+        self._bulk_distances = {}
+
+    def _surface_distance(self, points):
+        """Exact distance from points to the van der Waals surface."""
+        natoms = len(self._radii)
+        distance = np.empty(len(points))
+        pending = np.arange(len(points))
+        rmax = self._radii.max()
+        k = min(16, natoms)
+        while len(pending):
+            d, i = self._tree.query(points[pending], k=k)
+            d, i = d.reshape(len(pending), k), i.reshape(len(pending), k)
+            nearest = (d - self._radii[i]).min(axis=1)
+            # Atoms beyond the k-th neighbour cannot be closer to the surface
+            done = (nearest <= d[:, -1] - rmax) | (k == natoms)
+            distance[pending[done]] = nearest[done]
+            pending = pending[~done]
+            k = min(2 * k, natoms)
+        return np.maximum(distance, 0.0)
+
+    def _refine(self, radius):
+        """Replace transform values that may be on either side of ``radius`` by exact distances."""
+        if self._tree is None:
+            return
+        index = np.flatnonzero((self.distance >= radius) & (self.distance <= radius + self._margin) & ~self._refined)
+        if len(index) == 0:
+            return
+        origin, axes = grid_axes(self.vertices)
+        points = origin + (np.column_stack(np.unravel_index(index, self.shape)) * self.step) @ axes
+        self.distance.flat[index] = self._surface_distance(points)
+        self._refined.flat[index] = True
+
+    def probe_space(self, radius, surface="SES"):
+        """Points reached by a probe of ``radius`` (cached)."""
+        key = (round(radius, 4), surface)
+        if key not in self._spaces:
+            self._refine(radius)
+            centers = self.distance >= radius
+            if surface == "SES":
+                # As in pyKVFinder, grid distances are compared strictly and
+                # points on the first face of each axis are not reopened
+                space = ndimage.distance_transform_edt(~centers) < radius / self.step
+                space[0, :, :] = centers[0, :, :]
+                space[:, 0, :] = centers[:, 0, :]
+                space[:, :, 0] = centers[:, :, 0]
+            else:
+                space = centers
+            self._spaces[key] = space
+        return self._spaces[key]
+
+    def bulk_distance(self, probe_out):
+        """Distance, in grid steps along the farthest axis, from each point
+        to the space reached by Probe Out (cached)."""
+        key = round(probe_out, 4)
+        if key not in self._bulk_distances:
+            bulk = self.probe_space(probe_out, "SES")
+            self._bulk_distances[key] = ndimage.distance_transform_cdt(~bulk, metric="chessboard").astype(np.int32)
+        return self._bulk_distances[key]
+
+    def detect(self, probe_in=1.4, probe_out=4.0, removal_distance=2.4, volume_cutoff=5.0, surface="SES"):
+        """Detect cavities with the given parameters.
+
+        Returns
+        -------
+        ncavs : int
+            Number of cavities.
+        cavities : numpy.ndarray
+            Cavity points in the 3D grid, labelled as in `pyKVFinder.detect`
+            (-1 bulk, 0 biomolecule, 1 empty space, >= 2 cavities).
+        """
+        inside = self.probe_space(probe_in, surface)
+        bulk_distance = self.bulk_distance(probe_out)
+
+        # Reached by Probe In, farther than the removal distance from bulk
+        candidates = inside & (bulk_distance > math.ceil(removal_distance / self.step))
+        if self.ligand is not None:
+            candidates &= self.ligand
+
+        # Points on the faces of the grid are neither filtered nor clustered
+        interior = np.zeros(self.shape, dtype=bool)
+        interior[1:-1, 1:-1, 1:-1] = True
+
+        # Noise: points without a cavity neighbour along the axes
+        neighbours = np.zeros(self.shape, dtype=bool)
+        for axis in range(3):
+            neighbours |= np.roll(candidates, 1, axis=axis) | np.roll(candidates, -1, axis=axis)
+        candidates &= neighbours | ~interior
+
+        labels, nlabels = ndimage.label(candidates & interior, structure=np.ones((3, 3, 3), dtype=bool))
+        counts = np.bincount(labels.ravel(), minlength=nlabels + 1)
+        keep = counts * self.step ** 3 >= volume_cutoff
+        keep[0] = False
+        new_labels = np.full(nlabels + 1, -1, dtype=np.int32)
+        new_labels[keep] = np.arange(2, keep.sum() + 2, dtype=np.int32)
+
+        cavities = np.full(self.shape, -1, dtype=np.int32)
+        cavities[~inside] = 0
+        # Candidates on the faces stay empty space, clusters below the
+        # volume cutoff become bulk
+        cavities[candidates] = 1
+        clustered = candidates & interior
+        cavities[clustered] = new_labels[labels[clustered]]
+        return int(keep.sum()), cavities
+
+
+def compare_with_detect(atomic, vertices, step=0.6, probe_in=1.4, probe_out=4.0, removal_distance=2.4, volume_cutoff=5.0, surface="SES", nthreads=None):
+    """Run `DistanceField.detect` and `pyKVFinder.detect` and compare them.
+
+    Returns
+    -------
+    dict
+        Number of cavities of each engine (``edt_ncavs``, ``detect_ncavs``),
+        Jaccard index of their cavity points (``jaccard``) and wall times
+        (``edt_seconds``, including the distance field, and ``detect_seconds``).
+    """
+    start = time.perf_counter()
+    edt_ncavs, edt_cavities = DistanceField(atomic, vertices, step).detect(probe_in, probe_out, removal_distance, volume_cutoff, surface)
+    edt_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    detect_ncavs, detect_cavities = pyKVFinder.detect(
+        atomic, vertices, step=step, probe_in=probe_in, probe_out=probe_out,
+        removal_distance=removal_distance, volume_cutoff=volume_cutoff, surface=surface, nthreads=nthreads,
+    )
+    detect_seconds = time.perf_counter() - start
+
+    a, b = edt_cavities >= 2, detect_cavities >= 2
+    union = np.count_nonzero(a | b)
+    return {
+        "edt_ncavs": edt_ncavs,
+        "detect_ncavs": detect_ncavs,
+        "jaccard": np.count_nonzero(a & b) / union if union else 1.0,
+        "edt_seconds": edt_seconds,
+        "detect_seconds": detect_seconds,
+    }
@@ -11,6 +11,7 @@
 # or derivations thereof.
 # === UCSF ChimeraX Copyright ===
 
+from chimerax.core.models import ADD_MODELS, REMOVE_MODELS
 from chimerax.core.objects import all_objects
 from chimerax.core.tools import ToolInstance
 from chimerax.atomic import StructureSeq, Structure, selected_atoms, all_atoms, structure_atoms, all_atomic_structures
@@ -28,6 +29,18 @@ import numpy as np
 import sys
 import toml
 
+from .catalog import COLUMNS as CATALOG_COLUMNS, Catalog
+from .compare import GAINED, LOST, SHARED, compare_structures, difference, write_table as write_compare_table
+from .descriptors import COLUMNS as DESCRIPTOR_COLUMNS, DescriptorTable
+from .detection import detect_multiresolution, detect_tiled, tile_voxels
+from .display import DEPTH_PALETTE, HYDROPATHY_PALETTE, NO_CAVITY_COLOR, SELECTED_COLOR, SURFACE_COLOR, CavityAtoms, cavity_colors, cavity_meshes, grid_values, lod_mask, palette_colors, vertex_labels
+from .ligands import COLUMNS as LIGAND_COLUMNS, ligand_pockets, ligand_residues, write_table as write_ligand_table
+from .pipeline import CellList, CostModel, atomic_from_atoms, cavity_name, grid_axes, search_margin, subgrid_around, subgrid_vertices, vertices_from_coords
+from .results_io import grid_file, read_grids, read_results, results_prefix, write_grids, write_results as write_binary_results
+from .sparse import SparseCavities
+from .sweep import COLUMNS as SWEEP_COLUMNS, parse_range, sweep, write_table
+from .tracking import track_frames, write_table as write_track_table
+
 dialog = None
 
 class _Default(object):
@@ -42,6 +55,13 @@ class _Default(object):
         self.probe_out = 4.0
         self.removal_distance = 2.4
         self.volume_cutoff = 5.0
+        self.memory_budget = 4096
+        self.tiled_detection = False
+        self.tile_size = 60.0
+        self.multiresolution = False
+        self.coarse_step = 1.2
+        self.level_of_detail = True
+        self.lod_budget = 100000
         self.surface = "Solvent Excluded Surface (SES)"
         # self.cavity_representation = "Filtered"
         self.base_name = "output"
@@ -75,12 +95,23 @@ class _Default(object):
         # Ligand Adjustment
         self.ligand_adjustment = False
         self.ligand_cutoff = 5.0
+        self.per_ligand = False
+        self.auto_ligands = False
 
 
 class KVFinder(ToolInstance):
 
     SESSION_ENDURING = False    # Does this instance persist when session closes
     SESSION_SAVE = True         # We do save/restore in sessions
+    SESSION_VERSION = 1
+    # Parameter widgets saved in sessions
+    SESSION_WIDGETS = (
+        "step_size", "base_name", "probe_in", "probe_out", "volume_cutoff", "removal_distance",
+        "memory_budget", "tiled_detection", "tile_size", "multiresolution", "coarse_step", "surface",
+        "output_dir_path", "dictionary", "ignore_backbone_checkbox", "box_adjustment", "padding",
+        "min_x", "max_x", "min_y", "max_y", "min_z", "max_z", "angle1", "angle2",
+        "ligand_adjustment", "ligand_cutoff", "per_ligand", "auto_ligands", "level_of_detail", "lod_budget",
+    )
     #help = "help:user/tools/tutorial.html"
                                 # Let ChimeraX know about our help page
 
@@ -114,15 +145,44 @@ class KVFinder(ToolInstance):
 
         # Results
         self.results = None
+        # Cost model of the output directory and its file (see _get_cost_model)
+        self._cost_model = None
+        # Memory-mapped grids of the loaded results
+        self.grids = None
+        # Volume of the cavity grid and model with one mesh per cavity (see set_cavity_display)
+        self.cavity_volume = None
+        self.cavity_meshes = None
+        # Meshes of each run, keyed by _mesh_key, and the worker computing them
+        self._mesh_cache = {}
+        self._mesh_worker = None
+        # Cavity PDB and its modification time the cavity model was opened from (see _load_cavity_points)
+        self._cavity_source = None
+        # Points of the cavity model grouped by cavity (see _get_cavity_atoms)
+        self._cavity_atoms = None
+        # Colors of the depth and hydropathy views (see _get_view_colors)
+        self._view_colors = {}
+        # Level of detail of the cavity points (see set_level_of_detail)
+        self._lod_handler = None
+        self._lod_camera = None
+        self._lod_displays = None
+        self._lod_subset = None
+        self._lod_timer = QtCore.QTimer()
+        self._lod_timer.setSingleShot(True)
+        self._lod_timer.setInterval(300)
+        self._lod_timer.timeout.connect(self._restore_detail)
+        # Open models by name, kept up to date by the model triggers (see _get_model)
+        self._models_by_name = {}
+        self._index_models(ADD_MODELS, self.session.models.list())
+        self._model_handlers = [
+            self.session.triggers.add_handler(ADD_MODELS, self._index_models),
+            self.session.triggers.add_handler(REMOVE_MODELS, self._unindex_models),
+        ]
         self.input_pdb = None
         self.ligand_pdb = None
         self.cavity_pdb = None
 
-        # Lists Selected
-        self.vs_selected = []
-        self.am_selected = []
-        self.hyd_selected = []
-        self.res_selected = []
+        # Cavities selected in the results table
+        self._selected_cavities = set()
 
 
 
@@ -134,14 +194,6 @@ class KVFinder(ToolInstance):
 
 
     def _connect_ui(self):
-        
-        # ScrollBars binded to QListWidgets in Descriptors
-        scroll_bar_volume = QtWidgets.QScrollBar(self.tool_window)
-        self.ui.volume_list.setVerticalScrollBar(scroll_bar_volume)
-        scroll_bar_area = QtWidgets.QScrollBar(self.tool_window)
-        self.ui.area_list.setVerticalScrollBar(scroll_bar_area)
-        scroll_bar_residues = QtWidgets.QScrollBar(self.tool_window)
-        self.ui.residues_list.setVerticalScrollBar(scroll_bar_residues)
 
         ########################
         ### Buttons Callback ###
@@ -176,45 +228,29 @@ class KVFinder(ToolInstance):
             lambda: self.select_file(
                 "Choose KVFinder Results File",
                 self.ui.results_file_entry,
-                "KVFinder Results File (*.toml);;All files (*)",
+                "KVFinder Results File (*.toml *.npz);;All files (*)",
             )
         )
 
         self.ui.button_box_adjustment_help.clicked.connect(self.box_adjustment_help)
         self.ui.button_exit.clicked.connect(self.tool_window.close)
         self.ui.button_load_results.clicked.connect(self.load_results)
+        self.ui.button_run_sweep.clicked.connect(self.run_sweep)
+        self.ui.button_track_cavities.clicked.connect(self.track_cavities)
+        self.ui.refresh_compare_input.clicked.connect(lambda: self.refresh(self.ui.compare_input))
+        self.ui.button_compare.clicked.connect(self.compare_structures)
+        self.ui.button_catalog_import.clicked.connect(self.import_catalog)
+        self.ui.button_catalog_search.clicked.connect(self.search_catalog)
     
 
-        self.ui.volume_list.itemSelectionChanged.connect(
-            lambda list1=self.ui.volume_list, list2=self.ui.area_list: self.show_cavities(
-                list1, list2
-            )
-        )
-        self.ui.area_list.itemSelectionChanged.connect(
-            lambda list1=self.ui.area_list, list2=self.ui.volume_list: self.show_cavities(
-                list1, list2
-            )
-        )
-
-        self.ui.avg_depth_list.itemSelectionChanged.connect(
-            lambda list1=self.ui.avg_depth_list, list2=self.ui.max_depth_list: self.show_depth(
-                list1, list2
-            )
-        )
-        self.ui.max_depth_list.itemSelectionChanged.connect(
-            lambda list1=self.ui.max_depth_list, list2=self.ui.avg_depth_list: self.show_depth(
-                list1, list2
-            )
-        )
-
-        self.ui.avg_hydropathy_list.itemSelectionChanged.connect(
-            lambda list1=self.ui.avg_hydropathy_list: self.show_hydropathy(list1)
-        )
-
-        self.ui.residues_list.itemSelectionChanged.connect(self.show_residues)
+        self.ui.results_table.selectionModel().selectionChanged.connect(self.select_cavities)
+        self.ui.results_filter.textChanged.connect(self.filter_descriptors)
         self.ui.default_view.toggled.connect(self.show_default_view)
         self.ui.depth_view.toggled.connect(self.show_depth_view)
         self.ui.hydropathy_view.toggled.connect(self.show_hydropathy_view)
+        self.ui.cavity_display.currentIndexChanged.connect(self.set_cavity_display)
+        self.ui.level_of_detail.toggled.connect(self.set_level_of_detail)
+        self.ui.lod_budget.valueChanged.connect(self.set_level_of_detail)
 
 
         # hook up Search Space button callbacks
@@ -226,6 +262,25 @@ class KVFinder(ToolInstance):
         # Ligand Adjustment
         self.ui.refresh_ligand.clicked.connect(lambda: self.refresh(self.ui.ligand))
 
+        # Grid estimate
+        self.ui.step_size.valueChanged.connect(self.update_estimate)
+        self.ui.probe_out.valueChanged.connect(self.update_estimate)
+        self.ui.memory_budget.valueChanged.connect(self.update_estimate)
+        self.ui.input.currentTextChanged.connect(self.update_estimate)
+        self.ui.box_adjustment.toggled.connect(self.update_estimate)
+        self.ui.tiled_detection.toggled.connect(self.update_estimate)
+        self.ui.tile_size.valueChanged.connect(self.update_estimate)
+        self.ui.multiresolution.toggled.connect(self.update_estimate)
+        self.ui.coarse_step.valueChanged.connect(self.update_estimate)
+        self.ui.groupButton.buttonClicked.connect(self.update_estimate)
+
+        # Detection modes: only one of tiled and multiresolution detection
+        # runs, and neither in box adjustment mode
+        self.ui.tiled_detection.toggled.connect(lambda checked: checked and self.ui.multiresolution.setChecked(False))
+        self.ui.multiresolution.toggled.connect(lambda checked: checked and self.ui.tiled_detection.setChecked(False))
+        self.ui.box_adjustment.toggled.connect(self.set_detection_modes)
+        self.set_detection_modes()
+
 
     def _optionCheck(self, btn):
 
@@ -257,9 +312,9 @@ class KVFinder(ToolInstance):
                     input_pdb = self._get_model(self.input_pdb)
                     input_pdb.delete()
                 if self.cavity_pdb:
-                    cavity_pdb = self._get_model(self.cavity_pdb)
-                    cavity_pdb.delete()
-                results = self.input_pdb = self.ligand_pdb = self.cavity_pdb = None
+                    self._delete_models(self.cavity_pdb)
+                self._close_cavity_displays()
+                results = self.results = self.input_pdb = self.ligand_pdb = self.cavity_pdb = None
 
                 # Clean results
                 self.clean_results()
@@ -268,6 +323,7 @@ class KVFinder(ToolInstance):
         # Restore PDB and ligand input
         self.refresh(self.ui.input)
         self.refresh(self.ui.ligand)
+        self.refresh(self.ui.compare_input)
 
         # Delete grid
         #cmd.delete("grid")
@@ -285,6 +341,13 @@ class KVFinder(ToolInstance):
         self.ui.probe_out.setValue(self._default.probe_out)
         self.ui.volume_cutoff.setValue(self._default.volume_cutoff)
         self.ui.removal_distance.setValue(self._default.removal_distance)
+        self.ui.memory_budget.setValue(self._default.memory_budget)
+        self.ui.tiled_detection.setChecked(self._default.tiled_detection)
+        self.ui.tile_size.setValue(self._default.tile_size)
+        self.ui.multiresolution.setChecked(self._default.multiresolution)
+        self.ui.coarse_step.setValue(self._default.coarse_step)
+        self.ui.level_of_detail.setChecked(self._default.level_of_detail)
+        self.ui.lod_budget.setValue(self._default.lod_budget)
         self.ui.surface.setCurrentText(self._default.surface)
         # self.ui.cavity_representation.setCurrentText(self._default.cavity_representation)
         self.ui.output_dir_path.setText(self._default.output_dir_path)
@@ -300,6 +363,102 @@ class KVFinder(ToolInstance):
         self.ui.ligand_adjustment.setChecked(self._default.ligand_adjustment)
         self.ui.ligand.clear()
         self.ui.ligand_cutoff.setValue(self._default.ligand_cutoff)
+        self.ui.per_ligand.setChecked(self._default.per_ligand)
+        self.ui.auto_ligands.setChecked(self._default.auto_ligands)
+
+    def take_snapshot(self, session, flags):
+        """Save the parameters and the loaded results in a ChimeraX session.
+
+        The cavity grid of the results is saved as sparse runs (see sparse)
+        with the depth and hydropathy of their points, so restoring the
+        session reads no results file and runs no detection. The input,
+        ligand and cavity models are saved by ChimeraX itself.
+        """
+        parameters = {}
+        for name in self.SESSION_WIDGETS:
+            widget = getattr(self.ui, name)
+            if isinstance(widget, QtWidgets.QComboBox):
+                parameters[name] = widget.currentText()
+            elif isinstance(widget, QtWidgets.QLineEdit):
+                parameters[name] = widget.text()
+            elif isinstance(widget, (QtWidgets.QCheckBox, QtWidgets.QGroupBox)):
+                parameters[name] = widget.isChecked()
+            else:
+                parameters[name] = widget.value()
+        return {
+            "version": self.SESSION_VERSION,
+            "tool_name": self.tool_name,
+            "parameters": parameters,
+            "region_option": self.region_option,
+            "box_center": [self.x, self.y, self.z],
+            "results_file": self.ui.results_file_entry.text(),
+            "results": self.results,
+            "models": [self.input_pdb, self.ligand_pdb, self.cavity_pdb],
+            "grids": self._grids_snapshot(),
+        }
+
+    @classmethod
+    def restore_snapshot(cls, session, data):
+        """Create the tool from a ChimeraX session saved with take_snapshot."""
+        tool = cls(session, data.get("tool_name", "Cavities"))
+        tool._restore_state(data)
+        return tool
+
+    def _restore_state(self, data) -> None:
+        global results
+
+        for name, value in data["parameters"].items():
+            widget = getattr(self.ui, name, None)
+            if isinstance(widget, QtWidgets.QComboBox):
+                widget.setCurrentText(value)
+            elif isinstance(widget, QtWidgets.QLineEdit):
+                widget.setText(value or "")
+            elif isinstance(widget, (QtWidgets.QCheckBox, QtWidgets.QGroupBox)):
+                widget.setChecked(value)
+            elif widget is not None:
+                widget.setValue(value)
+        self.region_option = data["region_option"]
+        for button in self.ui.groupButton.buttons():
+            button.setChecked(button.text() == self.region_option)
+        self.x, self.y, self.z = data["box_center"]
+
+        # Results, without reading the results file
+        self.ui.results_file_entry.setText(data["results_file"])
+        self.input_pdb, self.ligand_pdb, self.cavity_pdb = data["models"]
+        self._cavity_source = None
+        self._close_cavity_displays()
+        self.grids = self._grids_from_snapshot(data["grids"])
+        results = self.results = data["results"]
+        if results is not None:
+            self._show_results()
+            self.ui.tabs.setCurrentIndex(2)
+
+    def _grids_snapshot(self):
+        """The loaded cavity grid as sparse runs, with the depth and hydropathy of their points, or None."""
+        if self.grids is None:
+            return None
+        cavities = SparseCavities.from_dense(np.asarray(self.grids["cavities"]))
+        index, _ = cavities.points()
+        snapshot = {"cavities": cavities.state(), "vertices": np.asarray(self.grids["vertices"]), "step": self.grids["step"]}
+        for name in ("depths", "scales"):
+            if name in self.grids:
+                snapshot[name] = np.asarray(self.grids[name]).ravel()[index]
+        return snapshot
+
+    @staticmethod
+    def _grids_from_snapshot(snapshot):
+        """The grids saved by _grids_snapshot, in memory."""
+        if snapshot is None:
+            return None
+        cavities = SparseCavities.from_state(snapshot["cavities"])
+        index, _ = cavities.points()
+        grids = {"cavities": cavities.to_dense(), "vertices": snapshot["vertices"], "step": snapshot["step"]}
+        for name in ("depths", "scales"):
+            if name in snapshot:
+                grid = np.zeros(cavities.shape, dtype=snapshot[name].dtype)
+                grid.ravel()[index] = snapshot[name]
+                grids[name] = grid
+        return grids
 
     def refresh(self, combo_box ) -> None:
         """
@@ -323,16 +482,30 @@ class KVFinder(ToolInstance):
                     combo_box.addItem(item)
             else:
                 print(f"{pdbNames}, {type(pdbNames)}")
+
+        if combo_box == self.ui.compare_input:
+
+            pdbNames = all_atomic_structures(self.session).names
+            if isinstance(pdbNames, np.ndarray):
+                for item in pdbNames:
+                    combo_box.addItem(item)
+            else:
+                print(f"{pdbNames}, {type(pdbNames)}")
         
         return    
     
-    def _run_pyKVFinder(self, atomic, box_adjustment = False):
+    def _ligand_atomic(self):
+        """Atomic array of the ligand and the ligand cutoff in ligand adjustment mode, or (None, 5)."""
+        if self.ui.ligand_adjustment.isChecked() and self.ui.ligand.currentText() != self.ui.input.currentText() and self.ui.ligand.currentText() != "":
+            return self.extract_pdb_session(self.ui.ligand.currentText(), selected=False), self.ui.ligand_cutoff.value()
+        return None, 5
+
+    def _run_pyKVFinder(self, atomic, box_adjustment = False, vertices = None, ligand = None, per_ligand = None):
 
         import time
         print(
             f"\n[==> Running pyKVFinder for: {os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), f'{self.ui.input.currentText()}')}"
         )
-        start = time.time()
         probe_out = self.ui.probe_out.value()
         probe_in = self.ui.probe_in.value()
         removal_distance = self.ui.removal_distance.value()
@@ -340,31 +513,49 @@ class KVFinder(ToolInstance):
         step = self.ui.step_size.value()
         ignore_backbone = True if self.ui.ignore_backbone_checkbox.isChecked() else False
         surface =  'SES' if self.ui.surface.currentText() == 'Solvent Excluded Surface (SES)' else 'SAS'
-        if self.ui.ligand_adjustment.isChecked() and self.ui.ligand.currentText() != self.ui.input.currentText() and self.ui.ligand.currentText() != "":
-            ligand = self.extract_pdb_session(self.ui.ligand.currentText(), selected=False)
-            ligand_cutoff = self.ui.ligand_cutoff.value()
+        if ligand is None:
+            ligand, ligand_cutoff = self._ligand_atomic()
         else:
-            ligand = None
-            ligand_cutoff = 5
+            ligand_cutoff = self.ui.ligand_cutoff.value()
+        if per_ligand is None:
+            per_ligand = self.ui.per_ligand.isChecked()
         if not box_adjustment:
-            vertices = pyKVFinder.get_vertices(atomic, probe_out=probe_out, step=step)
-            ncavs, cavities = pyKVFinder.detect(atomic, vertices, step=step, latomic=ligand, ligand_cutoff = ligand_cutoff, probe_in=probe_in, probe_out=probe_out, removal_distance=removal_distance, volume_cutoff=volume_cutoff, surface=surface)
+            if vertices is None:
+                vertices = pyKVFinder.get_vertices(atomic, probe_out=probe_out, step=step)
+            if not self._check_memory_budget(vertices, step, len(atomic)):
+                return
+            # Only detection is timed, which is what the cost model predicts
+            start = time.time()
+            if self.ui.multiresolution.isChecked():
+                ncavs, cavities = detect_multiresolution(atomic, vertices, step=step, coarse_step=self.ui.coarse_step.value(), latomic=ligand, ligand_cutoff=ligand_cutoff, probe_in=probe_in, probe_out=probe_out, removal_distance=removal_distance, volume_cutoff=volume_cutoff, surface=surface)
+            elif self.ui.tiled_detection.isChecked():
+                ncavs, cavities = detect_tiled(atomic, vertices, step=step, latomic=ligand, ligand_cutoff=ligand_cutoff, probe_in=probe_in, probe_out=probe_out, removal_distance=removal_distance, volume_cutoff=volume_cutoff, surface=surface, tile_size=self.ui.tile_size.value())
+            else:
+                ncavs, cavities = pyKVFinder.detect(atomic, vertices, step=step, latomic=ligand, ligand_cutoff = ligand_cutoff, probe_in=probe_in, probe_out=probe_out, removal_distance=removal_distance, volume_cutoff=volume_cutoff, surface=surface)
         else:
             fn = os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), "parameters.toml")
             print(fn)
             vertices, atomic = pyKVFinder.get_vertices_from_file(fn, atomic, step=step, probe_in=probe_in, probe_out=probe_out)
+            if not self._check_memory_budget(vertices, step, len(atomic)):
+                return
+            start = time.time()
             ncavs, cavities = pyKVFinder.detect(atomic, vertices, step=step, latomic=ligand, ligand_cutoff = ligand_cutoff, probe_in=probe_in, probe_out=probe_out, removal_distance=removal_distance, volume_cutoff=volume_cutoff, box_adjustment=True, surface=surface)
         elapsed_time = time.time() - start
         print(f"> Cavities detected: {ncavs}")
-        print(f"> Elapsed time: {elapsed_time:.2f} seconds")
+        print(f"> Detection time: {elapsed_time:.2f} seconds")
 
                     # Load successfull run
         self.ui.results_file_entry.setText(
-            f"{os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), f'{self.ui.base_name.text()}.KVFinder.results.toml')}"
+            f"{os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), f'{self.ui.base_name.text()}.KVFinder.results.npz')}"
         )
 
         if ncavs > 0:
             self.ui.tabs.setCurrentIndex(2)
+            # Only the box around the cavities and the points next to them is
+            # characterized, exported and stored (see sparse)
+            grid_size = cavities.size
+            cavities, origin = SparseCavities.from_dense(cavities).crop()
+            vertices = subgrid_vertices(vertices, step, origin, cavities.shape)
             surface, volume, area, residues, scales, avg_hydropathy, depths, max_depth, avg_depth, frequencies = self.characterization(cavities=cavities, step=step, atomic=atomic, vertices=vertices, probe_in=probe_in, ignore_backbone=ignore_backbone)
             
             if os.path.exists(
@@ -387,9 +578,32 @@ class KVFinder(ToolInstance):
                 f"{os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), f'{self.ui.base_name.text()}.KVFinder.results.toml')}"
             )
 
+            # Binary copy of the results, read by load_results, and the
+            # grids as .npy files that load_results memory-maps
+            results_npz = os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), f'{self.ui.base_name.text()}.KVFinder.results.npz')
+            write_binary_results(
+                results_npz, input=pdb, ligand=None, output=output_cavity, volume=volume, area=area,
+                max_depth=max_depth, avg_depth=avg_depth, avg_hydropathy=avg_hydropathy, residues=residues, step=step,
+            )
+            write_grids(results_prefix(results_npz), cavities, vertices, step, depths=depths, scales=scales)
+
+            # Add this run to the results catalog
+            self._catalog_results(
+                f"{os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), f'{self.ui.base_name.text()}.KVFinder.results.toml')}"
+            )
 
+            # Calibrate the cost model with the detection time of this run;
+            # only single detections on the whole grid follow its runtime
+            # model, unlike multiresolution and tiled detection
+            if box_adjustment or not (self.ui.multiresolution.isChecked() or self.ui.tiled_detection.isChecked()):
+                cost_model = self._get_cost_model()
+                cost_model.add_sample(grid_size, len(atomic), elapsed_time)
+                cost_model.save(self._cost_model_file())
 
             self.load_results()
+
+            if ligand is not None and per_ligand:
+                self._ligand_pockets(cavities, depths, scales, atomic, vertices, step, ligand_residues(ligand), ligand_cutoff, probe_in, ignore_backbone)
         elif ncavs == 0:
             QtWidgets.QMessageBox.warning(self.tool_window, "Warning!", "No cavities found!")
     
@@ -399,30 +613,21 @@ class KVFinder(ToolInstance):
 
         """
         if self.save_parameters():
-            model = self._get_model(self.ui.input.currentText())
-            spec = model.atomspec
-            if self.ui.box_adjustment.isChecked():
-                atomic = self.extract_pdb_session(selected=False, name=self.ui.input.currentText())
-                self._run_pyKVFinder(atomic, box_adjustment = True)
-            elif self.region_option == "Default":
-                atomic = self.extract_pdb_session(selected=False, name=self.ui.input.currentText())
-                self._run_pyKVFinder(atomic)
-            elif self.region_option == "Selected":
-                atomic = self.extract_pdb_session(selected=True, name=self.ui.input.currentText())
-                self._run_pyKVFinder(atomic)              
-            elif self.region_option == "Protein":
-                run(self.session, f"sel {spec} & protein")
-                atomic = self.extract_pdb_session(selected=True, name=self.ui.input.currentText())
-                self._run_pyKVFinder(atomic)    
-            elif self.region_option == "All ligands without solvent":
-                run(self.session, f"sel {spec} & ~solvent")
-                atomic = self.extract_pdb_session(selected=True, name=self.ui.input.currentText())
-                self._run_pyKVFinder(atomic)    
-            else:
-
+            selected = self._select_region()
+            if selected is None:
                 QtWidgets.QMessageBox.critical(
                     self.tool_window, "Error!", "An error occurred during cavity detection!"
-                )             
+                )
+                return
+
+            if self.ui.ligand_adjustment.isChecked() and self.ui.auto_ligands.isChecked() and not self.ui.box_adjustment.isChecked():
+                self._run_ligand_residues()
+                return
+
+            # In box and ligand modes, only the atoms around the search space are extracted
+            vertices = self._search_space(self.ui.input.currentText(), selected)
+            atomic = self.extract_pdb_session(selected=selected, name=self.ui.input.currentText(), vertices=vertices)
+            self._run_pyKVFinder(atomic, box_adjustment = self.ui.box_adjustment.isChecked(), vertices = vertices)
 
         else:
             from PyQt5.QtWidgets import QMessageBox
@@ -433,13 +638,328 @@ class KVFinder(ToolInstance):
                 "An error occurred while creating the parameters file! Check the parKVFinder parameters!",
             )
 
+    def _ligand_pockets(self, cavities, depths, scales, atomic, vertices, step, ligands, ligand_cutoff, probe_in, ignore_backbone) -> None:
+        """Characterize the pocket of each ligand, write <base_name>.ligands.csv
+        and fill the Ligand Pockets table of the Results tab."""
+        import time
+        start = time.time()
+        rows = ligand_pockets(cavities, depths, scales, atomic, vertices, step, ligands, ligand_cutoff=ligand_cutoff, probe_in=probe_in, ignore_backbone=ignore_backbone)
+        print(f"> Ligand pockets: {len(ligands)} ligand(s) in {time.time() - start:.2f} seconds")
+
+        output = os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), f'{self.ui.base_name.text()}.ligands.csv')
+        write_ligand_table(rows, output)
+        print(f"> Ligand pockets table: {output}")
+
+        self.ui.ligand_table.setSortingEnabled(False)
+        self.ui.ligand_table.setRowCount(0)
+        self.ui.ligand_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, column in enumerate(LIGAND_COLUMNS):
+                item = QtWidgets.QTableWidgetItem()
+                value = len(row[column]) if column == "residues" else row[column]
+                item.setData(QtCore.Qt.DisplayRole, value)
+                self.ui.ligand_table.setItem(i, j, item)
+        self.ui.ligand_table.setSortingEnabled(True)
+        self.ui.ligand_pockets.setVisible(True)
+
+    def _run_ligand_residues(self) -> None:
+        """Detect and characterize the pocket of every ligand residue of the input.
+
+        Ligand residues are the residues that are neither solvent, ions,
+        protein nor nucleic acid. Cavities are detected once on the protein
+        and nucleic acid atoms, on the part of the grid around the ligands,
+        and each residue is then analyzed as in `_ligand_pockets`. The atoms
+        are picked with temporary selections; the selection of the user is
+        restored afterwards.
+        """
+        name = self.ui.input.currentText()
+        spec = self._get_model(name).atomspec
+
+        previous = selected_atoms(self.session)
+        try:
+            run(self.session, f"sel {spec} & ~solvent & ~ions & ~protein & ~nucleic")
+            ligand = self.extract_pdb_session(name, selected=True)
+            if len(ligand) == 0:
+                QtWidgets.QMessageBox.warning(self.tool_window, "Warning!", "No ligand residues found in the input structure!")
+                return
+            print(f"> Ligand residues: {len(ligand_residues(ligand))}")
+
+            run(self.session, f"sel {spec} & ~solvent & (protein | nucleic)")
+            margin = search_margin(self.ui.probe_out.value(), self.ui.removal_distance.value())
+            vertices = vertices_from_coords(self._session_atoms(name, selected=True).coords, probe_out=self.ui.probe_out.value(), step=self.ui.step_size.value())
+            vertices = subgrid_around(vertices, self.ui.step_size.value(), ligand[:, 4:7].astype(np.float64), self.ui.ligand_cutoff.value() + margin)
+            atomic = self.extract_pdb_session(name, selected=True, vertices=vertices)
+        finally:
+            run(self.session, "sel clear")
+            previous.selected = True
+        self._run_pyKVFinder(atomic, vertices=vertices, ligand=ligand, per_ligand=True)
+
+    def track_cavities(self) -> None:
+        """Detect cavities in every coordinate set of the input model and
+        follow them across frames with stable track IDs.
+
+        All frames share one grid enclosing every frame (or the box in box
+        adjustment mode). The time series of each track are written to
+        <base_name>.tracks.csv and a per-track summary is shown in the Batch
+        tab.
+        """
+        from PyQt5.QtWidgets import QMessageBox
+
+        name = self.ui.input.currentText()
+        structure = self._get_model(name)
+        if not structure or len(getattr(structure, "coordset_ids", [])) < 2:
+            QMessageBox.warning(self.tool_window, "Warning!", "The input model must have more than one coordinate set!")
+            return
+
+        if not self.save_parameters():
+            QMessageBox.critical(
+                self.tool_window,
+                "Error",
+                "An error occurred while creating the parameters file! Check the parKVFinder parameters!",
+            )
+            return
+
+        selected = self._select_region()
+        if selected is None:
+            QMessageBox.critical(self.tool_window, "Error!", "An error occurred during cavity detection!")
+            return
+
+        import time
+        start = time.time()
+        atoms = self._session_atoms(name, selected)
+        atomic = self.extract_pdb_session(name, selected=selected)
+        coord_indices = atoms.coord_indices
+        ids = list(structure.coordset_ids)
+
+        def frames():
+            for cs_id in ids:
+                yield structure.coordset(cs_id).xyzs[coord_indices]
+
+        probe_out = self.ui.probe_out.value()
+        box_adjustment = self.ui.box_adjustment.isChecked()
+        if box_adjustment:
+            # Same box as in _run_pyKVFinder; every atom is kept, since atoms
+            # outside the box in the first frame may enter it later
+            fn = os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), "parameters.toml")
+            vertices, _ = pyKVFinder.get_vertices_from_file(fn, atomic, step=self.ui.step_size.value(), probe_in=self.ui.probe_in.value(), probe_out=probe_out)
+        else:
+            lower = np.min([coords.min(axis=0) for coords in frames()], axis=0)
+            upper = np.max([coords.max(axis=0) for coords in frames()], axis=0)
+            vertices = vertices_from_coords(np.array([lower, upper]), probe_out=probe_out, step=self.ui.step_size.value())
+
+        print(f"\n[==> Tracking cavities of {name} over {len(ids)} frames")
+        surface = 'SES' if self.ui.surface.currentText() == 'Solvent Excluded Surface (SES)' else 'SAS'
+        tracker = track_frames(
+            atomic, frames(), vertices, step=self.ui.step_size.value(), probe_in=self.ui.probe_in.value(),
+            probe_out=probe_out, removal_distance=self.ui.removal_distance.value(),
+            volume_cutoff=self.ui.volume_cutoff.value(), surface=surface, box_adjustment=box_adjustment,
+            min_overlap=self.ui.min_overlap.value(), max_gap=self.ui.max_gap.value(),
+        )
+        print(f"> Tracks: {tracker.ntracks}")
+        print(f"> Elapsed time: {time.time() - start:.2f} seconds")
+
+        output = os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), f'{self.ui.base_name.text()}.tracks.csv')
+        write_track_table(tracker.rows(), output)
+        print(f"> Tracks table: {output}")
+
+        summary = tracker.summary()
+        columns = ["track", "first_frame", "last_frame", "frames", "mean_volume", "max_volume"]
+        self.ui.track_table.setSortingEnabled(False)
+        self.ui.track_table.setRowCount(0)
+        self.ui.track_table.setRowCount(len(summary))
+        for i, row in enumerate(summary):
+            for j, column in enumerate(columns):
+                item = QtWidgets.QTableWidgetItem()
+                item.setData(QtCore.Qt.DisplayRole, row[column])
+                self.ui.track_table.setItem(i, j, item)
+        self.ui.track_table.setSortingEnabled(True)
+
+    def compare_structures(self) -> None:
+        """Detect cavities of the input and comparison models on one grid
+        and show where cavity space is shared, lost and gained.
+
+        Both models must already be superposed (e.g. with matchmaker). The
+        grid is the box in box adjustment mode, otherwise the grid enclosing
+        both models. Per-cavity overlaps and volume changes are written to
+        <base_name>.compare.csv and shown in the Batch tab; the difference is
+        exported to <base_name>.compare.pdb, with shared points in gray
+        (KAA), lost points in red (KAB) and gained points in green (KAC).
+        """
+        from PyQt5.QtWidgets import QMessageBox
+
+        name = self.ui.input.currentText()
+        other = self.ui.compare_input.currentText()
+        if not self._get_model(name) or not self._get_model(other) or name == other:
+            QMessageBox.warning(self.tool_window, "Warning!", "Select two different models to compare!")
+            return
+
+        if not self.save_parameters():
+            QMessageBox.critical(
+                self.tool_window,
+                "Error",
+                "An error occurred while creating the parameters file! Check the parKVFinder parameters!",
+            )
+            return
+
+        import time
+        start = time.time()
+        atomic_a = self.extract_pdb_session(name, selected=False)
+        atomic_b = self.extract_pdb_session(other, selected=False)
+        step = self.ui.step_size.value()
+        probe_in = self.ui.probe_in.value()
+        probe_out = self.ui.probe_out.value()
+        box_adjustment = self.ui.box_adjustment.isChecked()
+        if box_adjustment:
+            # Same box and atoms around it as in _run_pyKVFinder
+            fn = os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), "parameters.toml")
+            vertices, atomic_a = pyKVFinder.get_vertices_from_file(fn, atomic_a, step=step, probe_in=probe_in, probe_out=probe_out)
+            _, atomic_b = pyKVFinder.get_vertices_from_file(fn, atomic_b, step=step, probe_in=probe_in, probe_out=probe_out)
+        else:
+            coords = np.concatenate([atomic_a[:, 4:7], atomic_b[:, 4:7]]).astype(np.float64)
+            vertices = vertices_from_coords(coords, probe_out=probe_out, step=step)
+
+        print(f"\n[==> Comparing cavities of {name} and {other}")
+        surface = 'SES' if self.ui.surface.currentText() == 'Solvent Excluded Surface (SES)' else 'SAS'
+        cavities_a, cavities_b, summary, rows = compare_structures(
+            atomic_a, atomic_b, vertices, step=step, probe_in=probe_in,
+            probe_out=probe_out, removal_distance=self.ui.removal_distance.value(),
+            volume_cutoff=self.ui.volume_cutoff.value(), surface=surface, box_adjustment=box_adjustment,
+        )
+        print(f"> Cavities: {summary['ncavs_a']} ({name}), {summary['ncavs_b']} ({other})")
+        print(f"> Shared volume: {summary['shared_volume']}")
+        print(f"> Lost volume: {summary['lost_volume']}")
+        print(f"> Gained volume: {summary['gained_volume']}")
+        print(f"> Elapsed time: {time.time() - start:.2f} seconds")
+
+        base_name = self.ui.base_name.text()
+        output = os.path.join(self.ui.output_dir_path.text(), 'KV_Files', base_name, f'{base_name}.compare.csv')
+        write_compare_table(rows, output)
+        print(f"> Comparison table: {output}")
+
+        columns = ["structure", "cavity", "volume", "shared_volume", "match", "jaccard", "volume_delta"]
+        labels = {"A": name, "B": other}
+        self.ui.compare_table.setSortingEnabled(False)
+        self.ui.compare_table.setRowCount(0)
+        self.ui.compare_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, column in enumerate(columns):
+                item = QtWidgets.QTableWidgetItem()
+                item.setData(QtCore.Qt.DisplayRole, labels[row[column]] if column == "structure" else row[column])
+                self.ui.compare_table.setItem(i, j, item)
+        self.ui.compare_table.setSortingEnabled(True)
+
+        # Colored overlay of the difference, exported from the box around it
+        points = difference(cavities_a, cavities_b)
+        if len(points.starts) == 0:
+            return
+        grid, origin = points.crop(margin=1)
+        overlay = os.path.join(self.ui.output_dir_path.text(), 'KV_Files', base_name, f'{base_name}.compare.pdb')
+        surface_points, _, _ = pyKVFinder.spatial(grid, step=step)
+        pyKVFinder.export(overlay, grid, surface_points, subgrid_vertices(vertices, step, origin, grid.shape), step=step)
+        self.load_file(overlay, os.path.basename(overlay))
+        spec = self._get_model(os.path.basename(overlay)).atomspec
+        names = {SHARED: "gray", LOST: "red", GAINED: "green"}
+        run(self.session, "; ".join(f"color {spec}:{cavity_name(label - 2)} {color}" for label, color in names.items()))
+
+    def _select_region(self):
+        """Select the atoms of the chosen region in the input model.
+
+        Returns
+        -------
+        bool or None
+            Whether the selected atoms (True) or all atoms of the model
+            (False) must be extracted, or None for an unknown region.
+        """
+        model = self._get_model(self.ui.input.currentText())
+        spec = model.atomspec
+        if self.ui.box_adjustment.isChecked():
+            return False
+        elif self.region_option == "Default":
+            return False
+        elif self.region_option == "Selected":
+            return True
+        elif self.region_option == "Protein":
+            run(self.session, f"sel {spec} & protein")
+            return True
+        elif self.region_option == "All ligands without solvent":
+            run(self.session, f"sel {spec} & ~solvent")
+            return True
+        return None
+
+    def run_sweep(self) -> None:
+        """Detect cavities for every combination of the parameter ranges of
+        the Batch tab and show the cavity count and volumes of each one.
+
+        Atoms are extracted once. In box adjustment mode every combination
+        uses the internal box of the current Probe Out; otherwise the
+        whole-structure grid of each Probe Out is used.
+        """
+        from PyQt5.QtWidgets import QMessageBox
+
+        try:
+            ranges = {
+                parameter: parse_range(getattr(self.ui, f"sweep_{parameter}").text())
+                for parameter in ("probe_in", "probe_out", "removal_distance", "volume_cutoff")
+            }
+        except ValueError as error:
+            QMessageBox.critical(self.tool_window, "Error", f"Invalid parameter range! {error}")
+            return
+
+        if not self.save_parameters():
+            QMessageBox.critical(
+                self.tool_window,
+                "Error",
+                "An error occurred while creating the parameters file! Check the parKVFinder parameters!",
+            )
+            return
+
+        selected = self._select_region()
+        if selected is None:
+            QMessageBox.critical(self.tool_window, "Error!", "An error occurred during cavity detection!")
+            return
+
+        import time
+        start = time.time()
+        name = self.ui.input.currentText()
+        vertices = None
+        if self.ui.box_adjustment.isChecked():
+            vertices = self._search_space(name, selected)
+        margin = search_margin(max(ranges["probe_out"]), max(ranges["removal_distance"]))
+        atomic = self.extract_pdb_session(name, selected=selected, vertices=vertices, margin=margin)
+        ligand, ligand_cutoff = self._ligand_atomic()
+        surface = 'SES' if self.ui.surface.currentText() == 'Solvent Excluded Surface (SES)' else 'SAS'
+
+        ncombinations = len(ranges["probe_in"]) * len(ranges["probe_out"]) * len(ranges["removal_distance"])
+        print(f"\n[==> Running parameter sweep for {name}: {ncombinations} detection(s)")
+        rows = sweep(
+            atomic, step=self.ui.step_size.value(), vertices=vertices, latomic=ligand,
+            ligand_cutoff=ligand_cutoff, surface=surface, box_adjustment=self.ui.box_adjustment.isChecked(),
+            engine="edt" if self.ui.sweep_engine.currentIndex() == 1 else "detect", **ranges
+        )
+        print(f"> Elapsed time: {time.time() - start:.2f} seconds")
+
+        output = os.path.join(self.ui.output_dir_path.text(), 'KV_Files', self.ui.base_name.text(), f'{self.ui.base_name.text()}.sweep.csv')
+        write_table(rows, output)
+        print(f"> Sweep table: {output}")
+
+        # Numeric items so that columns sort by value
+        self.ui.sweep_table.setSortingEnabled(False)
+        self.ui.sweep_table.setRowCount(0)
+        self.ui.sweep_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, column in enumerate(SWEEP_COLUMNS[:-1]):
+                item = QtWidgets.QTableWidgetItem()
+                item.setData(QtCore.Qt.DisplayRole, row[column])
+                self.ui.sweep_table.setItem(i, j, item)
+        self.ui.sweep_table.setSortingEnabled(True)
+
     def load_results(self) -> None:
 
         # Get results file
         results_file = self.ui.results_file_entry.text()
 
         # Check if results file exist
-        if os.path.exists(results_file) and results_file.endswith(".toml"):
+        if os.path.exists(results_file) and results_file.endswith((".toml", ".npz")):
             print(f"> Loading results from: {self.ui.results_file_entry.text()}")
         else:
             from PyQt5.QtWidgets import QMessageBox
@@ -452,8 +972,8 @@ class KVFinder(ToolInstance):
         # Create global variable for results
         global results
 
-        # Read results (Ubuntu/macOS)
-        results = toml.load(results_file)
+        # Read results (Ubuntu/macOS); binary results files are read without parsing TOML
+        results = self.results = read_results(results_file)
 
         if "FILES" in results.keys():
             results["FILES_PATH"] = results.pop("FILES")
@@ -469,29 +989,13 @@ class KVFinder(ToolInstance):
             )
             return False
 
-        # # Clean results
-        self.clean_results()
-
-        # # Refresh information
-        self.refresh_information()
-
-        # # Refresh volume
-        self.refresh_volume()
-
-        # # Refresh area
-        self.refresh_area()
-
-        # # Refresh depth
-        self.refresh_avg_depth()
-        self.refresh_max_depth()
-        self.refresh_avg_hydropathy()
-
-        # # Refresh residues
-        self.refresh_residues()
-
-        # # Set default view in results
-        self.ui.default_view.setChecked(True)
+        # Memory-map the grids of the run, when they were saved
+        self._close_cavity_displays()
+        self.grids = read_grids(results_prefix(results_file))
+        if self.grids is not None:
+            print(f"> Grids: {self.grids['cavities'].shape} points, step {self.grids['step']}")
 
+        self._show_results()
 
         # # Load files as PyMOL objects
         # cmd.delete("cavities")
@@ -499,11 +1003,10 @@ class KVFinder(ToolInstance):
         # cmd.frame(1)
 
         # Load input
-        models_loaded = [model.name for model in self.session.models]
         if "INPUT" in results["FILES_PATH"].keys():
             input_fn = results["FILES_PATH"]["INPUT"]
             self.input_pdb = os.path.basename(input_fn)
-            if os.path.split(input_fn)[-1] not in models_loaded:
+            if self._get_model(self.input_pdb) is None:
                 self.load_file(input_fn, self.input_pdb)
         else:
             self.input_pdb = None
@@ -512,27 +1015,274 @@ class KVFinder(ToolInstance):
         if "LIGAND" in results["FILES_PATH"].keys():
             ligand_fn = results["FILES_PATH"]["LIGAND"]
             self.ligand_pdb = os.path.basename(ligand_fn)
-            if os.path.split(ligand_fn)[-1] not in models_loaded:
+            if self._get_model(self.ligand_pdb) is None:
                 self.load_file(ligand_fn, self.ligand_pdb)
         else:
             self.ligand_pdb = None
 
-        # Load cavity
-        cavity_fn = results["FILES_PATH"]["OUTPUT"]
-        self.cavity_pdb = os.path.basename(cavity_fn)
-        if os.path.split(cavity_fn)[-1] not in models_loaded:
-            self.load_file(cavity_fn, self.cavity_pdb)
+        # Load cavity; with the grids, volumes and meshes do not need the
+        # points, so the cavity PDB is only opened when they are displayed
+        self.cavity_pdb = os.path.basename(results["FILES_PATH"]["OUTPUT"])
+        if self.grids is None or self.ui.cavity_display.currentText() == "Points":
+            model = self._get_model(self.cavity_pdb)
+            if model is not None and self._load_cavity_points() is model:
+                # Kept from the last load, so back to the default view
+                model.atoms.colors = NO_CAVITY_COLOR
         else:
-            models = all_objects(self.session).models
-            for model in models:
-                if model.name == self.cavity_pdb:
-                    model.delete()
-                    self.load_file(cavity_fn, self.cavity_pdb)
+            self._delete_models(self.cavity_pdb)
         # style.style(self.session, model, atom_style='ball', dashes=5)
         # run(self.session, f"surface {model.atomspec}; transparency 50")
 
+        if self.ui.cavity_display.currentText() != "Points":
+            self.set_cavity_display()
+
         return
 
+    def set_cavity_display(self) -> None:
+        """Callback for the "Cavity display" combo box: show the cavities of
+        the loaded results as the points of the cavity PDB or as a volume.
+
+        The cavity PDB is opened the first time the points are displayed,
+        and the colors of the selected cavities or view are applied to them.
+        """
+        model = self._get_model(self.cavity_pdb) if self.cavity_pdb else None
+        mode = self.ui.cavity_display.currentText()
+        if self.cavity_volume is not None and not self.cavity_volume.deleted:
+            self.cavity_volume.display = mode == "Volume"
+        if self.cavity_meshes is not None and not self.cavity_meshes.deleted:
+            self.cavity_meshes.display = mode == "Mesh"
+        if mode == "Volume" and self._show_cavity_volume() is None:
+            self.ui.cavity_display.setCurrentText("Points")
+            return
+        if mode == "Mesh" and not self._show_cavity_meshes():
+            self.ui.cavity_display.setCurrentText("Points")
+            return
+        if mode == "Points" and self.results is not None:
+            points = self._load_cavity_points()
+            if points is not model:
+                self._color_cavity_points()
+            model = points
+        if model:
+            model.display = mode == "Points"
+
+    def _load_cavity_points(self) -> None | AtomicStructure:
+        """The cavity model of the loaded results, opening the cavity PDB if needed.
+
+        An open cavity model is kept while its cavity PDB is unchanged, so
+        loading the same results again does not parse it again.
+
+        Returns
+        -------
+        AtomicStructure or None
+            None when the cavity PDB could not be opened.
+        """
+        cavity_fn = self.results["FILES_PATH"]["OUTPUT"]
+        source = (cavity_fn, os.path.getmtime(cavity_fn) if os.path.exists(cavity_fn) else None)
+        model = self._get_model(self.cavity_pdb)
+        # Models restored from a session have no source and are kept
+        if model is None or self._cavity_source not in (None, source):
+            self._delete_models(self.cavity_pdb)
+            self.load_file(cavity_fn, self.cavity_pdb)
+            model = self._get_model(self.cavity_pdb)
+        self._cavity_source = source
+        return model
+
+    def _color_cavity_points(self) -> None:
+        """Color a newly opened cavity model as the selected cavities and view."""
+        if self._selected_cavities:
+            self.select_cavities()
+        elif self.ui.depth_view.isChecked():
+            self.show_depth_view()
+        elif self.ui.hydropathy_view.isChecked():
+            self.show_hydropathy_view()
+
+    def _show_cavity_volume(self):
+        """Show the cavity grid of the loaded results as a volume, created on first use.
+
+        The volume wraps the (memory-mapped) label grid without copying it.
+        Its surface at level 1.5 encloses the cavity points, and each vertex
+        gets the color of its cavity, so drawing costs follow the surface
+        size rather than the number of points.
+
+        Returns
+        -------
+        chimerax.map.Volume or None
+            The volume, or None when no cavity grid was saved with the results.
+        """
+        from PyQt5.QtWidgets import QMessageBox
+
+        if self.cavity_volume is not None and not self.cavity_volume.deleted:
+            self.cavity_volume.display = True
+            return self.cavity_volume
+        if self.grids is None:
+            QMessageBox.warning(self.tool_window, "Warning!", "No cavity grid was saved with these results!")
+            return None
+
+        from chimerax.map import volume_from_grid_data
+        from chimerax.map_data import ArrayGridData
+
+        cavities, vertices, step = self.grids["cavities"], self.grids["vertices"], self.grids["step"]
+        origin, axes = grid_axes(vertices)
+        name = f"{os.path.basename(results_prefix(self.ui.results_file_entry.text()))}.cavities"
+        # Maps are indexed (z, y, x): the transpose is a view of the grid
+        data = ArrayGridData(
+            cavities.T, origin=tuple(origin), step=(step, step, step),
+            rotation=tuple(tuple(row) for row in axes.T), name=name,
+        )
+        volume = volume_from_grid_data(data, self.session, style="surface", show_dialog=False)
+        volume.set_parameters(surface_levels=[1.5], surface_colors=[(1.0, 1.0, 1.0, 1.0)])
+        surface = volume.surfaces[0]
+
+        def color_by_cavity():
+            if surface.vertices is not None and len(surface.vertices):
+                surface.vertex_colors = cavity_colors(vertex_labels(cavities, surface.vertices, vertices, step))
+
+        # Called again by ChimeraX whenever the surface is recomputed
+        surface.auto_recolor_vertices = color_by_cavity
+        color_by_cavity()
+        self.cavity_volume = volume
+        return volume
+
+    def delete(self):
+        if self._lod_handler is not None:
+            self.session.triggers.remove_handler(self._lod_handler)
+            self._lod_handler = None
+        for handler in self._model_handlers:
+            self.session.triggers.remove_handler(handler)
+        self._model_handlers = []
+        super().delete()
+
+    def set_level_of_detail(self, *args) -> None:
+        """Callback for the "Level of detail" check box and point budget.
+
+        While enabled, a "new frame" handler watches the camera: when it
+        moves, a cavity model with more points than the budget only shows
+        the points of display.lod_mask, and full detail comes back once the
+        camera has been still for a moment.
+        """
+        self._restore_detail()
+        self._lod_subset = None
+        if self.ui.level_of_detail.isChecked() and self._lod_handler is None:
+            self._lod_camera = None
+            self._lod_handler = self.session.triggers.add_handler("new frame", self._lod_frame)
+        elif not self.ui.level_of_detail.isChecked() and self._lod_handler is not None:
+            self.session.triggers.remove_handler(self._lod_handler)
+            self._lod_handler = None
+
+    def _lod_frame(self, trigger_name, data) -> None:
+        position = self.session.main_view.camera.position.matrix
+        moved = self._lod_camera is not None and not np.array_equal(position, self._lod_camera)
+        self._lod_camera = position.copy()
+        if not moved:
+            return
+        if self._lod_displays is None:
+            model = self._get_model(self.cavity_pdb) if self.cavity_pdb else None
+            if model is None or not model.display or len(model.atoms) <= self.ui.lod_budget.value():
+                return
+            atoms = model.atoms
+            if self._lod_subset is None or len(self._lod_subset) != len(atoms):
+                step = self.results["PARAMETERS"]["STEP"] if self.results and "PARAMETERS" in self.results else self.ui.step_size.value()
+                self._lod_subset = lod_mask(atoms.coords, atoms.names == "HA", self.ui.lod_budget.value(), step)
+            self._lod_displays = atoms.displays.copy()
+            atoms.displays = self._lod_displays & self._lod_subset
+        # Full detail once the camera stops
+        self._lod_timer.start()
+
+    def _restore_detail(self) -> None:
+        if self._lod_displays is None:
+            return
+        model = self._get_model(self.cavity_pdb) if self.cavity_pdb else None
+        if model is not None and len(model.atoms) == len(self._lod_displays):
+            model.atoms.displays = self._lod_displays
+        self._lod_displays = None
+
+    def _close_cavity_displays(self) -> None:
+        self._restore_detail()
+        self._lod_subset = None
+        self._cavity_atoms = None
+        self._view_colors = {}
+        if self.cavity_volume is not None and not self.cavity_volume.deleted:
+            self.cavity_volume.delete()
+        self.cavity_volume = None
+        if self.cavity_meshes is not None and not self.cavity_meshes.deleted:
+            self.cavity_meshes.delete()
+        self.cavity_meshes = None
+
+    def _mesh_key(self):
+        """Key of the loaded run in the mesh cache: results file and time of its cavity grid."""
+        results_file = self.ui.results_file_entry.text()
+        fn = grid_file(results_prefix(results_file), "cavities")
+        return (results_file, os.path.getmtime(fn) if os.path.exists(fn) else None)
+
+    def _show_cavity_meshes(self) -> bool:
+        """Show one mesh per cavity of the loaded results, computing them in the background.
+
+        Meshes are computed once per run by a MeshWorker and cached, so
+        switching back to them only toggles the display of the model.
+
+        Returns
+        -------
+        bool
+            False when no cavity grid was saved with the results.
+        """
+        from PyQt5.QtWidgets import QMessageBox
+
+        if self.cavity_meshes is not None and not self.cavity_meshes.deleted:
+            self.cavity_meshes.display = True
+            return True
+        if self.grids is None:
+            QMessageBox.warning(self.tool_window, "Warning!", "No cavity grid was saved with these results!")
+            return False
+
+        key = self._mesh_key()
+        if key in self._mesh_cache:
+            self._draw_cavity_meshes(key, self._mesh_cache[key])
+        elif self._mesh_worker is None or not self._mesh_worker.isRunning():
+            print("> Computing cavity meshes in the background")
+            self._mesh_worker = MeshWorker(key, self.grids["cavities"], self.grids["vertices"], self.grids["step"])
+            self._mesh_worker.meshes_ready.connect(self._draw_cavity_meshes)
+            self._mesh_worker.start()
+        return True
+
+    def _draw_cavity_meshes(self, key, meshes) -> None:
+        """Cache the meshes of a run and draw them as one submodel per cavity."""
+        from chimerax.core.models import Model
+        from chimerax.shape.shape import _show_surface
+
+        self._mesh_cache[key] = meshes
+        # Results or display mode may have changed while the meshes were computed
+        if self.ui.cavity_display.currentText() != "Mesh":
+            return
+        if key != self._mesh_key():
+            self._show_cavity_meshes()
+            return
+        if self.cavity_meshes is not None and not self.cavity_meshes.deleted:
+            self.cavity_meshes.delete()
+
+        name = f"{os.path.basename(results_prefix(self.ui.results_file_entry.text()))}.meshes"
+        group = Model(name, self.session)
+        self.session.models.add([group])
+        for label, (varray, tarray) in sorted(meshes.items()):
+            color = tuple(int(c) for c in cavity_colors([label])[0])
+            _show_surface(self.session, varray=varray, tarray=tarray, color=color, mesh=False,
+                    center=None, rotation=None, qrotation=None, coordinate_system=None,
+                    slab=None, model_id=group.id + (label - 1,), shape_name=cavity_name(label - 2))
+        self.cavity_meshes = group
+
+    def _show_results(self) -> None:
+        """Fill the Results tab with the loaded results."""
+        # # Clean results
+        self.clean_results()
+
+        # # Refresh information
+        self.refresh_information()
+
+        # # Refresh descriptors
+        self.refresh_descriptors()
+
+        # # Set default view in results
+        self.ui.default_view.setChecked(True)
+
     def characterization(self, cavities, step, atomic, vertices, probe_in, ignore_backbone):
 
         surface, volume, area = pyKVFinder.spatial(cavities, step=step)
@@ -542,6 +1292,185 @@ class KVFinder(ToolInstance):
         depths, max_depth, avg_depth = pyKVFinder.depth(cavities, step=step)
 
         return surface, volume, area, residues, scales, avg_hydropathy, depths, max_depth, avg_depth, frequencies
+
+    def _cost_model_file(self) -> str:
+        return os.path.join(self.ui.output_dir_path.text(), "KV_Files", "cost_model.json")
+
+    def _get_cost_model(self) -> CostModel:
+        """Cost model of the output directory, read from its file once.
+
+        Runs add their samples to this instance before saving it, so it
+        stays in step with the file.
+        """
+        fn = self._cost_model_file()
+        if self._cost_model is None or self._cost_model[0] != fn:
+            self._cost_model = (fn, CostModel.load(fn))
+        return self._cost_model[1]
+
+    def _catalog_file(self) -> str:
+        return os.path.join(self.ui.output_dir_path.text(), "KV_Files", "catalog.sqlite")
+
+    def _catalog_results(self, results_file) -> None:
+        """Add a results file to the results catalog; a failure only prints a warning."""
+        import sqlite3
+
+        try:
+            with Catalog(self._catalog_file()) as catalog:
+                catalog.ingest(results_file)
+        except (sqlite3.Error, OSError) as error:
+            print(f"> Warning: results not added to the catalog: {error}")
+
+    def import_catalog(self) -> None:
+        """Callback for the "Import Results" button: add every results file
+        under KV_Files that is new or changed to the results catalog."""
+        import sqlite3
+        from PyQt5.QtWidgets import QMessageBox
+
+        try:
+            with Catalog(self._catalog_file()) as catalog:
+                count = catalog.scan(os.path.join(self.ui.output_dir_path.text(), "KV_Files"))
+                total = len(catalog)
+        except (sqlite3.Error, OSError) as error:
+            QMessageBox.critical(self.tool_window, "Error!", f"Could not update the results catalog: {error}")
+            return
+        print(f"> Results files imported into the catalog: {count} ({total} cavities)")
+
+    def search_catalog(self) -> None:
+        """Callback for the "Search" button: query the results catalog of
+        every run under KV_Files and show the matching cavities."""
+        import sqlite3
+        from PyQt5.QtWidgets import QMessageBox
+
+        if not os.path.exists(self._catalog_file()):
+            QMessageBox.warning(self.tool_window, "Warning!", "The results catalog is empty! Run pyKVFinder or import results first.")
+            return
+
+        try:
+            with Catalog(self._catalog_file()) as catalog:
+                rows = catalog.query(
+                    min_volume=self.ui.catalog_min_volume.value() or None,
+                    resname=self.ui.catalog_resname.text().strip().upper() or None,
+                    chain=self.ui.catalog_chain.text().strip() or None,
+                    limit=self.ui.catalog_limit.value(),
+                )
+        except sqlite3.Error as error:
+            QMessageBox.critical(self.tool_window, "Error!", f"Could not query the results catalog: {error}")
+            return
+
+        self.ui.catalog_table.setSortingEnabled(False)
+        self.ui.catalog_table.setRowCount(0)
+        self.ui.catalog_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, column in enumerate(CATALOG_COLUMNS):
+                item = QtWidgets.QTableWidgetItem()
+                value = os.path.basename(row[column]) if column == "input" and row[column] else row[column]
+                item.setData(QtCore.Qt.DisplayRole, value)
+                self.ui.catalog_table.setItem(i, j, item)
+        self.ui.catalog_table.setSortingEnabled(True)
+
+    def set_detection_modes(self, *args) -> None:
+        """
+        Enable Tiled detection and Multiresolution outside box adjustment mode only,
+        since box adjustment always runs a single detection on the box.
+        """
+        enabled = not self.ui.box_adjustment.isChecked()
+        self.ui.tiled_detection_frame.setEnabled(enabled)
+        self.ui.multiresolution_frame.setEnabled(enabled)
+
+    def _detection_mode(self) -> str:
+        """Detection that runs with the current parameters: "box", "multiresolution", "tiled" or "whole"."""
+        if self.ui.box_adjustment.isChecked():
+            return "box"
+        if self.ui.multiresolution.isChecked():
+            return "multiresolution"
+        if self.ui.tiled_detection.isChecked():
+            return "tiled"
+        return "whole"
+
+    def _estimate(self, vertices, step, natoms) -> dict:
+        """Estimate grid size, peak memory and runtime with the calibrated cost model.
+
+        The fine regions of multiresolution detection are only known after
+        its coarse pass, so its estimate is an upper bound (``"upper_bound"``
+        is True): the coarse pass plus a fine pass over the whole grid.
+        """
+        cost_model = self._get_cost_model()
+        mode = self._detection_mode()
+        if mode == "tiled":
+            tiles = tile_voxels(step, self.ui.probe_out.value(), self.ui.removal_distance.value(), self.ui.tile_size.value())
+            return cost_model.estimate(vertices, step, natoms, tile_voxels=tiles)
+        estimate = cost_model.estimate(vertices, step, natoms)
+        if mode == "multiresolution":
+            coarse = cost_model.estimate(vertices, self.ui.coarse_step.value(), natoms)
+            estimate["bytes"] = max(estimate["bytes"], coarse["bytes"])
+            estimate["seconds"] += coarse["seconds"]
+            estimate["upper_bound"] = True
+        return estimate
+
+    def update_estimate(self, *args) -> None:
+        """
+        Refresh the grid, memory and runtime estimate shown below the step size.
+        """
+        model = self._get_model(self.ui.input.currentText())
+        if not model:
+            self.ui.grid_estimate.setText("")
+            return
+
+        if self.region_option == "Selected":
+            atoms = selected_atoms(self.session)
+        else:
+            atoms = model.atoms
+        if len(atoms) == 0:
+            self.ui.grid_estimate.setText("")
+            return
+
+        step = self.ui.step_size.value()
+        if step <= 0:
+            self.ui.grid_estimate.setText("")
+            return
+
+        if self.ui.box_adjustment.isChecked() and getattr(self, "min_x_set", None) is not None:
+            box = self.create_box_parameters(is_internal_box=True)
+            vertices = np.array([[box[p]["x"], box[p]["y"], box[p]["z"]] for p in ("p1", "p2", "p3", "p4")])
+        else:
+            vertices = vertices_from_coords(atoms.coords, probe_out=self.ui.probe_out.value(), step=step)
+
+        estimate = self._estimate(vertices, step, len(atoms))
+        nx, ny, nz = estimate["shape"]
+        memory = estimate["bytes"] / 2**20
+        approx = "up to " if estimate.get("upper_bound") else "~"
+        text = f"Grid: {nx} x {ny} x {nz} points, {approx}{memory:,.0f} MB, {approx}{estimate['seconds']:,.1f} s"
+        if memory > self.ui.memory_budget.value():
+            text = f'<span style="color: red;">{text} (exceeds memory budget)</span>'
+        self.ui.grid_estimate.setText(text)
+
+    def _check_memory_budget(self, vertices, step, natoms) -> bool:
+        """
+        Warn before detection when the estimated memory exceeds the memory budget.
+
+        Returns
+        -------
+        bool
+            Whether detection should proceed.
+        """
+        estimate = self._estimate(vertices, step, natoms)
+        memory = estimate["bytes"] / 2**20
+        approx = "up to " if estimate.get("upper_bound") else "~"
+        print(f"> Estimated grid: {' x '.join(str(n) for n in estimate['shape'])} points, {approx}{memory:,.0f} MB, {approx}{estimate['seconds']:,.1f} s")
+        if memory <= self.ui.memory_budget.value():
+            return True
+
+        from PyQt5.QtWidgets import QMessageBox
+
+        reply = QMessageBox.warning(
+            self.tool_window,
+            "Memory budget exceeded",
+            f"This run needs an estimated {memory:,.0f} MB, above the memory budget of {self.ui.memory_budget.value():,} MB.\n"
+            "Increase the step size or reduce the search space to lower it.\n\nRun anyway?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
+        )
+        return reply == QMessageBox.Yes
  
     def save_parameters(self) -> None:
 
@@ -572,7 +1501,10 @@ class KVFinder(ToolInstance):
             return False   
         
         # Save ligand pdb
-        if self.ui.ligand_adjustment.isChecked():
+        if self.ui.ligand_adjustment.isChecked() and self.ui.auto_ligands.isChecked():
+            # Ligands are residues of the input structure
+            ligand = "-"
+        elif self.ui.ligand_adjustment.isChecked():
             if self.ui.ligand.currentText() != "":
                 ligandModel = self._get_model(self.ui.ligand.currentText())
                 
@@ -727,21 +1659,13 @@ class KVFinder(ToolInstance):
         # Step Size
         self.ui.step_size_entry.setText(f"")
 
-        # Volume
-        self.ui.volume_list.clear()
-
-        # Area
-        self.ui.area_list.clear()
+        # Descriptors
+        self.ui.results_model.set_table(None)
+        self._selected_cavities = set()
 
-        # Depth
-        self.ui.avg_depth_list.clear()
-        self.ui.max_depth_list.clear()
-
-        # Hydropathy
-        self.ui.avg_hydropathy_list.clear()
-
-        # Residues
-        self.ui.residues_list.clear()
+        # Ligand pockets
+        self.ui.ligand_table.setRowCount(0)
+        self.ui.ligand_pockets.setVisible(False)
 
     def refresh_information(self) -> None:
         # Input File
@@ -786,11 +1710,7 @@ class KVFinder(ToolInstance):
         :param padding: box padding value.
         """
 
-        models = all_objects(self.session).models
-
-        for model in models:
-            if model.name == "box":
-                model.delete()
+        self._delete_models("box")
 
         sel_atoms = selected_atoms(self.session)
         
@@ -875,11 +1795,7 @@ class KVFinder(ToolInstance):
         self.padding_set = 3.5
 
         # Delete Box and Vertices objects in PyMOL
-        models = all_objects(self.session).models
-
-        for model in models:
-            if model.name == "box":
-                model.delete()       
+        self._delete_models("box")
 
         # Set Box variables in the interface
         self.ui.min_x.setValue(self._default.min_x)
@@ -1036,11 +1952,7 @@ class KVFinder(ToolInstance):
         self.ui.angle1.setValue(self.angle1_set)
         self.ui.angle2.setValue(self.angle2_set)
 
-        models = all_objects(self.session).models
-
-        for model in models:
-            if model.name == "box":
-                model.delete()    
+        self._delete_models("box")
 
         # Redraw box
         self.draw_box()
@@ -1468,7 +2380,41 @@ class KVFinder(ToolInstance):
 
         return len(results["RESULTS"]["VOLUME"].keys())
     
-    def extract_pdb_session(self, name, selected=True):
+    def _session_atoms(self, name, selected=True):
+        """Selected atoms, or all atoms of the model {name} when `selected` is False."""
+        if selected:
+            return selected_atoms(self.session)
+        structures = all_atomic_structures(self.session)
+        for structure in structures:
+            if structure.name == name:
+                return structure.atoms
+        raise AssertionError(f"WARNING: I didn't find any structure with the name {name}")
+
+    def _search_space(self, name, selected=True):
+        """Vertices of the region where cavities are searched in box or ligand
+        adjustment mode, or None when the whole structure is searched.
+
+        In box adjustment mode this is the internal box. In ligand adjustment
+        mode it is the part of the whole-structure grid within Ligand Cutoff
+        of the ligand, aligned with the points of the whole-structure grid.
+        """
+        if self.ui.box_adjustment.isChecked():
+            box = self.create_box_parameters(is_internal_box=True)
+            return np.array([[box[p]["x"], box[p]["y"], box[p]["z"]] for p in ("p1", "p2", "p3", "p4")])
+
+        ligand = self.ui.ligand.currentText()
+        if self.ui.ligand_adjustment.isChecked() and ligand != self.ui.input.currentText() and ligand != "":
+            step = self.ui.step_size.value()
+            margin = search_margin(self.ui.probe_out.value(), self.ui.removal_distance.value())
+            vertices = vertices_from_coords(self._session_atoms(name, selected).coords, probe_out=self.ui.probe_out.value(), step=step)
+            ligand_coords = self._session_atoms(ligand, selected=False).coords
+            if len(ligand_coords) == 0:
+                return None
+            return subgrid_around(vertices, step, ligand_coords, self.ui.ligand_cutoff.value() + margin)
+
+        return None
+
+    def extract_pdb_session(self, name, selected=True, vertices=None, margin=None):
         """Extract the PDB of a specific model.
         By default, the `selected` option is True, so it will extract the PDB
         of selected atoms in the model {name}. When `selected` is False, this function extracts
@@ -1481,6 +2427,13 @@ class KVFinder(ToolInstance):
         selected : bool, optional
             Controls whether the function will return the entire model or only selected atoms. 
             Defaults to True.
+        vertices : numpy.ndarray, optional
+            Vertices of a search space. When given, only atoms that can affect
+            cavities inside it (within `search_margin`) are extracted, using a
+            cell list over the atoms. Defaults to None (all atoms).
+        margin : float, optional
+            Distance (A) around the search space within which atoms are
+            extracted. Defaults to `search_margin` of the current parameters.
 
         Raises
         ------
@@ -1493,36 +2446,21 @@ class KVFinder(ToolInstance):
             An array containing the atomic information.
         """
 
-        if selected:
-            sel_atoms = selected_atoms(self.session)
-        else:
-            structures = all_atomic_structures(self.session)
-            for structure in structures:
-                if structure.name == name:
-                    sel_atoms = structure.atoms
-                    break
-            else:
-                raise AssertionError(f"WARNING: I didn't find any structure with the name {name}")
-
+        sel_atoms = self._session_atoms(name, selected)
 
-        atomNP = np.zeros(shape=(len(sel_atoms), 8), dtype='<U32')
-        vdw = pyKVFinder.read_vdw()
-        for i in range(0, len(sel_atoms)):
-            atom = sel_atoms[i]
-            residue_name, atom_name, atom_element = str(atom.residue.name).upper(), str(atom.name).upper(), str(atom.element).upper()
-            if residue_name in vdw.keys() and atom_name in vdw[residue_name].keys():
-                radius = vdw[residue_name][atom_name]
-            else:
-                radius = vdw["GEN"][atom_element]
-                self.cprint(f"Warning: Atom {atom_name} of residue {residue_name} \  not found in dictionary.")
-                self.cprint(f"Warning: Using generic atom {atom_element} \radius: {radius} \u00c5.")
+        if vertices is not None:
+            if margin is None:
+                margin = search_margin(self.ui.probe_out.value(), self.ui.removal_distance.value())
+            indices = CellList(sel_atoms.coords).query_grid(vertices, margin)
+            print(f"> Atoms around the search space: {len(indices)} of {len(sel_atoms)}")
+            sel_atoms = sel_atoms.filter(indices)
 
-            try:
-                atomNP[i] = [str(atom.residue.number), str(atom.residue.chain)[1:], residue_name, atom_name, atom.coord[0], atom.coord[1], atom.coord[2], radius ]
-            except:
-                self.cprint(f"Problem to modify line {str(i)}: {str(atom)}")
+        atomNP, missing = atomic_from_atoms(sel_atoms)
+        for residue_name, atom_name, atom_element, radius in missing:
+            self.cprint(f"Warning: Atom {atom_name} of residue {residue_name} not found in dictionary.")
+            self.cprint(f"Warning: Using generic atom {atom_element} radius: {radius} \u00c5.")
 
-        return atomNP       
+        return atomNP
 
     def check_resolution(self):
         if self.ui.resolution_label.isChecked():
@@ -1590,142 +2528,180 @@ class KVFinder(ToolInstance):
 
         return
 
-    def refresh_area(self) -> None:
-        # Get cavity indexes
-        indexes = sorted(results["RESULTS"]["AREA"].keys())
-        # Include Area
-        for index in indexes:
-            item = f"{index}: {results['RESULTS']['AREA'][index]}"
-            self.ui.area_list.addItem(item)
-        return
-
-    def refresh_volume(self) -> None:
-        # Get cavity indexes
-        indexes = sorted(results["RESULTS"]["VOLUME"].keys())
-        # Include Volume
-        for index in indexes:
-            item = f"{index}: {results['RESULTS']['VOLUME'][index]}"
-            self.ui.volume_list.addItem(item)
-        return
+    def refresh_descriptors(self) -> None:
+        """Fill the results table with the descriptors of the loaded results."""
+        self.ui.results_model.set_table(DescriptorTable.from_results(results["RESULTS"]))
+
+    def filter_descriptors(self, text) -> None:
+        """Callback for the filter of the results table; cavities filtered out are deselected."""
+        selected = self._selected_cavities
+        self.ui.results_model.set_filter(text)
+        self._select_rows(self.ui.results_model.rows_of(selected))
+        # The model reset cleared the selection without signals
+        self.select_cavities()
+
+    def _select_rows(self, rows) -> None:
+        """Select rows of the results table, given as sorted row numbers."""
+        model = self.ui.results_model
+        selection = QtCore.QItemSelection()
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows):
+            breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+            for first, last in zip(rows[np.r_[0, breaks]], rows[np.r_[breaks - 1, len(rows) - 1]]):
+                selection.select(model.index(int(first), 0), model.index(int(last), model.columnCount() - 1))
+        selection_model = self.ui.results_table.selectionModel()
+        selection_model.blockSignals(True)
+        selection_model.select(selection, QtCore.QItemSelectionModel.ClearAndSelect)
+        selection_model.blockSignals(False)
+        self.ui.results_table.viewport().update()
+
+    def select_cavities(self, *args) -> None:
+        """Callback for selection changes in the results table.
+
+        The column of the current cell chooses how the selected cavities
+        are shown: volume and area color them (`show_cavities`), depths by
+        depth (`show_depth`), hydropathy by hydropathy (`show_hydropathy`)
+        and residues show their lining residues (`show_residues`).
+        """
+        # Whole rows are selected, so the ranges give the rows without an index per cell
+        ranges = self.ui.results_table.selectionModel().selection()
+        rows = np.unique(np.concatenate([np.arange(r.top(), r.bottom() + 1) for r in ranges] or [np.zeros(0, dtype=np.int64)]))
+        selected = set(self.ui.results_model.names(rows))
+        deselect = sorted(self._selected_cavities - selected)
+        self._selected_cavities = selected
+
+        column = DESCRIPTOR_COLUMNS[max(self.ui.results_table.currentIndex().column(), 0)]
+        if column in ("avg_depth", "max_depth"):
+            self.show_depth(sorted(selected), deselect)
+        elif column == "avg_hydropathy":
+            self.show_hydropathy(sorted(selected), deselect)
+        elif column == "residues":
+            self.show_residues(sorted(selected), deselect)
+        else:
+            self.show_cavities(sorted(selected), deselect)
     
-    def refresh_avg_depth(self) -> None:
-        # Get cavity indexes
-        indexes = sorted(results["RESULTS"]["AVG_DEPTH"].keys())
-        # Include Average Depth
-        for index in indexes:
-            item = f"{index}: {results['RESULTS']['AVG_DEPTH'][index]}"
-            self.ui.avg_depth_list.addItem(item)
-        return
+    def _index_models(self, trigger_name, models) -> None:
+        """ADD_MODELS handler adding models to the name index."""
+        for model in models:
+            self._models_by_name.setdefault(model.name, []).append(model)
 
-    def refresh_max_depth(self) -> None:
-        # Get cavity indexes
-        indexes = sorted(results["RESULTS"]["MAX_DEPTH"].keys())
-        # Include Maximum Depth
-        for index in indexes:
-            item = f"{index}: {results['RESULTS']['MAX_DEPTH'][index]}"
-            self.ui.max_depth_list.addItem(item)
-        return
+    def _unindex_models(self, trigger_name, models) -> None:
+        """REMOVE_MODELS handler removing models from the name index."""
+        for model in models:
+            named = self._models_by_name.get(model.name, [])
+            if model in named:
+                named.remove(model)
+            if not named:
+                self._models_by_name.pop(model.name, None)
 
-    def refresh_avg_hydropathy(self) -> None:
-        # Get cavity indexes
-        indexes = sorted(results["RESULTS"]["AVG_HYDROPATHY"].keys())
-        # Include Average Hydropathy
-        for index in indexes:
-            if index != "EisenbergWeiss":
-                item = f"{index}: {results['RESULTS']['AVG_HYDROPATHY'][index]}"
-                self.ui.avg_hydropathy_list.addItem(item)
-        return
+    def _get_models(self, name) -> list:
+        """Open models with a given name, in the order they were opened.
+
+        Models are indexed by their name when opened, so models renamed
+        afterwards are not found under their new name.
+        """
+        return [model for model in self._models_by_name.get(name, ()) if model.name == name and not model.deleted]
+
+    def _delete_models(self, name) -> None:
+        for model in self._get_models(name):
+            model.delete()
 
-    def refresh_residues(self) -> None:
-        # Get cavity indexes
-        indexes = sorted(results["RESULTS"]["RESIDUES"].keys())
-        # Include Interface Residues
-        for index in indexes:
-            self.ui.residues_list.addItem(index)
-        return
-    
     def _get_model(self, name) -> None | AtomicStructure:
-        objects = all_objects(self.session)
-        models = objects.models
-        
-        for model in models:
-            if model.name == name:
-                return model
-        else:       
+        models = self._get_models(name)
+        return models[0] if models else None
+
+    def _get_cavity_atoms(self) -> None | CavityAtoms:
+        """Points of the cavity model grouped by cavity, built once per model.
+
+        Returns
+        -------
+        CavityAtoms or None
+            None when the cavity model is not open.
+        """
+        model = self._get_model(self.cavity_pdb) if self.cavity_pdb else None
+        if model is None:
             return None
+        if self._cavity_atoms is None or self._cavity_atoms[0] is not model or len(self._cavity_atoms[1]) != len(model.atoms):
+            self._cavity_atoms = (model, CavityAtoms(model.atoms))
+            self._view_colors = {}
+        return self._cavity_atoms[1]
 
-    def _deselect_all_items(self, list_widget):
-        for index in range(list_widget.count()):
-            item = list_widget.item(index)
-            if item.isSelected():
-                item.setSelected(False)
+    def _get_view_colors(self, view) -> None | tuple:
+        """Colors of the points of the cavity model in a view, computed once per run.
 
-    def _reset_areas(self):
-        listWidgets = [self.ui.volume_list, self.ui.area_list, self.ui.avg_depth_list, self.ui.max_depth_list, self.ui.avg_hydropathy_list, self.ui.residues_list]
-        for widget in listWidgets:
-            self._deselect_all_items(widget)
+        Depths and hydropathy are read from the grids of the run when they
+        are loaded, and otherwise from the B-factors and occupancies of the
+        cavity PDB.
 
-    def show_residues(self) -> None:
-        """Show the residues in structure
+        Parameters
+        ----------
+        view : str
+            ``"depth"`` (rainbow palette) or ``"hydropathy"``
+            (yellow:white:blue palette). Every point is colored; points
+            below the surface have a hydrophobicity scale of 0, as in the
+            Q-factor of the cavity PDB.
+
+        Returns
+        -------
+        tuple or None
+            The points colored by the view and their colors, or None when
+            the cavity model is not open.
         """
+        cavity_atoms = self._get_cavity_atoms()
+        if cavity_atoms is None:
+            return None
+        if view not in self._view_colors:
+            atoms = cavity_atoms.atoms
+            if view == "depth":
+                grid, palette = "depths", DEPTH_PALETTE
+            else:
+                grid, palette = "scales", HYDROPATHY_PALETTE
+            if self.grids is not None and grid in self.grids:
+                values = grid_values(self.grids[grid], atoms.coords, self.grids["vertices"], self.grids["step"])
+            else:
+                values = atoms.bfactors if view == "depth" else atoms.occupancies
+            self._view_colors[view] = (atoms, palette_colors(values, palette))
+        return self._view_colors[view]
 
-        # Select items of list2
-        list1 = self.ui.residues_list
-        cavs = []
-        residues = []
-        deselect = []
-        deselects_res = []
-        number_of_items = list1.count()
-        for index in range(number_of_items):
-            item1 = list1.item(index)
+    def _reset_areas(self):
+        self.ui.results_table.clearSelection()
 
-            if item1.text()[0:3] not in self.res_selected and item1.isSelected():
-                cavs.append(item1.text()[0:3])
-                self.res_selected.append(item1.text()[0:3])
+    def _missing_cavity_points(self) -> None:
+        """Report that the cavity model is not open, unless the cavities are shown from the grids."""
+        if self.grids is None or self.ui.cavity_display.currentText() == "Points":
+            print(f"Didn't find the model {self.cavity_pdb}")
 
+    def show_residues(self, cavities, deselect) -> None:
+        """Show the residues lining the selected cavities in the input structure.
 
-            elif item1.text()[0:3] in self.res_selected and item1.isSelected() == False:
-                self.res_selected.remove(item1.text()[0:3])
-                deselect.append(item1.text()[0:3])
-            
-            elif item1.text()[0:3] in self.res_selected and item1.isSelected():
-                cavs.append(item1.text()[0:3])
+        Parameters
+        ----------
+        cavities : list
+            Names of the selected cavities.
+        deselect : list
+            Names of the cavities just deselected; their residues are hidden
+            unless they also line a selected cavity.
 
-        for cav in cavs:
-            for residue in results["RESULTS"]["RESIDUES"][cav]:
-                if residue not in residues:
-                    residues.append(residue)
+        Returns
+        -------
+        None
+        """
+        lining = results["RESULTS"].get("RESIDUES") or {}
+        residues = {(residue[0], residue[1]): None for cav in cavities for residue in lining.get(cav, [])}
+        hidden = {(residue[0], residue[1]): None for cav in deselect for residue in lining.get(cav, [])}
+        hidden = [residue for residue in hidden if residue not in residues]
 
         model = self._get_model(self.input_pdb)
 
         if model:
             spec = model.atomspec
-            if deselect:
-
-                for residue in results["RESULTS"]["RESIDUES"][deselect[0]]:
-                    if residue not in deselects_res:
-                        deselects_res.append(residue)
-                command = spec
-
-                while len(deselects_res) > 0:
-                    res, chain, _ = deselects_res.pop(0)
-                    command = f"{command}/{chain}:{res}"
-                command_hide = f"hide {command}"
-                run(self.session, command_hide)
-                return 
-            # Select residues
-
-            command = spec
-            while len(residues) > 0:
-                res, chain, _ = residues.pop(0)
-                command = f"{command}/{chain}:{res}"
-            command_show = f"show {command}"
-
-            run(self.session, command_show)
-
-            command_style = f"style {command} stick"
-            run(self.session, command_style)
-
+            if hidden:
+                command = spec + "".join(f"/{chain}:{res}" for res, chain in hidden)
+                run(self.session, f"hide {command}")
+            if residues:
+                command = spec + "".join(f"/{chain}:{res}" for res, chain in residues)
+                run(self.session, f"show {command}")
+                run(self.session, f"style {command} stick")
         else:
             print(f"Didn't find the model {self.input_pdb}")
 
@@ -1740,16 +2716,15 @@ class KVFinder(ToolInstance):
             This method does not return anything; it only modifies the color of the cavities.
         """
 
-        model = self._get_model(self.cavity_pdb)
-
+        cavity_atoms = self._get_cavity_atoms()
 
-        if model:
-            spec = model.atomspec
-            command = f"color {spec} white"
-            run(self.session, command)
+        if cavity_atoms is not None:
             self._reset_areas()
+            cavity_atoms.atoms.colors = NO_CAVITY_COLOR
         else:
-            print(f"Didn't find the model {self.cavity_pdb}")
+            # Views are applied when the points are opened (see set_cavity_display)
+            self._reset_areas()
+            self._missing_cavity_points()
 
     def show_depth_view(self) -> None:
         """
@@ -1763,15 +2738,17 @@ class KVFinder(ToolInstance):
             This method does not return anything; it only modifies the color of the cavities.
         """
 
-        model = self._get_model(self.cavity_pdb)
+        view = self._get_view_colors("depth")
 
-        if model:
-            spec = model.atomspec
-            command = f"color byattribute bfactor {spec} palette rainbow"
-            run(self.session, command)
+        if view is not None:
+            # Deselecting the cavities colors them white, so it comes first
             self._reset_areas()
+            atoms, colors = view
+            atoms.colors = colors
         else:
-            print(f"Didn't find the model {self.cavity_pdb}")
+            # Views are applied when the points are opened (see set_cavity_display)
+            self._reset_areas()
+            self._missing_cavity_points()
 
     def show_hydropathy_view(self) -> None:
         """
@@ -1785,20 +2762,20 @@ class KVFinder(ToolInstance):
             This method does not return anything; it only modifies the color of the cavities.
         """
 
-        model = self._get_model(self.cavity_pdb)
-        inpModel = self._get_model(self.input_pdb)
-
-        if model:
-            spec = model.atomspec + "@HA"
+        view = self._get_view_colors("hydropathy")
 
-            command = f"color byattribute occupancy {spec} palette yellow:white:blue"
-            run(self.session, command)
+        if view is not None:
+            # Deselecting the cavities colors them white, so it comes first
             self._reset_areas()
+            atoms, colors = view
+            atoms.colors = colors
         else:
-            print(f"Didn't find the model {self.cavity_pdb}")
+            # Views are applied when the points are opened (see set_cavity_display)
+            self._reset_areas()
+            self._missing_cavity_points()
 
-    def show_cavities(self, list1, list2) -> None:
-        """   
+    def show_cavities(self, cavities, deselect) -> None:
+        """
         Color the atoms of selected cavities.
 
         This method colors the atoms of selected cavities. It uses blue for pseudoatoms with HA bonds
@@ -1806,54 +2783,29 @@ class KVFinder(ToolInstance):
 
         Parameters
         ----------
-        list1 : list
-            A list of QtListItem representing pseudoatoms.
-        list2 : list
-            A list of QtListItem representing pseudoatoms.
+        cavities : list
+            Names of the selected cavities.
+        deselect : list
+            Names of the cavities just deselected, colored white.
 
         Returns
         -------
         None
         """
 
-        # Get items from list1
-        cavs = []
-        deselect = []
+        cavity_atoms = self._get_cavity_atoms()
 
-        # Select items of list2
-        number_of_items = list1.count()
-        for index in range(number_of_items):
-            item1 = list1.item(index)
-            item2 = list2.item(index)
-
-            if item1.text()[0:3] not in self.vs_selected and item1.isSelected():
-                cavs.append(item1.text()[0:3])
-                self.vs_selected.append(item1.text()[0:3])
-                item2.setSelected(True)
-
-            elif item1.text()[0:3] in self.vs_selected and item1.isSelected() == False:
-                self.vs_selected.remove(item1.text()[0:3])
-                deselect.append(item1.text()[0:3])
-                item2.setSelected(False)
-
-        model = self._get_model(self.cavity_pdb)
-
-        if model:
-            spec = model.atomspec
-            # Return if no cavity is selected
-            if len(cavs) > 0:
-                command = f"color {spec}:{cavs[0]} blue; color {spec}:{cavs[0]}@HA red"
-            elif len(deselect) > 0:
-                command = f"color {spec}:{deselect[0]} white"
-            else:
-                return
-            
-            run(self.session, command)
-            # style(self.session, spec, atom_style='ball', dashes=5)
+        if cavity_atoms is not None:
+            # Points of the selected cavities in blue and their surface in red
+            if len(cavities) > 0:
+                cavity_atoms.color(cavities, SELECTED_COLOR)
+                cavity_atoms.color(cavities, SURFACE_COLOR, surface_only=True)
+            if len(deselect) > 0:
+                cavity_atoms.color(deselect, NO_CAVITY_COLOR)
         else:
-            print(f"Didn't find the model {self.cavity_pdb}")
+            self._missing_cavity_points()
 
-    def show_depth(self, list1, list2) -> None:
+    def show_depth(self, cavities, deselect) -> None:
         """
         Color atoms by depth attribute using a rainbow palette.
 
@@ -1861,62 +2813,29 @@ class KVFinder(ToolInstance):
 
         Parameters
         ----------
-        list1 : list
-            A list of QtListItem representing average depth.
-        list2 : list
-            A list of QtListItem representing maximum depth.
+        cavities : list
+            Names of the selected cavities, colored over the range of their depths.
+        deselect : list
+            Names of the cavities just deselected, colored white.
 
         Returns
         -------
         None
         """
 
-        # Get items from list1
-        cavs = []
-        deselect = []
-
-        # Select items of list2
-        number_of_items = list1.count()
-        for index in range(number_of_items):
-            item1 = list1.item(index)
-            item2 = list2.item(index)
-
-            if item1.text()[0:3] not in self.am_selected and item1.isSelected():
-                cavs.append(item1.text()[0:3])
-                self.am_selected.append(item1.text()[0:3])
-                item2.setSelected(True)
-
-            elif item1.text()[0:3] in self.am_selected and item1.isSelected() == False:
-                self.am_selected.remove(item1.text()[0:3])
-                deselect.append(item1.text()[0:3])
-                item2.setSelected(False)
-            elif item1.text()[0:3] in self.am_selected and item1.isSelected():
-                cavs.append(item1.text()[0:3])
-
-        model = self._get_model(self.cavity_pdb)
-
-        if model:
-            spec = model.atomspec
-        
-            # Return if no cavity is selected
-            if len(cavs) > 0:
-                cavs = ":".join(cavs)
-                command = f"color byattribute bfactor {spec}:{cavs} palette rainbow"
-                cavs = []
-                # while len(cavs) > 0:
-                #     command = f"{command}{cavs.pop(0)}:"
-                # command = command[:-1] + " palette rainbow"
-                run(self.session, command)
+        cavity_atoms = self._get_cavity_atoms()
 
+        if cavity_atoms is not None:
+            # Depths (B-factors) of the selected cavities over their range
+            if len(cavities) > 0:
+                selected = cavity_atoms.select(cavities)
+                selected.colors = palette_colors(selected.bfactors, DEPTH_PALETTE)
             if len(deselect) > 0:
-                command = f"color {spec}:{deselect[0]} white"
-                run(self.session, command)
-            else:
-                return
+                cavity_atoms.color(deselect, NO_CAVITY_COLOR)
         else:
-            print(f"Didn't find the model {self.cavity_pdb}")
+            self._missing_cavity_points()
 
-    def show_hydropathy(self, list1) -> None:
+    def show_hydropathy(self, cavities, deselect) -> None:
         """
         Color atoms in selected cavities by hydropathy factor using a yellow-white-blue color palette.
 
@@ -1924,57 +2843,137 @@ class KVFinder(ToolInstance):
 
         Parameters
         ----------
-        list1 : list
-            A list of QtListItem representing atoms within selected cavities.
+        cavities : list
+            Names of the selected cavities.
+        deselect : list
+            Names of the cavities just deselected, colored white.
 
         Returns
         -------
         None
         """
 
-        # Get items from list1
-        cavs = []
-        deselect = []
+        cavity_atoms = self._get_cavity_atoms()
 
-        # Select items of list2
-        number_of_items = list1.count()
-        for index in range(number_of_items):
-            item1 = list1.item(index)
+        if cavity_atoms is not None:
+            # Hydropathy (occupancies) of the surface points of the selected cavities
+            if len(cavities) > 0:
+                selected = cavity_atoms.select(cavities, surface_only=True)
+                selected.colors = palette_colors(selected.occupancies, HYDROPATHY_PALETTE)
+            if len(deselect) > 0:
+                cavity_atoms.color(deselect, NO_CAVITY_COLOR)
+        else:
+            self._missing_cavity_points()
+
+class DescriptorModel(QtCore.QAbstractTableModel):
+    """Table model of a `descriptors.DescriptorTable` for the results table.
+
+    The view asks only for the cells on screen; sorting and filtering
+    reorder an array of row indices (see `DescriptorTable.rows`).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.table = None
+        self.headers = list(DESCRIPTOR_COLUMNS)
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._filter = ""
+        self._sort_column = 0
+        self._descending = False
+
+    def _sorted_rows(self):
+        if self.table is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.table.rows(self._filter, self._sort_column, self._descending)
+
+    def set_table(self, table):
+        """Show a table, or nothing with None."""
+        self.beginResetModel()
+        self.table = table
+        self._rows = self._sorted_rows()
+        self.endResetModel()
+
+    def set_filter(self, text):
+        """Show the cavities matching a filter (see `DescriptorTable.mask`)."""
+        self.beginResetModel()
+        self._filter = text
+        self._rows = self._sorted_rows()
+        self.endResetModel()
+
+    def names(self, rows):
+        """Cavity names of rows of the view."""
+        if self.table is None:
+            return []
+        return [str(name) for name in self.table.names[self._rows[np.asarray(rows, dtype=np.int64)]]]
+
+    def rows_of(self, names):
+        """Sorted rows of the view showing some cavities."""
+        if self.table is None or not names:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.isin(self.table.names[self._rows], sorted(names)))
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(DESCRIPTOR_COLUMNS)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or self.table is None:
+            return None
+        row = int(self._rows[index.row()])
+        if role == QtCore.Qt.DisplayRole:
+            return self.table.text(row, index.column())
+        if role == QtCore.Qt.TextAlignmentRole:
+            return QtCore.Qt.AlignCenter
+        if role == QtCore.Qt.ToolTipRole and DESCRIPTOR_COLUMNS[index.column()] == "residues":
+            residues = self.table.residues.get(str(self.table.names[row]), [])
+            return ", ".join(f"{residue[2]}{residue[0]}/{residue[1]}" for residue in residues)
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        """Sort by a column, keeping the selection on the same cavities."""
+        self.layoutAboutToBeChanged.emit()
+        self._sort_column = column
+        self._descending = order == QtCore.Qt.DescendingOrder
+        persistent = self.persistentIndexList()
+        cavities = [int(self._rows[index.row()]) for index in persistent]
+        self._rows = self._sorted_rows()
+        position = np.zeros(len(self.table) if self.table is not None else 0, dtype=np.int64)
+        position[self._rows] = np.arange(len(self._rows))
+        self.changePersistentIndexList(persistent, [self.index(int(position[cavity]), index.column()) for cavity, index in zip(cavities, persistent)])
+        self.layoutChanged.emit()
+
+
+class MeshWorker(QThread):
+    """Background computation of the mesh of every cavity of a grid.
+
+    Emits ``meshes_ready`` with the given key and the meshes of
+    `display.cavity_meshes`, contoured with ChimeraX's marching cubes.
+    """
+
+    meshes_ready = pyqtSignal(object, object)
+
+    def __init__(self, key, cavities, vertices, step, parent=None):
+        super().__init__(parent)
+        self.key = key
+        self.cavities = cavities
+        self.vertices = vertices
+        self.step = step
 
-            if item1.text()[0:3] not in self.hyd_selected and item1.isSelected():
-                cavs.append(item1.text()[0:3])
-                self.hyd_selected.append(item1.text()[0:3])
+    def run(self):
+        from chimerax.map._map import contour_surface
 
-            elif item1.text()[0:3] in self.hyd_selected and item1.isSelected() == False:
-                self.hyd_selected.remove(item1.text()[0:3])
-                deselect.append(item1.text()[0:3])
-            elif item1.text()[0:3] in self.hyd_selected and item1.isSelected():
-                cavs.append(item1.text()[0:3])
+        def contour(array, level):
+            return contour_surface(array, level, cap_faces=True, calculate_normals=False)
 
-        model = self._get_model(self.cavity_pdb)
-        inpModel = self._get_model(self.input_pdb)
+        self.meshes_ready.emit(self.key, cavity_meshes(self.cavities, self.vertices, self.step, contour))
 
-        if model:
-            spec = model.atomspec
-        
-            # Return if no cavity is selected
-            if len(cavs) > 0:
-                cavs = "@HA:".join(cavs)
-                
-                if inpModel:
-                    command = f"color byattribute occupancy {inpModel.atomspec}:{cavs}@HA palette yellow:white:blue"
-                else:
-                    command = f"color byattribute occupancy {spec}:{cavs}@HA palette yellow:white:blue"
-
-                run(self.session, command)
-
-            if len(deselect) > 0:
-                command = f"color {spec}:{deselect[0]} white"
-                run(self.session, command)
-            else:
-                return
-        else:
-            print(f"Didn't find the model {self.cavity_pdb}")
 
 class Ui_pyKVFinder(object):
     def setupUi(self, pyKVFinder):
@@ -2259,6 +3258,133 @@ class Ui_pyKVFinder(object):
         spacerItem1 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         self.hframe2.addItem(spacerItem1)
         self.verticalLayout.addLayout(self.hframe2)
+
+        self.hframe2_5 = QtWidgets.QHBoxLayout()
+        self.hframe2_5.setObjectName("hframe2_5")
+
+        self.memory_budget_frame = QtWidgets.QFrame(self.parameters)
+        self.memory_budget_frame.setObjectName("memory_budget_frame")
+
+        self.horizontalLayout_31 = QtWidgets.QHBoxLayout(self.memory_budget_frame)
+        self.horizontalLayout_31.setSizeConstraint(QtWidgets.QLayout.SetNoConstraint)
+        self.horizontalLayout_31.setObjectName("horizontalLayout_31")
+
+        self.memory_budget_label = QtWidgets.QLabel(self.memory_budget_frame)
+        self.memory_budget_label.setObjectName("memory_budget_label")
+        self.horizontalLayout_31.addWidget(self.memory_budget_label)
+
+        self.memory_budget = QtWidgets.QSpinBox(self.memory_budget_frame)
+        sizePolicy = self._setPolicy(self.memory_budget)
+        self.memory_budget.setSizePolicy(sizePolicy)
+
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        font.setBold(False)
+        font.setItalic(False)
+        font.setWeight(50)
+        font.setKerning(True)
+
+        self.memory_budget.setFont(font)
+        self.memory_budget.setMinimum(64)
+        self.memory_budget.setMaximum(1048576)
+        self.memory_budget.setSingleStep(512)
+        self.memory_budget.setProperty("value", 4096)
+        self.memory_budget.setObjectName("memory_budget")
+        self.horizontalLayout_31.addWidget(self.memory_budget)
+
+        self.grid_estimate = QtWidgets.QLabel(self.memory_budget_frame)
+        self.grid_estimate.setTextFormat(QtCore.Qt.RichText)
+        self.grid_estimate.setObjectName("grid_estimate")
+        self.horizontalLayout_31.addWidget(self.grid_estimate)
+
+        self.hframe2_5.addWidget(self.memory_budget_frame)
+
+        spacerItem1_5 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.hframe2_5.addItem(spacerItem1_5)
+        self.verticalLayout.addLayout(self.hframe2_5)
+
+        self.hframe2_6 = QtWidgets.QHBoxLayout()
+        self.hframe2_6.setObjectName("hframe2_6")
+
+        self.tiled_detection_frame = QtWidgets.QFrame(self.parameters)
+        self.tiled_detection_frame.setObjectName("tiled_detection_frame")
+
+        self.horizontalLayout_32 = QtWidgets.QHBoxLayout(self.tiled_detection_frame)
+        self.horizontalLayout_32.setSizeConstraint(QtWidgets.QLayout.SetNoConstraint)
+        self.horizontalLayout_32.setObjectName("horizontalLayout_32")
+
+        self.tiled_detection = QtWidgets.QCheckBox(self.tiled_detection_frame)
+        self.tiled_detection.setChecked(False)
+        self.tiled_detection.setObjectName("tiled_detection")
+        self.horizontalLayout_32.addWidget(self.tiled_detection)
+
+        self.tile_size_label = QtWidgets.QLabel(self.tiled_detection_frame)
+        self.tile_size_label.setObjectName("tile_size_label")
+        self.horizontalLayout_32.addWidget(self.tile_size_label)
+
+        self.tile_size = QtWidgets.QDoubleSpinBox(self.tiled_detection_frame)
+        sizePolicy = self._setPolicy(self.tile_size)
+        self.tile_size.setSizePolicy(sizePolicy)
+
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        font.setBold(False)
+        font.setItalic(False)
+        font.setWeight(50)
+        font.setKerning(True)
+
+        self.tile_size.setFont(font)
+        self.tile_size.setDecimals(1)
+        self.tile_size.setMinimum(10.0)
+        self.tile_size.setMaximum(1000.0)
+        self.tile_size.setSingleStep(5.0)
+        self.tile_size.setProperty("value", 60.0)
+        self.tile_size.setObjectName("tile_size")
+        self.horizontalLayout_32.addWidget(self.tile_size)
+
+        self.hframe2_6.addWidget(self.tiled_detection_frame)
+
+        self.multiresolution_frame = QtWidgets.QFrame(self.parameters)
+        self.multiresolution_frame.setObjectName("multiresolution_frame")
+
+        self.horizontalLayout_33 = QtWidgets.QHBoxLayout(self.multiresolution_frame)
+        self.horizontalLayout_33.setSizeConstraint(QtWidgets.QLayout.SetNoConstraint)
+        self.horizontalLayout_33.setObjectName("horizontalLayout_33")
+
+        self.multiresolution = QtWidgets.QCheckBox(self.multiresolution_frame)
+        self.multiresolution.setChecked(False)
+        self.multiresolution.setObjectName("multiresolution")
+        self.horizontalLayout_33.addWidget(self.multiresolution)
+
+        self.coarse_step_label = QtWidgets.QLabel(self.multiresolution_frame)
+        self.coarse_step_label.setObjectName("coarse_step_label")
+        self.horizontalLayout_33.addWidget(self.coarse_step_label)
+
+        self.coarse_step = QtWidgets.QDoubleSpinBox(self.multiresolution_frame)
+        sizePolicy = self._setPolicy(self.coarse_step)
+        self.coarse_step.setSizePolicy(sizePolicy)
+
+        font = QtGui.QFont()
+        font.setPointSize(10)
+        font.setBold(False)
+        font.setItalic(False)
+        font.setWeight(50)
+        font.setKerning(True)
+
+        self.coarse_step.setFont(font)
+        self.coarse_step.setDecimals(1)
+        self.coarse_step.setMinimum(0.6)
+        self.coarse_step.setMaximum(5.0)
+        self.coarse_step.setSingleStep(0.1)
+        self.coarse_step.setProperty("value", 1.2)
+        self.coarse_step.setObjectName("coarse_step")
+        self.horizontalLayout_33.addWidget(self.coarse_step)
+
+        self.hframe2_6.addWidget(self.multiresolution_frame)
+
+        spacerItem1_6 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.hframe2_6.addItem(spacerItem1_6)
+        self.verticalLayout.addLayout(self.hframe2_6)
         self.hframe3 = QtWidgets.QHBoxLayout()
         self.hframe3.setObjectName("hframe3")
         self.probe_in_frame = QtWidgets.QFrame(self.parameters)
@@ -3019,6 +4145,14 @@ class Ui_pyKVFinder(object):
         spacerItem8 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         self.horizontalLayout_19.addItem(spacerItem8)
         self.verticalLayout_2.addWidget(self.hframe18)
+        self.per_ligand = QtWidgets.QCheckBox(self.ligand_adjustment)
+        self.per_ligand.setChecked(False)
+        self.per_ligand.setObjectName("per_ligand")
+        self.verticalLayout_2.addWidget(self.per_ligand)
+        self.auto_ligands = QtWidgets.QCheckBox(self.ligand_adjustment)
+        self.auto_ligands.setChecked(False)
+        self.auto_ligands.setObjectName("auto_ligands")
+        self.verticalLayout_2.addWidget(self.auto_ligands)
         spacerItem9 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.verticalLayout_2.addItem(spacerItem9)
         self.gridLayout_4.addWidget(self.ligand_adjustment, 0, 1, 1, 1)
@@ -3062,6 +4196,24 @@ class Ui_pyKVFinder(object):
         self.show_descriptors.addWidget(self.hydropathy_view)
         spacerItem10 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         self.show_descriptors.addItem(spacerItem10)
+        self.cavity_display_label = QtWidgets.QLabel(self.results)
+        self.cavity_display_label.setObjectName("cavity_display_label")
+        self.show_descriptors.addWidget(self.cavity_display_label)
+        self.cavity_display = QtWidgets.QComboBox(self.results)
+        self.cavity_display.addItem("")
+        self.cavity_display.addItem("")
+        self.cavity_display.addItem("")
+        self.cavity_display.setObjectName("cavity_display")
+        self.show_descriptors.addWidget(self.cavity_display)
+        self.level_of_detail = QtWidgets.QCheckBox(self.results)
+        self.level_of_detail.setObjectName("level_of_detail")
+        self.show_descriptors.addWidget(self.level_of_detail)
+        self.lod_budget = QtWidgets.QSpinBox(self.results)
+        self.lod_budget.setMinimum(1000)
+        self.lod_budget.setMaximum(100000000)
+        self.lod_budget.setSingleStep(10000)
+        self.lod_budget.setObjectName("lod_budget")
+        self.show_descriptors.addWidget(self.lod_budget)
         self.gridLayout_5.addLayout(self.show_descriptors, 1, 0, 1, 1)
         self.results_information = QtWidgets.QGroupBox(self.results)
         self.results_information.setObjectName("results_information")
@@ -3160,139 +4312,232 @@ class Ui_pyKVFinder(object):
 
         self.descriptors.setSizePolicy(sizePolicy)
         self.descriptors.setObjectName("descriptors")
-        self.horizontalLayout = QtWidgets.QHBoxLayout(self.descriptors)
-        self.horizontalLayout.setObjectName("horizontalLayout")
-        self.vframe1 = QtWidgets.QVBoxLayout()
-        self.vframe1.setObjectName("vframe1")
-        self.volume_label = QtWidgets.QLabel(self.descriptors)
-
-        sizePolicy = self._setPolicy(self.volume_label)
-
-        self.volume_label.setSizePolicy(sizePolicy)
-        self.volume_label.setAlignment(QtCore.Qt.AlignCenter)
-        self.volume_label.setObjectName("volume_label")
-        self.vframe1.addWidget(self.volume_label)
-        self.volume_list = QtWidgets.QListWidget(self.descriptors)
-
-        sizePolicy = self._setPolicy(self.volume_list)
-
-        self.volume_list.setSizePolicy(sizePolicy)
-        self.volume_list.setMinimumSize(QtCore.QSize(153, 0))
-        self.volume_list.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
-        self.volume_list.setObjectName("volume_list")
-        self.vframe1.addWidget(self.volume_list)
-        self.horizontalLayout.addLayout(self.vframe1)
-        self.vframe2 = QtWidgets.QVBoxLayout()
-        self.vframe2.setObjectName("vframe2")
-        self.area_label = QtWidgets.QLabel(self.descriptors)
-
-        sizePolicy = self._setPolicy(self.area_label)
-
-        self.area_label.setSizePolicy(sizePolicy)
-        self.area_label.setAlignment(QtCore.Qt.AlignCenter)
-        self.area_label.setObjectName("area_label")
-        self.vframe2.addWidget(self.area_label)
-        self.area_list = QtWidgets.QListWidget(self.descriptors)
-
-        sizePolicy = self._setPolicy(self.area_list)
-
-        self.area_list.setSizePolicy(sizePolicy)
-        self.area_list.setMinimumSize(QtCore.QSize(153, 0))
-        self.area_list.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
-        self.area_list.setObjectName("area_list")
-        self.vframe2.addWidget(self.area_list)
-        self.horizontalLayout.addLayout(self.vframe2)
-        self.vframe4 = QtWidgets.QVBoxLayout()
-        self.vframe4.setObjectName("vframe4")
-        self.avg_depth_label = QtWidgets.QLabel(self.descriptors)
-        self.avg_depth_label.setAlignment(QtCore.Qt.AlignCenter)
-        self.avg_depth_label.setObjectName("avg_depth_label")
-        self.vframe4.addWidget(self.avg_depth_label)
-        self.avg_depth_list = QtWidgets.QListWidget(self.descriptors)
-
-        sizePolicy = self._setPolicy(self.avg_depth_list)
-
-        self.avg_depth_list.setSizePolicy(sizePolicy)
-        self.avg_depth_list.setMinimumSize(QtCore.QSize(153, 0))
-        self.avg_depth_list.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
-        self.avg_depth_list.setObjectName("avg_depth_list")
-        self.vframe4.addWidget(self.avg_depth_list)
-        self.horizontalLayout.addLayout(self.vframe4)
-        self.vframe5 = QtWidgets.QVBoxLayout()
-        self.vframe5.setObjectName("vframe5")
-        self.max_depth_label = QtWidgets.QLabel(self.descriptors)
-        self.max_depth_label.setAlignment(QtCore.Qt.AlignCenter)
-        self.max_depth_label.setObjectName("max_depth_label")
-        self.vframe5.addWidget(self.max_depth_label)
-        self.max_depth_list = QtWidgets.QListWidget(self.descriptors)
-
-        # sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Expanding)
-        # sizePolicy.setHorizontalStretch(0)
-        # sizePolicy.setVerticalStretch(0)
-        # sizePolicy.setHeightForWidth(self.max_depth_list.sizePolicy().hasHeightForWidth())
-
-        sizePolicy = self._setPolicy(self.max_depth_list)
-
-        self.max_depth_list.setSizePolicy(sizePolicy)
-        self.max_depth_list.setMinimumSize(QtCore.QSize(153, 0))
-        self.max_depth_list.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
-        self.max_depth_list.setObjectName("max_depth_list")
-        self.vframe5.addWidget(self.max_depth_list)
-        self.horizontalLayout.addLayout(self.vframe5)
-        self.verticalLayout_6 = QtWidgets.QVBoxLayout()
-        self.verticalLayout_6.setObjectName("verticalLayout_6")
-        self.avg_hydropathy_label = QtWidgets.QLabel(self.descriptors)
-        self.avg_hydropathy_label.setAlignment(QtCore.Qt.AlignCenter)
-        self.avg_hydropathy_label.setObjectName("avg_hydropathy_label")
-        self.verticalLayout_6.addWidget(self.avg_hydropathy_label)
-        self.avg_hydropathy_list = QtWidgets.QListWidget(self.descriptors)
-
-        # sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Expanding)
-        # sizePolicy.setHorizontalStretch(0)
-        # sizePolicy.setVerticalStretch(0)
-        # sizePolicy.setHeightForWidth(self.avg_hydropathy_list.sizePolicy().hasHeightForWidth())
-
-        sizePolicy = self._setPolicy(self.avg_hydropathy_list)
-
-        self.avg_hydropathy_list.setSizePolicy(sizePolicy)
-        self.avg_hydropathy_list.setMinimumSize(QtCore.QSize(153, 0))
-        self.avg_hydropathy_list.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
-        self.avg_hydropathy_list.setObjectName("avg_hydropathy_list")
-        self.verticalLayout_6.addWidget(self.avg_hydropathy_list)
-        self.horizontalLayout.addLayout(self.verticalLayout_6)
-        self.vframe3 = QtWidgets.QVBoxLayout()
-        self.vframe3.setObjectName("vframe3")
-        self.residues_label = QtWidgets.QLabel(self.descriptors)
-
-        # sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Preferred)
-        # sizePolicy.setHorizontalStretch(0)
-        # sizePolicy.setVerticalStretch(0)
-        # sizePolicy.setHeightForWidth(self.residues_label.sizePolicy().hasHeightForWidth())
-
-        sizePolicy = self._setPolicy(self.residues_label)
-
-        self.residues_label.setSizePolicy(sizePolicy)
-        self.residues_label.setAlignment(QtCore.Qt.AlignCenter)
-        self.residues_label.setObjectName("residues_label")
-        self.vframe3.addWidget(self.residues_label)
-        self.residues_list = QtWidgets.QListWidget(self.descriptors)
-
-        # sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Expanding)
-        # sizePolicy.setHorizontalStretch(0)
-        # sizePolicy.setVerticalStretch(0)
-        # sizePolicy.setHeightForWidth(self.residues_list.sizePolicy().hasHeightForWidth())
-
-        sizePolicy = self._setPolicy(self.residues_list)
-
-        self.residues_list.setSizePolicy(sizePolicy)
-        self.residues_list.setMinimumSize(QtCore.QSize(153, 0))
-        self.residues_list.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
-        self.residues_list.setObjectName("residues_list")
-        self.vframe3.addWidget(self.residues_list)
-        self.horizontalLayout.addLayout(self.vframe3)
+        self.verticalLayout_descriptors = QtWidgets.QVBoxLayout(self.descriptors)
+        self.verticalLayout_descriptors.setObjectName("verticalLayout_descriptors")
+        self.hframe_results_filter = QtWidgets.QHBoxLayout()
+        self.hframe_results_filter.setObjectName("hframe_results_filter")
+        self.results_filter_label = QtWidgets.QLabel(self.descriptors)
+        self.results_filter_label.setObjectName("results_filter_label")
+        self.hframe_results_filter.addWidget(self.results_filter_label)
+        self.results_filter = QtWidgets.QLineEdit(self.descriptors)
+        self.results_filter.setClearButtonEnabled(True)
+        self.results_filter.setObjectName("results_filter")
+        self.hframe_results_filter.addWidget(self.results_filter)
+        self.verticalLayout_descriptors.addLayout(self.hframe_results_filter)
+        self.results_model = DescriptorModel(self.descriptors)
+        self.results_table = QtWidgets.QTableView(self.descriptors)
+
+        sizePolicy = self._setPolicy(self.results_table)
+
+        self.results_table.setSizePolicy(sizePolicy)
+        self.results_table.setModel(self.results_model)
+        self.results_table.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
+        self.results_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.results_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.results_table.setSortingEnabled(True)
+        self.results_table.sortByColumn(0, QtCore.Qt.AscendingOrder)
+        self.results_table.verticalHeader().setVisible(False)
+        # Fixed row heights and column widths, so the view never measures rows it does not show
+        self.results_table.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.results_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.results_table.setObjectName("results_table")
+        self.verticalLayout_descriptors.addWidget(self.results_table)
         self.gridLayout_5.addWidget(self.descriptors, 2, 0, 1, 1)
+
+        self.ligand_pockets = QtWidgets.QGroupBox(self.results)
+        self.ligand_pockets.setObjectName("ligand_pockets")
+        self.verticalLayout_ligands = QtWidgets.QVBoxLayout(self.ligand_pockets)
+        self.verticalLayout_ligands.setObjectName("verticalLayout_ligands")
+        self.ligand_table = QtWidgets.QTableWidget(self.ligand_pockets)
+        self.ligand_table.setColumnCount(8)
+        self.ligand_table.setRowCount(0)
+        self.ligand_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.ligand_table.setSortingEnabled(True)
+        self.ligand_table.horizontalHeader().setStretchLastSection(True)
+        self.ligand_table.setObjectName("ligand_table")
+        self.verticalLayout_ligands.addWidget(self.ligand_table)
+        self.ligand_pockets.setVisible(False)
+        self.gridLayout_5.addWidget(self.ligand_pockets, 3, 0, 1, 1)
         self.tabs.addTab(self.results, "")
 
+        self.batch = QtWidgets.QWidget()
+        self.batch.setObjectName("batch")
+        self.verticalLayout_batch = QtWidgets.QVBoxLayout(self.batch)
+        self.verticalLayout_batch.setObjectName("verticalLayout_batch")
+
+        self.sweep_ranges = QtWidgets.QGroupBox(self.batch)
+        self.sweep_ranges.setObjectName("sweep_ranges")
+        self.gridLayout_sweep = QtWidgets.QGridLayout(self.sweep_ranges)
+        self.gridLayout_sweep.setObjectName("gridLayout_sweep")
+        for row, parameter in enumerate(("probe_in", "probe_out", "removal_distance", "volume_cutoff")):
+            label = QtWidgets.QLabel(self.sweep_ranges)
+            label.setObjectName(f"sweep_{parameter}_label")
+            setattr(self, f"sweep_{parameter}_label", label)
+            self.gridLayout_sweep.addWidget(label, row, 0, 1, 1)
+            entry = QtWidgets.QLineEdit(self.sweep_ranges)
+            entry.setObjectName(f"sweep_{parameter}")
+            setattr(self, f"sweep_{parameter}", entry)
+            self.gridLayout_sweep.addWidget(entry, row, 1, 1, 1)
+        self.sweep_probe_in.setText("1.4")
+        self.sweep_probe_out.setText("3.0:8.0:1.0")
+        self.sweep_removal_distance.setText("1.2:3.6:0.6")
+        self.sweep_volume_cutoff.setText("5.0, 50.0, 100.0")
+        self.verticalLayout_batch.addWidget(self.sweep_ranges)
+
+        self.hframe_sweep = QtWidgets.QHBoxLayout()
+        self.hframe_sweep.setObjectName("hframe_sweep")
+        self.sweep_help = QtWidgets.QLabel(self.batch)
+        self.sweep_help.setWordWrap(True)
+        self.sweep_help.setObjectName("sweep_help")
+        self.hframe_sweep.addWidget(self.sweep_help)
+        self.sweep_engine = QtWidgets.QComboBox(self.batch)
+        self.sweep_engine.addItem("")
+        self.sweep_engine.addItem("")
+        self.sweep_engine.setObjectName("sweep_engine")
+        self.hframe_sweep.addWidget(self.sweep_engine)
+        self.button_run_sweep = QtWidgets.QPushButton(self.batch)
+        self.button_run_sweep.setObjectName("button_run_sweep")
+        self.hframe_sweep.addWidget(self.button_run_sweep)
+        self.verticalLayout_batch.addLayout(self.hframe_sweep)
+
+        self.sweep_table = QtWidgets.QTableWidget(self.batch)
+        self.sweep_table.setColumnCount(7)
+        self.sweep_table.setRowCount(0)
+        self.sweep_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.sweep_table.setSortingEnabled(True)
+        self.sweep_table.horizontalHeader().setStretchLastSection(True)
+        self.sweep_table.setObjectName("sweep_table")
+        self.verticalLayout_batch.addWidget(self.sweep_table)
+
+        self.tracking = QtWidgets.QGroupBox(self.batch)
+        self.tracking.setObjectName("tracking")
+        self.verticalLayout_tracking = QtWidgets.QVBoxLayout(self.tracking)
+        self.verticalLayout_tracking.setObjectName("verticalLayout_tracking")
+        self.hframe_tracking = QtWidgets.QHBoxLayout()
+        self.hframe_tracking.setObjectName("hframe_tracking")
+        self.min_overlap_label = QtWidgets.QLabel(self.tracking)
+        self.min_overlap_label.setObjectName("min_overlap_label")
+        self.hframe_tracking.addWidget(self.min_overlap_label)
+        self.min_overlap = QtWidgets.QDoubleSpinBox(self.tracking)
+        self.min_overlap.setDecimals(2)
+        self.min_overlap.setMinimum(0.01)
+        self.min_overlap.setMaximum(1.0)
+        self.min_overlap.setSingleStep(0.05)
+        self.min_overlap.setProperty("value", 0.2)
+        self.min_overlap.setObjectName("min_overlap")
+        self.hframe_tracking.addWidget(self.min_overlap)
+        self.max_gap_label = QtWidgets.QLabel(self.tracking)
+        self.max_gap_label.setObjectName("max_gap_label")
+        self.hframe_tracking.addWidget(self.max_gap_label)
+        self.max_gap = QtWidgets.QSpinBox(self.tracking)
+        self.max_gap.setMinimum(0)
+        self.max_gap.setMaximum(1000)
+        self.max_gap.setProperty("value", 0)
+        self.max_gap.setObjectName("max_gap")
+        self.hframe_tracking.addWidget(self.max_gap)
+        spacerItem_tracking = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.hframe_tracking.addItem(spacerItem_tracking)
+        self.button_track_cavities = QtWidgets.QPushButton(self.tracking)
+        self.button_track_cavities.setObjectName("button_track_cavities")
+        self.hframe_tracking.addWidget(self.button_track_cavities)
+        self.verticalLayout_tracking.addLayout(self.hframe_tracking)
+        self.track_table = QtWidgets.QTableWidget(self.tracking)
+        self.track_table.setColumnCount(6)
+        self.track_table.setRowCount(0)
+        self.track_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.track_table.setSortingEnabled(True)
+        self.track_table.horizontalHeader().setStretchLastSection(True)
+        self.track_table.setObjectName("track_table")
+        self.verticalLayout_tracking.addWidget(self.track_table)
+        self.verticalLayout_batch.addWidget(self.tracking)
+        self.comparison = QtWidgets.QGroupBox(self.batch)
+        self.comparison.setObjectName("comparison")
+        self.verticalLayout_comparison = QtWidgets.QVBoxLayout(self.comparison)
+        self.verticalLayout_comparison.setObjectName("verticalLayout_comparison")
+        self.hframe_comparison = QtWidgets.QHBoxLayout()
+        self.hframe_comparison.setObjectName("hframe_comparison")
+        self.compare_input_label = QtWidgets.QLabel(self.comparison)
+        self.compare_input_label.setObjectName("compare_input_label")
+        self.hframe_comparison.addWidget(self.compare_input_label)
+        self.compare_input = QtWidgets.QComboBox(self.comparison)
+        self.compare_input.setObjectName("compare_input")
+        self.hframe_comparison.addWidget(self.compare_input)
+        self.refresh_compare_input = QtWidgets.QPushButton(self.comparison)
+        self.refresh_compare_input.setObjectName("refresh_compare_input")
+        self.hframe_comparison.addWidget(self.refresh_compare_input)
+        spacerItem_comparison = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.hframe_comparison.addItem(spacerItem_comparison)
+        self.button_compare = QtWidgets.QPushButton(self.comparison)
+        self.button_compare.setObjectName("button_compare")
+        self.hframe_comparison.addWidget(self.button_compare)
+        self.verticalLayout_comparison.addLayout(self.hframe_comparison)
+        self.compare_table = QtWidgets.QTableWidget(self.comparison)
+        self.compare_table.setColumnCount(7)
+        self.compare_table.setRowCount(0)
+        self.compare_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.compare_table.setSortingEnabled(True)
+        self.compare_table.horizontalHeader().setStretchLastSection(True)
+        self.compare_table.setObjectName("compare_table")
+        self.verticalLayout_comparison.addWidget(self.compare_table)
+        self.verticalLayout_batch.addWidget(self.comparison)
+        self.catalog = QtWidgets.QGroupBox(self.batch)
+        self.catalog.setObjectName("catalog")
+        self.verticalLayout_catalog = QtWidgets.QVBoxLayout(self.catalog)
+        self.verticalLayout_catalog.setObjectName("verticalLayout_catalog")
+        self.hframe_catalog = QtWidgets.QHBoxLayout()
+        self.hframe_catalog.setObjectName("hframe_catalog")
+        self.catalog_min_volume_label = QtWidgets.QLabel(self.catalog)
+        self.catalog_min_volume_label.setObjectName("catalog_min_volume_label")
+        self.hframe_catalog.addWidget(self.catalog_min_volume_label)
+        self.catalog_min_volume = QtWidgets.QDoubleSpinBox(self.catalog)
+        self.catalog_min_volume.setDecimals(1)
+        self.catalog_min_volume.setMaximum(1000000.0)
+        self.catalog_min_volume.setSingleStep(100.0)
+        self.catalog_min_volume.setObjectName("catalog_min_volume")
+        self.hframe_catalog.addWidget(self.catalog_min_volume)
+        self.catalog_resname_label = QtWidgets.QLabel(self.catalog)
+        self.catalog_resname_label.setObjectName("catalog_resname_label")
+        self.hframe_catalog.addWidget(self.catalog_resname_label)
+        self.catalog_resname = QtWidgets.QLineEdit(self.catalog)
+        self.catalog_resname.setMaximumWidth(60)
+        self.catalog_resname.setObjectName("catalog_resname")
+        self.hframe_catalog.addWidget(self.catalog_resname)
+        self.catalog_chain_label = QtWidgets.QLabel(self.catalog)
+        self.catalog_chain_label.setObjectName("catalog_chain_label")
+        self.hframe_catalog.addWidget(self.catalog_chain_label)
+        self.catalog_chain = QtWidgets.QLineEdit(self.catalog)
+        self.catalog_chain.setMaximumWidth(40)
+        self.catalog_chain.setObjectName("catalog_chain")
+        self.hframe_catalog.addWidget(self.catalog_chain)
+        self.catalog_limit_label = QtWidgets.QLabel(self.catalog)
+        self.catalog_limit_label.setObjectName("catalog_limit_label")
+        self.hframe_catalog.addWidget(self.catalog_limit_label)
+        self.catalog_limit = QtWidgets.QSpinBox(self.catalog)
+        self.catalog_limit.setMinimum(1)
+        self.catalog_limit.setMaximum(100000)
+        self.catalog_limit.setProperty("value", 1000)
+        self.catalog_limit.setObjectName("catalog_limit")
+        self.hframe_catalog.addWidget(self.catalog_limit)
+        spacerItem_catalog = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.hframe_catalog.addItem(spacerItem_catalog)
+        self.button_catalog_import = QtWidgets.QPushButton(self.catalog)
+        self.button_catalog_import.setObjectName("button_catalog_import")
+        self.hframe_catalog.addWidget(self.button_catalog_import)
+        self.button_catalog_search = QtWidgets.QPushButton(self.catalog)
+        self.button_catalog_search.setObjectName("button_catalog_search")
+        self.hframe_catalog.addWidget(self.button_catalog_search)
+        self.verticalLayout_catalog.addLayout(self.hframe_catalog)
+        self.catalog_table = QtWidgets.QTableWidget(self.catalog)
+        self.catalog_table.setColumnCount(8)
+        self.catalog_table.setRowCount(0)
+        self.catalog_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.catalog_table.setSortingEnabled(True)
+        self.catalog_table.horizontalHeader().setStretchLastSection(True)
+        self.catalog_table.setObjectName("catalog_table")
+        self.verticalLayout_catalog.addWidget(self.catalog_table)
+        self.verticalLayout_batch.addWidget(self.catalog)
+        self.tabs.addTab(self.batch, "")
+
         self.about = QtWidgets.QWidget()
         self.about.setObjectName("about")
         self.gridLayout_2 = QtWidgets.QGridLayout(self.about)
@@ -3385,10 +4630,9 @@ class Ui_pyKVFinder(object):
         pyKVFinder.setTabOrder(self.ligand_cutoff, self.results_file_entry)
         pyKVFinder.setTabOrder(self.results_file_entry, self.button_browse4)
         pyKVFinder.setTabOrder(self.button_browse4, self.button_load_results)
-        pyKVFinder.setTabOrder(self.button_load_results, self.volume_list)
-        pyKVFinder.setTabOrder(self.volume_list, self.area_list)
-        pyKVFinder.setTabOrder(self.area_list, self.residues_list)
-        pyKVFinder.setTabOrder(self.residues_list, self.about_text)
+        pyKVFinder.setTabOrder(self.button_load_results, self.results_filter)
+        pyKVFinder.setTabOrder(self.results_filter, self.results_table)
+        pyKVFinder.setTabOrder(self.results_table, self.about_text)
 
         self.gui.adjustSize()
     def _setPolicy(self, element):
@@ -3426,6 +4670,13 @@ class Ui_pyKVFinder(object):
         # self.file_locations.setTitle(_translate("pyKVFinder", "File Locations"))
         # self.parKVFinder_label.setText(_translate("pyKVFinder", "parKVFinder:"))
         self.dictionary_label.setText(_translate("pyKVFinder", "vdW dictionary:"))
+        self.memory_budget_label.setText(_translate("pyKVFinder", "Memory Budget (MB):"))
+        self.tiled_detection.setText(_translate("pyKVFinder", "Tiled detection"))
+        self.tiled_detection.setToolTip(_translate("pyKVFinder", "Split the whole-structure search space into padded tiles detected in parallel, for very large assemblies."))
+        self.tile_size_label.setText(_translate("pyKVFinder", "Tile Size (Å):"))
+        self.multiresolution.setText(_translate("pyKVFinder", "Multi-resolution"))
+        self.multiresolution.setToolTip(_translate("pyKVFinder", "Detect cavities on a coarse grid first, then refine them at Step Size only around the coarse cavities."))
+        self.coarse_step_label.setText(_translate("pyKVFinder", "Coarse Step (Å):"))
         self.tabs.setTabText(self.tabs.indexOf(self.main), _translate("pyKVFinder", "Main"))
         self.box_adjustment.setTitle(_translate("pyKVFinder", "Box Adjustment"))
         self.min_y_label.setText(_translate("pyKVFinder", "<html><head/><body><p>Minimum Y (Å):</p></body></html>"))
@@ -3443,6 +4694,21 @@ class Ui_pyKVFinder(object):
         self.max_y_label.setText(_translate("pyKVFinder", "<html><head/><body><p>Maximum Y (Å):</p></body></html>"))
         self.padding_label.setText(_translate("pyKVFinder", "<html><head/><body><p>Padding (Å):</p></body></html>"))
         self.ligand_adjustment.setTitle(_translate("pyKVFinder", "Ligand Adjustment"))
+        self.per_ligand.setText(_translate("pyKVFinder", "Analyze each ligand residue separately"))
+        self.per_ligand.setToolTip(_translate("pyKVFinder", "Detect cavities once and report the descriptors of the pocket around each residue of the ligand model."))
+        self.auto_ligands.setText(_translate("pyKVFinder", "Every ligand residue of the input"))
+        self.auto_ligands.setToolTip(_translate("pyKVFinder", "Use the non-solvent, non-polymer residues of the input as ligands instead of a ligand model, and report the pocket of each one."))
+        self.ligand_pockets.setTitle(_translate("pyKVFinder", "Ligand Pockets"))
+        self.ligand_table.setHorizontalHeaderLabels([
+            _translate("pyKVFinder", "Ligand"),
+            _translate("pyKVFinder", "Cavity"),
+            _translate("pyKVFinder", "Volume"),
+            _translate("pyKVFinder", "Area"),
+            _translate("pyKVFinder", "Max Depth"),
+            _translate("pyKVFinder", "Avg Depth"),
+            _translate("pyKVFinder", "Avg Hydropathy"),
+            _translate("pyKVFinder", "Residues"),
+        ])
         self.ligand_label.setText(_translate("pyKVFinder", "Ligand PDB:"))
         self.refresh_ligand.setText(_translate("pyKVFinder", "Refresh"))
         self.ligand_cutoff_label.setText(_translate("pyKVFinder", "<html><head/><body><p>Ligand Cutoff (Å):</p></body></html>"))
@@ -3451,6 +4717,14 @@ class Ui_pyKVFinder(object):
         self.default_view.setText(_translate("pyKVFinder", "Default"))
         self.depth_view.setText(_translate("pyKVFinder", "Depth"))
         self.hydropathy_view.setText(_translate("pyKVFinder", "Hydropathy"))
+        self.cavity_display_label.setText(_translate("pyKVFinder", "Cavity display:"))
+        self.cavity_display.setItemText(0, _translate("pyKVFinder", "Points"))
+        self.cavity_display.setItemText(1, _translate("pyKVFinder", "Volume"))
+        self.cavity_display.setItemText(2, _translate("pyKVFinder", "Mesh"))
+        self.level_of_detail.setText(_translate("pyKVFinder", "Level of detail"))
+        self.level_of_detail.setToolTip(_translate("pyKVFinder", "While the view moves, cavity models with more points than the budget only show their surface points, thinned to the budget."))
+        self.lod_budget.setToolTip(_translate("pyKVFinder", "Largest number of cavity points drawn while the view moves."))
+        self.cavity_display.setToolTip(_translate("pyKVFinder", "Volume shows a surface around the cavity points of the saved grid, colored by cavity, instead of one atom per point. Mesh shows a smooth surface per cavity as submodels, computed in the background."))
         self.results_information.setTitle(_translate("pyKVFinder", "Information"))
         self.results_file_label.setText(_translate("pyKVFinder", "Results File:"))
         self.input_file_label.setText(_translate("pyKVFinder", "Input File:"))
@@ -3458,12 +4732,19 @@ class Ui_pyKVFinder(object):
         self.cavities_file_label.setText(_translate("pyKVFinder", "Cavities File:"))
         self.step_size_label_2.setText(_translate("pyKVFinder", "Step Size (Å):"))
         self.descriptors.setTitle(_translate("pyKVFinder", "Descriptors"))
-        self.volume_label.setText(_translate("pyKVFinder", "Volume (Å³)"))
-        self.area_label.setText(_translate("pyKVFinder", "<html>Surface Area (Å&#178;)<\\html>"))
-        self.avg_depth_label.setText(_translate("pyKVFinder", "Average Depth (Å)"))
-        self.max_depth_label.setText(_translate("pyKVFinder", "Maximum Depth (Å)"))
-        self.avg_hydropathy_label.setText(_translate("pyKVFinder", "Average Hydropathy"))
-        self.residues_label.setText(_translate("pyKVFinder", "Interface Residues"))
+        self.results_filter_label.setText(_translate("pyKVFinder", "Filter:"))
+        self.results_filter.setPlaceholderText(_translate("pyKVFinder", "e.g. volume>500 HIS"))
+        self.results_filter.setToolTip(_translate("pyKVFinder", "Terms separated by spaces, all of which must match: a descriptor compared with a number (volume, area, avg_depth, max_depth, avg_hydropathy or residues with <, <=, >, >= or =), or text in the cavity name or in a lining residue name."))
+        self.results_model.headers = [
+            _translate("pyKVFinder", "Cavity"),
+            _translate("pyKVFinder", "Volume (Å³)"),
+            _translate("pyKVFinder", "Surface Area (Å²)"),
+            _translate("pyKVFinder", "Average Depth (Å)"),
+            _translate("pyKVFinder", "Maximum Depth (Å)"),
+            _translate("pyKVFinder", "Average Hydropathy"),
+            _translate("pyKVFinder", "Interface Residues"),
+        ]
+        self.results_table.setToolTip(_translate("pyKVFinder", "Select cavities in the Volume or Area columns to color them, in the depth columns to color them by depth, in the hydropathy column to color them by hydropathy, and in the residues column to show their lining residues. Click a header to sort."))
         self.tabs.setTabText(self.tabs.indexOf(self.results), _translate("pyKVFinder", "Results"))
         self.about_text.setHtml(_translate("pyKVFinder", "<!DOCTYPE HTML PUBLIC \"-//W3C//DTD HTML 4.0//EN\" \"http://www.w3.org/TR/REC-html40/strict.dtd\">\n"
 "<html><head><meta name=\"qrichtext\" content=\"1\" /><style type=\"text/css\">\n"
@@ -3506,6 +4787,73 @@ class Ui_pyKVFinder(object):
 "<p style=\" margin-top:12px; margin-bottom:12px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\">Guerra, J.V.d., Ribeiro-Filho, H.V., Jara, G.E. et al. pyKVFinder: an efficient and integrable Python package for biomolecular cavity detection and characterization in data science. BMC Bioinformatics 22, 607 (2021). <a href=\"https://doi.org/10.1186/s12859-021-04519-4\"><span style=\" text-decoration: underline; color:#0000ff;\">https://doi.org/10.1186/s12859-021-04519-4</span></a>.</p>\n"
 "<p style=\" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\">PyMOL citation may be found here:</p>\n"
 "<p style=\" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; -qt-block-indent:0; text-indent:0px;\"><a href=\"http://pymol.sourceforge.net/faq.html#CITE\"><span style=\" text-decoration: underline; color:#0000ff;\">https://pymol.org/2/support.html?</span></a></p></body></html>"))
+        self.sweep_ranges.setTitle(_translate("pyKVFinder", "Parameter Sweep"))
+        self.sweep_probe_in_label.setText(_translate("pyKVFinder", "Probe In (Å):"))
+        self.sweep_probe_out_label.setText(_translate("pyKVFinder", "Probe Out (Å):"))
+        self.sweep_removal_distance_label.setText(_translate("pyKVFinder", "Removal Distance (Å):"))
+        self.sweep_volume_cutoff_label.setText(_translate("pyKVFinder", "Volume Cutoff (Å³):"))
+        self.sweep_help.setText(_translate("pyKVFinder", "Values as \"start:stop:step\" or a comma separated list. The other parameters are taken from the Main and Search Space tabs."))
+        self.sweep_engine.setItemText(0, _translate("pyKVFinder", "pyKVFinder"))
+        self.sweep_engine.setItemText(1, _translate("pyKVFinder", "Distance transform (fast)"))
+        self.sweep_engine.setToolTip(_translate("pyKVFinder", "The distance transform engine derives every combination from one distance field; a few boundary points may differ from pyKVFinder."))
+        self.button_run_sweep.setText(_translate("pyKVFinder", "Run Sweep"))
+        self.sweep_table.setHorizontalHeaderLabels([
+            _translate("pyKVFinder", "Probe In"),
+            _translate("pyKVFinder", "Probe Out"),
+            _translate("pyKVFinder", "Removal Distance"),
+            _translate("pyKVFinder", "Volume Cutoff"),
+            _translate("pyKVFinder", "Cavities"),
+            _translate("pyKVFinder", "Total Volume"),
+            _translate("pyKVFinder", "Largest Volume"),
+        ])
+        self.tracking.setTitle(_translate("pyKVFinder", "Cavity Tracking"))
+        self.min_overlap_label.setText(_translate("pyKVFinder", "Min. Overlap:"))
+        self.min_overlap.setToolTip(_translate("pyKVFinder", "Smallest Jaccard index of grid points for two cavities of different frames to be the same pocket."))
+        self.max_gap_label.setText(_translate("pyKVFinder", "Max. Gap (frames):"))
+        self.button_track_cavities.setText(_translate("pyKVFinder", "Track Cavities"))
+        self.track_table.setHorizontalHeaderLabels([
+            _translate("pyKVFinder", "Track"),
+            _translate("pyKVFinder", "First Frame"),
+            _translate("pyKVFinder", "Last Frame"),
+            _translate("pyKVFinder", "Frames"),
+            _translate("pyKVFinder", "Mean Volume"),
+            _translate("pyKVFinder", "Max Volume"),
+        ])
+        self.comparison.setTitle(_translate("pyKVFinder", "Compare Structures"))
+        self.compare_input_label.setText(_translate("pyKVFinder", "Compare Input PDB with:"))
+        self.compare_input.setToolTip(_translate("pyKVFinder", "Second model, already superposed on the input (e.g. with matchmaker). Both are detected on one grid."))
+        self.refresh_compare_input.setText(_translate("pyKVFinder", "Refresh"))
+        self.button_compare.setText(_translate("pyKVFinder", "Compare"))
+        self.button_compare.setToolTip(_translate("pyKVFinder", "Shared cavity points are shown in gray, lost points in red and gained points in green."))
+        self.compare_table.setHorizontalHeaderLabels([
+            _translate("pyKVFinder", "Structure"),
+            _translate("pyKVFinder", "Cavity"),
+            _translate("pyKVFinder", "Volume"),
+            _translate("pyKVFinder", "Shared Volume"),
+            _translate("pyKVFinder", "Match"),
+            _translate("pyKVFinder", "Jaccard"),
+            _translate("pyKVFinder", "Volume Change"),
+        ])
+        self.catalog.setTitle(_translate("pyKVFinder", "Results Catalog"))
+        self.catalog_min_volume_label.setText(_translate("pyKVFinder", "Min. Volume:"))
+        self.catalog_resname_label.setText(_translate("pyKVFinder", "Lined by:"))
+        self.catalog_resname.setToolTip(_translate("pyKVFinder", "Residue name lining the cavity, e.g. HIS. Leave empty for any residue."))
+        self.catalog_chain_label.setText(_translate("pyKVFinder", "Chain:"))
+        self.catalog_limit_label.setText(_translate("pyKVFinder", "Max. Cavities:"))
+        self.button_catalog_import.setText(_translate("pyKVFinder", "Import Results"))
+        self.button_catalog_import.setToolTip(_translate("pyKVFinder", "Add results files under KV_Files from earlier runs to the catalog. New runs are added automatically."))
+        self.button_catalog_search.setText(_translate("pyKVFinder", "Search"))
+        self.catalog_table.setHorizontalHeaderLabels([
+            _translate("pyKVFinder", "Base Name"),
+            _translate("pyKVFinder", "Input"),
+            _translate("pyKVFinder", "Cavity"),
+            _translate("pyKVFinder", "Volume"),
+            _translate("pyKVFinder", "Area"),
+            _translate("pyKVFinder", "Max Depth"),
+            _translate("pyKVFinder", "Avg Depth"),
+            _translate("pyKVFinder", "Avg Hydropathy"),
+        ])
+        self.tabs.setTabText(self.tabs.indexOf(self.batch), _translate("pyKVFinder", "Batch"))
         self.tabs.setTabText(self.tabs.indexOf(self.about), _translate("pyKVFinder", "About"))
         
 """
@@ -0,0 +1,165 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Per-ligand cavity analysis on a single detection.
+
+Cavities are detected once for the whole receptor; each ligand then gets
+the cavity points within the ligand cutoff of its atoms, found with a cell
+list over the cavity points. Volume, area and residues of those points are
+computed on a grid cropped around them, while depths and hydropathy are
+read from the whole-receptor grids, so a pocket point has the same depth
+in the per-ligand table as in the run. Like `pipeline`, this module has no ChimeraX or Qt
+dependency.
+"""
+
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyKVFinder
+
+from .detection import relabel_cavities
+from .pipeline import CellList, cavity_name, grid_axes, grid_dimensions, subgrid_vertices
+
+COLUMNS = ["ligand", "cavity", "volume", "area", "max_depth", "avg_depth", "avg_hydropathy", "residues"]
+
+
+def ligand_residues(latomic):
+    """Split ligand atomic data into one ligand per residue.
+
+    Parameters
+    ----------
+    latomic : numpy.ndarray
+        Ligand atomic data, as returned by `pipeline.atomic_from_atoms`.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping ``"<resname>_<resnum>_<chain>"`` to the atomic
+        data of that residue, in input order.
+    """
+    keys = np.char.add(np.char.add(np.char.add(np.char.add(latomic[:, 2], "_"), latomic[:, 0]), "_"), latomic[:, 1])
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return {keys[i]: latomic[inverse == j] for j, i in sorted(enumerate(first), key=lambda item: item[1])}
+
+
+def ligand_pockets(cavities, depths, scales, atomic, vertices, step, ligands, ligand_cutoff=5.0, probe_in=1.4, ignore_backbone=False, nworkers=None):
+    """Characterize the cavity region of each ligand.
+
+    Parameters
+    ----------
+    cavities : numpy.ndarray
+        Cavity grid of the whole receptor, as returned by `pyKVFinder.detect`.
+    depths : numpy.ndarray
+        Depth of each point of `cavities`, as returned by `pyKVFinder.depth`.
+    scales : numpy.ndarray
+        Hydrophobicity scale of each surface point of `cavities`, as
+        returned by `pyKVFinder.hydropathy`.
+    atomic : numpy.ndarray
+        Receptor atomic data used in detection.
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the grid vertices.
+    step : float
+        Grid spacing (A).
+    ligands : dict
+        A dictionary mapping ligand names to their atomic data.
+    ligand_cutoff : float, optional
+        Cavity points farther than this distance (A) from every atom of a
+        ligand do not belong to its pocket. Defaults to 5.0.
+    probe_in : float, optional
+        Probe In size (A), used by constitutional characterization.
+        Defaults to 1.4.
+    ignore_backbone : bool, optional
+        Whether backbone atoms are ignored in constitutional
+        characterization. Defaults to False.
+    nworkers : int, optional
+        Number of ligands characterized at the same time. Defaults to the
+        number of CPUs.
+
+    Returns
+    -------
+    list
+        One dictionary per (ligand, cavity) pair with the `COLUMNS` keys.
+        Cavity names are those of the whole-receptor cavities; descriptors
+        only cover the points within the cutoff of the ligand. Ligands
+        without cavity points get a single row with an empty cavity.
+    """
+    shape = np.asarray(grid_dimensions(vertices, step))
+    origin, axes = grid_axes(vertices)
+    points = np.argwhere(cavities >= 2)
+    point_index = CellList(origin + (points * step) @ axes)
+    atom_index = CellList(atomic[:, 4:7].astype(np.float64))
+
+    def analyze(item):
+        name, latomic = item
+        near = point_index.query_radius(latomic[:, 4:7].astype(np.float64), ligand_cutoff)
+        if len(near) == 0:
+            return [dict(ligand=name, cavity="", volume=0.0, area=0.0, max_depth=0.0, avg_depth=0.0, avg_hydropathy=0.0, residues=[])]
+
+        # Crop around the pocket points with a one point border
+        ijk = points[near]
+        start = np.maximum(ijk.min(axis=0) - 1, 0)
+        stop = np.minimum(ijk.max(axis=0) + 2, shape)
+        pocket = cavities[start[0]:stop[0], start[1]:stop[1], start[2]:stop[2]].copy()
+        keep = np.zeros(pocket.shape, dtype=bool)
+        keep[tuple((ijk - start).T)] = True
+        # Other cavity points become empty points, not bulk, so they neither
+        # add surface nor change the depth of the pocket points
+        pocket[(pocket >= 2) & ~keep] = 1
+
+        # Renumber from 2 and remember the whole-receptor names
+        labels = np.unique(pocket[pocket >= 2])
+        names = {cavity_name(i): cavity_name(int(label) - 2) for i, label in enumerate(labels)}
+        relabel_cavities(pocket, step, 0.0)
+
+        pocket_vertices = subgrid_vertices(vertices, step, start, tuple(int(n) for n in stop - start))
+        pocket_atomic = atomic[atom_index.query_grid(pocket_vertices, probe_in + 3.0)]
+        surface, volume, area = pyKVFinder.spatial(pocket, step=step, nthreads=1)
+        if len(pocket_atomic):
+            residues = pyKVFinder.constitutional(pocket, pocket_atomic, pocket_vertices, step=step, probe_in=probe_in, ignore_backbone=ignore_backbone, nthreads=1)
+        else:
+            residues = {}
+
+        # Depths of the pocket points and scales of its surface points, read
+        # from the whole-receptor grids
+        box = tuple(slice(a, b) for a, b in zip(start, stop))
+        at_pocket = pocket >= 2
+        pocket_labels = pocket[at_pocket] - 2
+        pocket_depths = depths[box][at_pocket]
+        max_depth = np.zeros(len(names))
+        np.maximum.at(max_depth, pocket_labels, pocket_depths)
+        avg_depth = np.bincount(pocket_labels, weights=pocket_depths, minlength=len(names)) / np.bincount(pocket_labels, minlength=len(names))
+        at_surface = surface >= 2
+        surface_labels = surface[at_surface] - 2
+        npoints = np.bincount(surface_labels, minlength=len(names))
+        with np.errstate(invalid="ignore"):
+            avg_hydropathy = np.bincount(surface_labels, weights=scales[box][at_surface], minlength=len(names)) / npoints
+        avg_hydropathy[npoints == 0] = 0.0
+
+        return [
+            dict(
+                ligand=name, cavity=names[key], volume=volume[key], area=area[key],
+                max_depth=round(float(max_depth[i]), 2), avg_depth=round(float(avg_depth[i]), 2),
+                avg_hydropathy=round(float(avg_hydropathy[i]), 2), residues=residues.get(key, []),
+            )
+            for i, key in enumerate(sorted(names))
+        ]
+
+    if nworkers is None:
+        nworkers = os.cpu_count() or 1
+    rows = []
+    with ThreadPoolExecutor(max_workers=max(1, nworkers)) as executor:
+        for ligand_rows in executor.map(analyze, ligands.items()):
+            rows.extend(ligand_rows)
+    return rows
+
+
+def write_table(rows, fn):
+    """Write per-ligand rows to a CSV file; residues are written as ``resnum_chain_resname`` separated by semicolons."""
+    with open(fn, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            row = dict(row)
+            row["residues"] = ";".join("_".join(residue) for residue in row["residues"])
+            writer.writerow(row)
@@ -0,0 +1,464 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Headless helpers of the cavity pipeline.
+
+Nothing in this module imports ChimeraX or Qt, so it can be used by the
+KVFinder tool as well as by scripts and benchmarks running in a plain
+Python interpreter.
+"""
+
+import json
+
+import numpy as np
+import pyKVFinder
+
+
+def atomic_from_arrays(residue_numbers, chain_ids, residue_names, atom_names, elements, coords, vdw=None):
+    """Build the pyKVFinder atomic array from per-atom arrays.
+
+    Parameters
+    ----------
+    residue_numbers : array-like
+        Residue number of each atom.
+    chain_ids : array-like
+        Chain identifier of each atom.
+    residue_names : array-like
+        Residue name of each atom.
+    atom_names : array-like
+        Atom name of each atom.
+    elements : array-like
+        Element symbol of each atom.
+    coords : numpy.ndarray
+        An array with shape (n, 3) with the atomic coordinates.
+    vdw : dict, optional
+        A van der Waals radii dictionary, as returned by `pyKVFinder.read_vdw`.
+        Defaults to the pyKVFinder built-in dictionary.
+
+    Returns
+    -------
+    atomic : numpy.ndarray
+        An array with shape (n, 8) containing the atomic information
+        (residue number, chain, residue name, atom name, x, y, z, radius).
+    missing : list
+        A list of (residue name, atom name, element, radius) tuples, one for
+        each distinct atom that was not found in the dictionary and received
+        the generic radius of its element.
+    """
+    if vdw is None:
+        vdw = pyKVFinder.read_vdw()
+
+    residue_names = np.char.upper(np.asarray(residue_names, dtype=str))
+    atom_names = np.char.upper(np.asarray(atom_names, dtype=str))
+    elements = np.char.upper(np.asarray(elements, dtype=str))
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+
+    # Look up each distinct (residue, atom) pair once instead of once per atom
+    pairs = np.char.add(np.char.add(residue_names, "\t"), atom_names)
+    unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+    radii = np.empty(len(unique_pairs), dtype=np.float64)
+    missing = []
+    for i, pair in enumerate(unique_pairs):
+        residue_name, atom_name = pair.split("\t")
+        if residue_name in vdw.keys() and atom_name in vdw[residue_name].keys():
+            radii[i] = vdw[residue_name][atom_name]
+        else:
+            element = elements[np.argmax(inverse == i)]
+            radii[i] = vdw["GEN"][element]
+            missing.append((residue_name, atom_name, element, radii[i]))
+
+    atomic = np.empty(shape=(len(coords), 8), dtype='<U32')
+    atomic[:, 0] = np.asarray(residue_numbers).astype(str)
+    atomic[:, 1] = np.asarray(chain_ids, dtype=str)
+    atomic[:, 2] = residue_names
+    atomic[:, 3] = atom_names
+    atomic[:, 4:7] = coords.astype(str)
+    atomic[:, 7] = radii[inverse].astype(str)
+
+    return atomic, missing
+
+
+def atomic_from_atoms(atoms, vdw=None):
+    """Build the pyKVFinder atomic array from a ChimeraX ``Atoms`` collection.
+
+    Only the vectorized collection attributes are used (``coords``, ``names``,
+    ``element_names`` and ``residues.names``, ``residues.numbers``,
+    ``residues.chain_ids``), so any object exposing them can be passed.
+
+    Parameters
+    ----------
+    atoms : chimerax.atomic.Atoms
+        The atoms to convert.
+    vdw : dict, optional
+        A van der Waals radii dictionary. Defaults to the pyKVFinder built-in
+        dictionary.
+
+    Returns
+    -------
+    tuple
+        The same (atomic, missing) pair returned by `atomic_from_arrays`.
+    """
+    residues = atoms.residues
+    return atomic_from_arrays(
+        residues.numbers, residues.chain_ids, residues.names,
+        atoms.names, atoms.element_names, atoms.coords, vdw=vdw,
+    )
+
+
+def vertices_from_coords(coords, probe_out=4.0, step=0.6):
+    """Vertices of the grid enclosing ``coords`` padded by ``probe_out + step``.
+
+    This mirrors `pyKVFinder.get_vertices`, but only needs the coordinates,
+    so it can run before the atomic array is extracted.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        An array with shape (n, 3) with the atomic coordinates.
+    probe_out : float, optional
+        Probe Out size (A). Defaults to 4.0.
+    step : float, optional
+        Grid spacing (A). Defaults to 0.6.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array with shape (4, 3) with the origin and the X, Y and Z axis
+        vertices of the grid.
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+    x_min, y_min, z_min = coords.min(axis=0) - probe_out - step
+    x_max, y_max, z_max = coords.max(axis=0) + probe_out + step
+    return np.array([
+        [x_min, y_min, z_min],
+        [x_max, y_min, z_min],
+        [x_min, y_max, z_min],
+        [x_min, y_min, z_max],
+    ])
+
+
+def cavity_name(index):
+    """Name of the cavity of label ``index + 2`` (KAA, KAB, ...), as given by pyKVFinder."""
+    return f"K{chr(65 + int(index / 26) % 26)}{chr(65 + (index % 26))}"
+
+
+def grid_dimensions(vertices, step):
+    """Number of grid points along each axis, as computed by pyKVFinder.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the grid vertices.
+    step : float
+        Grid spacing (A).
+
+    Returns
+    -------
+    tuple
+        The grid dimensions (nx, ny, nz).
+    """
+    p1, p2, p3, p4 = np.asarray(vertices, dtype=np.float64)
+    nx = int(np.linalg.norm(p2 - p1) // step) + 1
+    ny = int(np.linalg.norm(p3 - p1) // step) + 1
+    nz = int(np.linalg.norm(p4 - p1) // step) + 1
+    return nx, ny, nz
+
+
+
+def grid_axes(vertices):
+    """Origin and unit axis vectors of the grid defined by ``vertices``.
+
+    Returns
+    -------
+    origin : numpy.ndarray
+        The grid origin (P1).
+    axes : numpy.ndarray
+        An array with shape (3, 3) whose rows are the unit X, Y and Z axes.
+    """
+    p1, p2, p3, p4 = np.asarray(vertices, dtype=np.float64)
+    axes = np.array([p2 - p1, p3 - p1, p4 - p1])
+    axes /= np.linalg.norm(axes, axis=1)[:, None]
+    return p1, axes
+
+
+def grid_coordinates(coords, vertices, step):
+    """Convert Cartesian coordinates to fractional grid indices."""
+    origin, axes = grid_axes(vertices)
+    return (np.asarray(coords, dtype=np.float64).reshape(-1, 3) - origin) @ axes.T / step
+
+
+def subgrid_vertices(vertices, step, start, shape):
+    """Vertices of the sub-grid starting at grid index ``start`` with ``shape`` points.
+
+    The axis lengths are padded by half a step so that `grid_dimensions`
+    (and pyKVFinder) give back exactly ``shape`` despite rounding.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the vertices of the full grid.
+    step : float
+        Grid spacing (A).
+    start : tuple
+        Grid index (i, j, k) of the sub-grid origin in the full grid.
+    shape : tuple
+        Number of points (nx, ny, nz) of the sub-grid.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array with shape (4, 3) with the sub-grid vertices.
+    """
+    origin, axes = grid_axes(vertices)
+    p1 = origin + step * (np.asarray(start, dtype=np.float64) @ axes)
+    lengths = (np.asarray(shape, dtype=np.float64) - 1 + 0.5) * step
+    return np.array([p1, p1 + lengths[0] * axes[0], p1 + lengths[1] * axes[1], p1 + lengths[2] * axes[2]])
+
+
+def subgrid_around(vertices, step, coords, margin):
+    """Vertices of the part of a grid within ``margin`` of the bounding box of ``coords``.
+
+    The sub-grid points coincide with points of the full grid, so detection
+    on it gives the same cavity points as on the full grid in that region.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the vertices of the full grid.
+    step : float
+        Grid spacing (A).
+    coords : numpy.ndarray
+        An array with shape (n, 3) with the coordinates of interest.
+    margin : float
+        Distance (A) added around the bounding box of ``coords``.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array with shape (4, 3) with the sub-grid vertices.
+    """
+    shape = np.asarray(grid_dimensions(vertices, step))
+    ijk = grid_coordinates(coords, vertices, step)
+    start = np.clip(np.floor(ijk.min(axis=0) - margin / step), 0, shape - 1).astype(int)
+    stop = np.clip(np.ceil(ijk.max(axis=0) + margin / step) + 1, start + 1, shape).astype(int)
+    return subgrid_vertices(vertices, step, start, stop - start)
+
+
+def search_margin(probe_out=4.0, removal_distance=2.4, rmax=3.0):
+    """Distance (A) beyond which atoms cannot change the cavities of a region.
+
+    A grid point can only be affected by Probe Out positions within
+    ``probe_out`` of it, by the atoms within ``probe_out + rmax`` of those
+    positions and by the removal of the cavity frontier.
+    """
+    return 2 * probe_out + removal_distance + rmax
+
+
+class CellList(object):
+    """Uniform grid of cells over a set of points for spatial queries.
+
+    Points are sorted by cell once, so a query only looks at the points of
+    the cells it overlaps instead of at every point.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        An array with shape (n, 3) with the point coordinates.
+    cell_size : float, optional
+        Edge length (A) of the cells. Defaults to 8.0.
+    """
+
+    def __init__(self, coords, cell_size=8.0):
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+        self.cell_size = float(cell_size)
+        if len(self.coords):
+            self.origin = self.coords.min(axis=0)
+            cells = np.floor((self.coords - self.origin) / self.cell_size).astype(np.int64)
+            self.shape = tuple(int(n) for n in cells.max(axis=0) + 1)
+            keys = np.ravel_multi_index(cells.T, self.shape)
+        else:
+            self.origin = np.zeros(3)
+            self.shape = (1, 1, 1)
+            keys = np.zeros(0, dtype=np.int64)
+        self.order = np.argsort(keys, kind="stable")
+        # Points of cell c are order[bounds[c]:bounds[c + 1]]
+        self.bounds = np.searchsorted(keys[self.order], np.arange(int(np.prod(self.shape)) + 1))
+
+    def __len__(self):
+        return len(self.coords)
+
+    def _cell_range(self, lower, upper):
+        """Slices of the cells overlapping the axis-aligned box [lower, upper], or None."""
+        lo = np.floor((np.asarray(lower) - self.origin) / self.cell_size).astype(np.int64)
+        hi = np.floor((np.asarray(upper) - self.origin) / self.cell_size).astype(np.int64)
+        shape = np.asarray(self.shape)
+        if np.any(hi < 0) or np.any(lo >= shape):
+            return None
+        lo = np.clip(lo, 0, shape - 1)
+        hi = np.clip(hi, 0, shape - 1)
+        return tuple(slice(a, b + 1) for a, b in zip(lo, hi))
+
+    def _points_in_cells(self, cell_mask):
+        """Indices of the points in the cells flagged in ``cell_mask``."""
+        cells = np.flatnonzero(cell_mask)
+        starts = self.bounds[cells]
+        lengths = self.bounds[cells + 1] - starts
+        # Concatenate the ranges starts[i]:starts[i] + lengths[i]
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return self.order[np.arange(lengths.sum()) + offsets]
+
+    def query_box(self, lower, upper):
+        """Sorted indices of the points inside the axis-aligned box [lower, upper]."""
+        cell_mask = np.zeros(self.shape, dtype=bool)
+        cells = self._cell_range(lower, upper)
+        if cells is None or len(self) == 0:
+            return np.zeros(0, dtype=np.int64)
+        cell_mask[cells] = True
+        candidates = self._points_in_cells(cell_mask.ravel())
+        coords = self.coords[candidates]
+        inside = np.all((coords >= lower) & (coords <= upper), axis=1)
+        return np.sort(candidates[inside])
+
+    def query_radius(self, points, radius):
+        """Sorted indices of the points within ``radius`` of any of ``points``."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        cell_mask = np.zeros(self.shape, dtype=bool)
+        for point in points:
+            cells = self._cell_range(point - radius, point + radius)
+            if cells is not None:
+                cell_mask[cells] = True
+        if len(self) == 0 or not cell_mask.any():
+            return np.zeros(0, dtype=np.int64)
+        candidates = self._points_in_cells(cell_mask.ravel())
+
+        near = np.zeros(len(candidates), dtype=bool)
+        chunk = max(1, 2**20 // len(points))
+        for start in range(0, len(candidates), chunk):
+            coords = self.coords[candidates[start:start + chunk]]
+            d2 = ((coords[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+            near[start:start + chunk] = np.any(d2 <= radius ** 2, axis=1)
+        return np.sort(candidates[near])
+
+    def query_grid(self, vertices, margin=0.0):
+        """Sorted indices of the points within ``margin`` (A) of the (possibly rotated) grid box."""
+        origin, axes = grid_axes(vertices)
+        p1, p2, p3, p4 = np.asarray(vertices, dtype=np.float64)
+        lengths = np.linalg.norm([p2 - p1, p3 - p1, p4 - p1], axis=1)
+
+        # Axis-aligned bounding box of the grid corners, then the exact test
+        corners = origin + np.array([[i, j, k] for i in (0, 1) for j in (0, 1) for k in (0, 1)]) * lengths @ axes
+        candidates = self.query_box(corners.min(axis=0) - margin, corners.max(axis=0) + margin)
+        local = (self.coords[candidates] - origin) @ axes.T
+        inside = np.all((local >= -margin) & (local <= lengths + margin), axis=1)
+        return candidates[inside]
+
+
+class CostModel(object):
+    """Linear model of the memory and runtime of a cavity detection run.
+
+    Memory is dominated by the 3D grids allocated by detection and
+    characterization (cavities, surface, depths and scales, plus the
+    working grids of `pyKVFinder.detect`) and by the string atomic array.
+    Runtime is modelled as ``seconds_per_voxel * voxels + seconds_per_atom *
+    atoms``; the two coefficients start from rough defaults and are refitted
+    by least squares every time a measured run is added with `add_sample`.
+    """
+
+    def __init__(self, bytes_per_voxel=36.0, result_bytes_per_voxel=24.0, bytes_per_atom=1024.0, seconds_per_voxel=2.0e-7, seconds_per_atom=2.0e-5, samples=None):
+        self.bytes_per_voxel = bytes_per_voxel
+        self.result_bytes_per_voxel = result_bytes_per_voxel
+        self.bytes_per_atom = bytes_per_atom
+        self.seconds_per_voxel = seconds_per_voxel
+        self.seconds_per_atom = seconds_per_atom
+        self.samples = list(samples) if samples else []
+
+    def estimate(self, vertices, step, natoms, tile_voxels=None):
+        """Estimate the grid size, peak memory and runtime of a run.
+
+        Parameters
+        ----------
+        vertices : numpy.ndarray
+            An array with shape (4, 3) with the grid vertices.
+        step : float
+            Grid spacing (A).
+        natoms : int
+            Number of atoms passed to detection.
+        tile_voxels : int, optional
+            Number of points of all tiles processed at once in tiled
+            detection. Detection working grids are then bounded by the tiles,
+            while the result grids still cover the whole grid.
+
+        Returns
+        -------
+        dict
+            A dictionary with the grid ``shape``, the number of ``voxels``,
+            the estimated peak memory in ``bytes`` and runtime in ``seconds``.
+        """
+        shape = grid_dimensions(vertices, step)
+        voxels = int(shape[0]) * int(shape[1]) * int(shape[2])
+        if tile_voxels is None:
+            grid_bytes = self.bytes_per_voxel * voxels
+        else:
+            grid_bytes = self.result_bytes_per_voxel * voxels + self.bytes_per_voxel * min(tile_voxels, voxels)
+        return {
+            "shape": shape,
+            "voxels": voxels,
+            "bytes": grid_bytes + self.bytes_per_atom * natoms,
+            "seconds": self.seconds_per_voxel * voxels + self.seconds_per_atom * natoms,
+        }
+
+    def add_sample(self, voxels, natoms, seconds, max_samples=50):
+        """Record a measured run and refit the runtime coefficients.
+
+        Only the ``max_samples`` most recent runs are kept, so the model
+        follows changes of hardware or pyKVFinder version.
+        """
+        self.samples.append((int(voxels), int(natoms), float(seconds)))
+        self.samples = self.samples[-max_samples:]
+        if len(self.samples) < 2:
+            voxels, natoms, seconds = self.samples[0]
+            # Keep the ratio between coefficients and match the single run
+            predicted = self.seconds_per_voxel * voxels + self.seconds_per_atom * natoms
+            if predicted > 0:
+                self.seconds_per_voxel *= seconds / predicted
+                self.seconds_per_atom *= seconds / predicted
+            return
+        samples = np.array(self.samples, dtype=np.float64)
+        coefficients, *_ = np.linalg.lstsq(samples[:, :2], samples[:, 2], rcond=None)
+        # A negative coefficient is an artifact of too few or collinear samples
+        if np.all(coefficients > 0):
+            self.seconds_per_voxel, self.seconds_per_atom = (float(c) for c in coefficients)
+
+    def to_dict(self):
+        return {
+            "bytes_per_voxel": self.bytes_per_voxel,
+            "result_bytes_per_voxel": self.result_bytes_per_voxel,
+            "bytes_per_atom": self.bytes_per_atom,
+            "seconds_per_voxel": self.seconds_per_voxel,
+            "seconds_per_atom": self.seconds_per_atom,
+            "samples": self.samples,
+        }
+
+    def save(self, fn):
+        with open(fn, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, fn):
+        """Load a saved model, or return the default model if ``fn`` is missing or unreadable.
+
+        Unknown keys, e.g. from another version or a hand edit, are
+        ignored.
+        """
+        try:
+            with open(fn) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict):
+            return cls()
+        data = {key: value for key, value in data.items() if key in cls().to_dict()}
+        try:
+            data = {key: [tuple(sample) for sample in value or []] if key == "samples" else float(value) for key, value in data.items()}
+            return cls(**data)
+        except (TypeError, ValueError):
+            return cls()
@@ -0,0 +1,250 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Binary results files.
+
+``<base_name>.KVFinder.results.npz`` holds the same results as the TOML
+file of `pyKVFinder.write_results` as NumPy arrays: one array per
+descriptor aligned with the cavity names, the residues as one flat table
+with the index of their cavity, and optionally the cavity grid with its
+vertices. Each array is a separate member of the archive and is only read
+when accessed, so reading the descriptors does not decompress the grid.
+`read_results` reads either format into the dictionary layout of the TOML
+file.
+
+The grids of a run can instead be kept as plain ``.npy`` files next to the
+results (`write_grids`), which `read_grids` memory-maps: reopening a run
+only reads the pages of the grids that are actually used. Like `pipeline`,
+this module has no ChimeraX or Qt dependency.
+"""
+
+import os
+
+import numpy as np
+import pyKVFinder
+import toml
+
+FORMAT_VERSION = 1
+
+DESCRIPTORS = ["VOLUME", "AREA", "MAX_DEPTH", "AVG_DEPTH", "AVG_HYDROPATHY"]
+
+GRIDS = ["cavities", "depths", "scales"]
+
+
+def results_prefix(fn):
+    """Path of a results file without its ``.KVFinder.results.*`` suffix."""
+    return fn.split(".KVFinder.results")[0]
+
+
+def grid_file(prefix, name):
+    """Path of a grid file (``"cavities"``, ``"depths"``, ``"scales"``, ``"vertices"`` or ``"step"``)."""
+    return f"{prefix}.{name}.npy"
+
+
+def write_grids(prefix, cavities, vertices, step, depths=None, scales=None):
+    """Write the grids of a run as ``<prefix>.<name>.npy`` files.
+
+    Parameters
+    ----------
+    prefix : str
+        Path of the results without suffix (see `results_prefix`).
+    cavities : numpy.ndarray
+        Cavity grid, as returned by `pyKVFinder.detect`.
+    vertices : numpy.ndarray
+        An array with shape (4, 3) with the grid vertices; the first one is
+        the grid origin.
+    step : float
+        Grid spacing (A).
+    depths, scales : numpy.ndarray, optional
+        Depth and hydropathy grids.
+    """
+    os.makedirs(os.path.abspath(os.path.dirname(prefix)), exist_ok=True)
+    np.save(grid_file(prefix, "vertices"), np.asarray(vertices, dtype=np.float64))
+    np.save(grid_file(prefix, "step"), np.array(float(step)))
+    for name, grid in zip(GRIDS, (cavities, depths, scales)):
+        if grid is not None:
+            np.save(grid_file(prefix, name), np.ascontiguousarray(grid))
+        elif os.path.exists(grid_file(prefix, name)):
+            os.remove(grid_file(prefix, name))
+
+
+def read_grids(prefix, mmap_mode="r"):
+    """Memory-map the grids written by `write_grids`.
+
+    Parameters
+    ----------
+    prefix : str
+        Path of the results without suffix (see `results_prefix`).
+    mmap_mode : str, optional
+        Mode of `numpy.load`; None reads the grids into memory. Defaults to
+        ``"r"`` (read-only).
+
+    Returns
+    -------
+    dict or None
+        The ``cavities``, ``depths`` and ``scales`` grids that exist, the
+        ``vertices`` and the ``step``, or None when there is no cavity grid.
+    """
+    if not os.path.exists(grid_file(prefix, "cavities")):
+        return None
+    grids = {name: np.load(grid_file(prefix, name), mmap_mode=mmap_mode) for name in GRIDS if os.path.exists(grid_file(prefix, name))}
+    grids["vertices"] = np.load(grid_file(prefix, "vertices"))
+    grids["step"] = float(np.load(grid_file(prefix, "step")))
+    return grids
+
+
+def write_results(fn, input, ligand, output, volume=None, area=None, max_depth=None, avg_depth=None, avg_hydropathy=None, residues=None, frequencies=None, step=0.6, cavities=None, vertices=None, depths=None, scales=None):
+    """Write results to a binary results file.
+
+    Parameters
+    ----------
+    fn : str
+        Path of the ``.npz`` file.
+    input, ligand, output, volume, area, max_depth, avg_depth, avg_hydropathy, residues, frequencies, step
+        Same as `pyKVFinder.write_results`. Frequencies are not stored;
+        they are recomputed from the residues on reading.
+    cavities : numpy.ndarray, optional
+        Cavity grid, stored with ``vertices``.
+    vertices : numpy.ndarray, optional
+        An array with shape (4, 3) with the grid vertices.
+    depths, scales : numpy.ndarray, optional
+        Depth and hydropathy grids, stored with the cavity grid.
+    """
+    names = sorted(volume or {})
+    arrays = {
+        "version": np.array(FORMAT_VERSION),
+        "files": np.array([os.path.abspath(path) if path else "" for path in (input, ligand, output)]),
+        "step": np.array(float(step)),
+        "names": np.array(names, dtype="U3"),
+    }
+    for key, values in zip(DESCRIPTORS, (volume, area, max_depth, avg_depth, avg_hydropathy)):
+        if values is not None:
+            arrays[key.lower()] = np.array([values.get(name, np.nan) for name in names], dtype=np.float64)
+    if avg_hydropathy is not None and "EisenbergWeiss" in avg_hydropathy:
+        arrays["hydropathy_range"] = np.array(avg_hydropathy["EisenbergWeiss"], dtype=np.float64)
+
+    if residues is not None:
+        table = [(i, *residue[:3]) for i, name in enumerate(names) for residue in residues.get(name, [])]
+        index, resnum, chain, resname = zip(*table) if table else ((), (), (), ())
+        arrays["residue_cavity"] = np.array(index, dtype=np.int32)
+        arrays["residue_resnum"] = np.array(resnum, dtype=str)
+        arrays["residue_chain"] = np.array(chain, dtype=str)
+        arrays["residue_resname"] = np.array(resname, dtype=str)
+
+    if cavities is not None:
+        arrays["cavities"] = cavities
+        arrays["vertices"] = np.asarray(vertices, dtype=np.float64)
+        if depths is not None:
+            arrays["depths"] = depths
+        if scales is not None:
+            arrays["scales"] = scales
+
+    os.makedirs(os.path.abspath(os.path.dirname(fn)), exist_ok=True)
+    np.savez_compressed(fn, **arrays)
+
+
+class ResultsFile(object):
+    """Lazy reader of a binary results file.
+
+    Each section is read from the archive the first time it is accessed.
+
+    Parameters
+    ----------
+    fn : str
+        Path of the ``.npz`` file.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        self._data = np.load(fn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._data.close()
+
+    def __contains__(self, key):
+        return key in self._data.files
+
+    @property
+    def names(self):
+        """Cavity names, sorted."""
+        return [str(name) for name in self._data["names"]]
+
+    @property
+    def step(self):
+        return float(self._data["step"])
+
+    def files(self):
+        """Input, ligand and output paths, as in the ``FILES`` section of the TOML file."""
+        keys = ("INPUT", "LIGAND", "OUTPUT")
+        return {key: str(path) for key, path in zip(keys, self._data["files"]) if str(path)}
+
+    def descriptor(self, key):
+        """Values of one descriptor (e.g. ``"VOLUME"``) keyed by cavity name, or None when not stored."""
+        if key.lower() not in self._data.files:
+            return None
+        values = {name: float(value) for name, value in zip(self.names, self._data[key.lower()])}
+        if key == "AVG_HYDROPATHY" and "hydropathy_range" in self._data.files:
+            values["EisenbergWeiss"] = [float(value) for value in self._data["hydropathy_range"]]
+        return values
+
+    def residues(self):
+        """Residues of each cavity as ``[resnum, chain, resname]`` lists, or None when not stored."""
+        if "residue_cavity" not in self._data.files:
+            return None
+        names = self.names
+        residues = {name: [] for name in names}
+        for i, resnum, chain, resname in zip(
+            self._data["residue_cavity"].tolist(), self._data["residue_resnum"].tolist(),
+            self._data["residue_chain"].tolist(), self._data["residue_resname"].tolist(),
+        ):
+            residues[names[i]].append([resnum, chain, resname])
+        return residues
+
+    def grid(self, name="cavities"):
+        """A stored grid (``"cavities"``, ``"depths"`` or ``"scales"``), or None.
+
+        Grids not in the archive are memory-mapped from the ``.npy`` files
+        of `write_grids` next to it, if any.
+        """
+        if name in self._data.files:
+            return self._data[name]
+        fn = grid_file(results_prefix(self.fn), name)
+        return np.load(fn, mmap_mode="r") if os.path.exists(fn) else None
+
+    @property
+    def vertices(self):
+        if "vertices" in self._data.files:
+            return self._data["vertices"]
+        fn = grid_file(results_prefix(self.fn), "vertices")
+        return np.load(fn) if os.path.exists(fn) else None
+
+    def to_dict(self):
+        """All sections but the grids, in the dictionary layout of the TOML results file."""
+        results = {key: self.descriptor(key) for key in DESCRIPTORS}
+        results["RESIDUES"] = self.residues()
+        if results["RESIDUES"] is not None:
+            results["FREQUENCY"] = pyKVFinder.calculate_frequencies(results["RESIDUES"])
+        return {
+            "FILES": self.files(),
+            "PARAMETERS": {"STEP": self.step},
+            "RESULTS": {key: value for key, value in results.items() if value is not None},
+        }
+
+
+def read_results(fn):
+    """Read a TOML or binary results file.
+
+    Returns
+    -------
+    dict
+        The results in the dictionary layout of the TOML results file.
+    """
+    if fn.endswith(".npz"):
+        with ResultsFile(fn) as f:
+            return f.to_dict()
+    return toml.load(fn)
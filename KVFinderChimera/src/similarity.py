@@ -0,0 +1,325 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Similarity index over cavity shapes and lining residues.
+
+Each cavity is reduced to two sets: the voxels of its points after moving
+them to their centroid and principal axes (so the same pocket in another
+pose or on another grid gives a similar set), and the residue types lining
+it as returned by `pyKVFinder.constitutional`, counted with multiplicity.
+Each set gets a MinHash signature, whose agreement estimates the Jaccard
+index of the sets, and the signatures are split in bands hashed into LSH
+buckets, so a query only scores the cavities sharing a bucket with it.
+Cavities without residues (e.g. stored without constitutional
+characterization) have an empty residue set, which gets no residue buckets
+and is compared on shape alone.
+Like `pipeline`, this module has no ChimeraX or Qt dependency.
+"""
+
+import zlib
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from .pipeline import cavity_name, grid_axes
+
+# Hash values are taken modulo a Mersenne prime and kept to 32 bits; with
+# 32 bit tokens and coefficients, a * x + b cannot overflow 64 bits
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def pose_normalize(points):
+    """Move points to their centroid and principal axes.
+
+    Axes are sorted by decreasing variance and oriented so that the third
+    moment along each one is positive, which makes the result independent
+    of the input pose.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Coordinates (A) with shape (n, 3).
+
+    Returns
+    -------
+    numpy.ndarray
+        The normalized coordinates with shape (n, 3).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    centered = points - points.mean(axis=0)
+    if len(points) < 3:
+        return centered
+    _, vectors = np.linalg.eigh(centered.T @ centered)
+    normalized = centered @ vectors[:, ::-1]
+    signs = np.where((normalized ** 3).sum(axis=0) < 0, -1.0, 1.0)
+    return normalized * signs
+
+
+def _mix(keys):
+    """32 bit hashes of 64 bit integer keys (splitmix64 finalizer)."""
+    keys = keys.astype(np.uint64)
+    keys ^= keys >> np.uint64(30)
+    keys *= np.uint64(0xBF58476D1CE4E5B9)
+    keys ^= keys >> np.uint64(27)
+    keys *= np.uint64(0x94D049BB133111EB)
+    keys ^= keys >> np.uint64(31)
+    return keys & _MAX_HASH
+
+
+def shape_tokens(points, resolution=1.0):
+    """Hashes of the voxels of pose-normalized cavity points.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Coordinates (A) of the cavity points with shape (n, 3).
+    resolution : float, optional
+        Voxel size (A). Defaults to 1.0.
+
+    Returns
+    -------
+    numpy.ndarray
+        The distinct voxel hashes.
+    """
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    ijk = np.floor(pose_normalize(points) / resolution).astype(np.int64) + (1 << 20)
+    keys = (ijk[:, 0] << 42) | (ijk[:, 1] << 21) | ijk[:, 2]
+    return np.unique(_mix(keys))
+
+
+def residue_tokens(residues):
+    """Hashes of the residue types lining a cavity, with multiplicity.
+
+    Residue numbers and chains differ between structures, so a cavity lined
+    by two histidines and a serine gives the tokens ``HIS1``, ``HIS2`` and
+    ``SER1``.
+
+    Parameters
+    ----------
+    residues : list
+        Residues of the cavity as ``[resnum, chain, resname]`` lists, as
+        returned by `pyKVFinder.constitutional`.
+
+    Returns
+    -------
+    numpy.ndarray
+        The token hashes.
+    """
+    counts = Counter(residue[2] for residue in residues)
+    tokens = [f"{resname}{i}" for resname, count in counts.items() for i in range(1, count + 1)]
+    return np.array([zlib.crc32(token.encode()) for token in tokens], dtype=np.uint64)
+
+
+def cavity_points(cavities, vertices, step):
+    """Coordinates (A) of the points of each cavity of a grid.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping cavity names to arrays with shape (n, 3).
+    """
+    origin, axes = grid_axes(vertices)
+    ijk = np.argwhere(cavities >= 2)
+    labels = cavities[tuple(ijk.T)]
+    order = np.argsort(labels, kind="stable")
+    ijk, labels = ijk[order], labels[order]
+    unique_labels, starts = np.unique(labels, return_index=True)
+    coords = origin + (ijk * step) @ axes
+    return {cavity_name(int(label) - 2): part for label, part in zip(unique_labels, np.split(coords, starts[1:]))}
+
+
+class SimilarityIndex(object):
+    """MinHash/LSH index of cavities for nearest neighbor queries.
+
+    Parameters
+    ----------
+    num_perm : int, optional
+        Number of hash functions of each of the two signatures (shape and
+        residues). Defaults to 128.
+    bands : int, optional
+        Number of LSH bands of each signature; it must divide ``num_perm``.
+        More bands find less similar neighbors at the cost of more
+        candidates per query. Defaults to 32.
+    resolution : float, optional
+        Voxel size (A) of the shape sets. Defaults to 1.0.
+    shape_weight : float, optional
+        Weight of the shape similarity in the combined similarity; the
+        residue similarity gets the rest. Defaults to 0.5.
+    seed : int, optional
+        Seed of the hash functions; indexes can only be compared or merged
+        with the same seed. Defaults to 1.
+    """
+
+    def __init__(self, num_perm=128, bands=32, resolution=1.0, shape_weight=0.5, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.resolution = resolution
+        self.shape_weight = shape_weight
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.keys = []
+        self._signatures = []
+        self._buckets = defaultdict(list)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _minhash(self, tokens, chunk=8192):
+        """MinHash signature of a set of token hashes; all `_MAX_HASH` for an empty set."""
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(tokens), chunk):
+            block = tokens[start:start + chunk, None]
+            hashes = ((block * self._a + self._b) % _PRIME) & _MAX_HASH
+            np.minimum(signature, hashes.min(axis=0), out=signature)
+        return signature
+
+    def signature(self, points, residues=()):
+        """Shape and residue signatures of a cavity, concatenated.
+
+        Parameters
+        ----------
+        points : numpy.ndarray
+            Coordinates (A) of the cavity points with shape (n, 3).
+        residues : list, optional
+            Residues of the cavity, as returned by `pyKVFinder.constitutional`.
+
+        Returns
+        -------
+        numpy.ndarray
+            A signature with 2 * ``num_perm`` values; the last ``num_perm``
+            are all `_MAX_HASH` without residues.
+        """
+        return np.concatenate([
+            self._minhash(shape_tokens(points, self.resolution)),
+            self._minhash(residue_tokens(residues)),
+        ])
+
+    def _has_residues(self, signatures):
+        """Whether signatures have a non-empty residue set."""
+        return (np.asarray(signatures)[..., self.num_perm:] != _MAX_HASH).any(axis=-1)
+
+    def _bands(self, signature):
+        """LSH bucket keys of a signature; the residue bands are left out without residues."""
+        rows = self.num_perm // self.bands
+        bands = 2 * self.bands if self._has_residues(signature) else self.bands
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(bands)]
+
+    def _scores(self, signatures, signature):
+        """Combined similarity of signatures to a signature.
+
+        Residue similarity only counts when either side has residues; two
+        cavities without residues are scored on shape alone.
+        """
+        n = self.num_perm
+        matches = signatures == signature
+        shape = matches[:, :n].mean(axis=1)
+        residues = matches[:, n:].mean(axis=1)
+        scores = self.shape_weight * shape + (1 - self.shape_weight) * residues
+        return np.where(self._has_residues(signatures) | self._has_residues(signature), scores, shape)
+
+    def add_signature(self, key, signature):
+        """Add a cavity with a precomputed signature."""
+        position = len(self.keys)
+        self.keys.append(key)
+        self._signatures.append(signature)
+        for bucket in self._bands(signature):
+            self._buckets[bucket].append(position)
+
+    def add(self, key, points, residues=()):
+        """Add a cavity to the index.
+
+        Parameters
+        ----------
+        key : str
+            Name of the cavity in the index, e.g. ``"<base_name>/KAA"``.
+        points, residues
+            Same as `signature`.
+        """
+        self.add_signature(key, self.signature(points, residues))
+
+    def add_results(self, prefix, cavities, vertices, step, residues=None):
+        """Add every cavity of a cavity grid as ``"<prefix>/<cavity>"``.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys, e.g. the base name of the run.
+        cavities : numpy.ndarray
+            Cavity grid, as returned by `pyKVFinder.detect`.
+        vertices : numpy.ndarray
+            An array with shape (4, 3) with the grid vertices.
+        step : float
+            Grid spacing (A).
+        residues : dict, optional
+            Residues of each cavity, as returned by `pyKVFinder.constitutional`.
+        """
+        residues = residues or {}
+        for name, points in cavity_points(cavities, vertices, step).items():
+            self.add(f"{prefix}/{name}", points, residues.get(name, []))
+
+    def similarity(self, a, b):
+        """Combined similarity of two signatures."""
+        return float(self._scores(np.asarray(a)[None], np.asarray(b))[0])
+
+    def query(self, points, residues=(), k=10, exhaustive=False):
+        """Find the cavities most similar to a given one.
+
+        Parameters
+        ----------
+        points, residues
+            Same as `signature`.
+        k : int, optional
+            Number of neighbors. Defaults to 10.
+        exhaustive : bool, optional
+            Score every cavity of the index instead of the LSH candidates
+            only. Defaults to False.
+
+        Returns
+        -------
+        list
+            Up to ``k`` (key, similarity) pairs, most similar first.
+        """
+        return self.query_signature(self.signature(points, residues), k, exhaustive)
+
+    def query_signature(self, signature, k=10, exhaustive=False):
+        """`query` with a precomputed signature."""
+        if not self.keys:
+            return []
+        if exhaustive:
+            candidates = np.arange(len(self.keys))
+        else:
+            candidates = set()
+            for bucket in self._bands(signature):
+                candidates.update(self._buckets.get(bucket, ()))
+            candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        if len(candidates) == 0:
+            return []
+
+        signatures = np.array([self._signatures[i] for i in candidates])
+        scores = self._scores(signatures, signature)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(self.keys[candidates[i]], round(float(scores[i]), 3)) for i in order]
+
+    def save(self, fn):
+        """Save the index to a compressed NumPy file."""
+        np.savez_compressed(
+            fn,
+            keys=np.array(self.keys, dtype=str),
+            signatures=np.asarray(self._signatures, dtype=np.uint64).reshape(len(self.keys), 2 * self.num_perm),
+            parameters=np.array([self.num_perm, self.bands, self.resolution, self.shape_weight, self.seed], dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, fn):
+        """Load an index saved with `save`."""
+        with np.load(fn) as data:
+            num_perm, bands, resolution, shape_weight, seed = data["parameters"]
+            index = cls(int(num_perm), int(bands), float(resolution), float(shape_weight), int(seed))
+            for key, signature in zip(data["keys"], data["signatures"]):
+                index.add_signature(str(key), signature)
+        return index
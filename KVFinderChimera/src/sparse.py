@@ -0,0 +1,179 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Sparse cavity grids.
+
+Most of a cavity grid is bulk solvent or biomolecule, which no cavity
+calculation looks at. `SparseCavities` keeps only the cavity points and the
+one point shell around them, whose bulk/biomolecule/empty labels decide
+surface points, area and depth, as runs along the z axis of the grid. The
+cropped dense grid around the stored points (`SparseCavities.crop`) gives
+the same characterization as the whole grid with `pipeline.subgrid_vertices`.
+Like `pipeline`, this module has no ChimeraX or Qt dependency.
+"""
+
+import numpy as np
+
+
+def _dilate(mask):
+    """Dilate a boolean grid by one point in the 26-neighbourhood (separable along each axis)."""
+    mask = mask.copy()
+    for axis in range(3):
+        head = [slice(None)] * 3
+        tail = [slice(None)] * 3
+        head[axis], tail[axis] = slice(1, None), slice(None, -1)
+        shifted = mask.copy()
+        shifted[tuple(head)] |= mask[tuple(tail)]
+        shifted[tuple(tail)] |= mask[tuple(head)]
+        mask = shifted
+    return mask
+
+
+class SparseCavities(object):
+    """Run-length encoded cavity grid.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the dense grid.
+    starts : numpy.ndarray
+        Linear index (C order) of the first point of each run.
+    lengths : numpy.ndarray
+        Number of points of each run; runs never cross a z row.
+    values : numpy.ndarray
+        Label of the points of each run.
+    background : int, optional
+        Label of the points outside every run. Defaults to -1 (bulk).
+    """
+
+    def __init__(self, shape, starts, lengths, values, background=-1):
+        self.shape = tuple(int(n) for n in shape)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int32)
+        self.values = np.asarray(values, dtype=np.int32)
+        self.background = background
+
+    @classmethod
+    def from_dense(cls, cavities, shell=True):
+        """Encode a cavity grid, as returned by `pyKVFinder.detect`.
+
+        Parameters
+        ----------
+        cavities : numpy.ndarray
+            Cavity grid.
+        shell : bool, optional
+            Whether the one point shell around the cavities is kept, which
+            characterization needs. Defaults to True.
+        """
+        mask = cavities >= 2
+        if shell:
+            mask = _dilate(mask)
+        index = np.flatnonzero(mask)
+        return cls._from_points(cavities.shape, index, cavities.ravel()[index])
+
+    @classmethod
+    def from_points(cls, shape, index, labels, background=-1):
+        """Encode points given by sorted linear indices and their labels."""
+        return cls._from_points(shape, np.asarray(index, dtype=np.int64), np.asarray(labels, dtype=np.int32), background)
+
+    @classmethod
+    def _from_points(cls, shape, index, labels, background=-1):
+        if len(index) == 0:
+            return cls(shape, [], [], [], background)
+        # A run ends at a gap, a label change or the end of a z row
+        breaks = np.ones(len(index), dtype=bool)
+        breaks[1:] = (np.diff(index) != 1) | (labels[1:] != labels[:-1]) | (index[1:] % shape[2] == 0)
+        first = np.flatnonzero(breaks)
+        lengths = np.diff(np.append(first, len(index)))
+        return cls(shape, index[first], lengths, labels[first], background)
+
+    @property
+    def nbytes(self):
+        """Memory used by the runs, in bytes."""
+        return self.starts.nbytes + self.lengths.nbytes + self.values.nbytes
+
+    def points(self, runs=None):
+        """Sorted linear indices and labels of the points of the given runs (all by default)."""
+        starts, lengths, values = self.starts, self.lengths, self.values
+        if runs is not None:
+            starts, lengths, values = starts[runs], lengths[runs], values[runs]
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return np.repeat(starts, lengths) + offsets, np.repeat(values, lengths)
+
+    def cavity_points(self):
+        """Sorted linear indices of the cavity points and their labels."""
+        return self.points(self.values >= 2)
+
+    def to_dense(self):
+        """The dense grid, with the background label outside the runs."""
+        cavities = np.full(self.shape, self.background, dtype=np.int32)
+        index, labels = self.points()
+        cavities.ravel()[index] = labels
+        return cavities
+
+    def bounds(self, margin=0):
+        """Grid indices of the first point and shape of the box enclosing every stored point.
+
+        Parameters
+        ----------
+        margin : int, optional
+            Points added around the stored points on each side, within the
+            grid. Defaults to 0.
+        """
+        if len(self.starts) == 0:
+            return np.zeros(3, dtype=int), (1, 1, 1)
+        first = np.column_stack(np.unravel_index(self.starts, self.shape))
+        last = first.copy()
+        last[:, 2] += self.lengths - 1
+        start = np.maximum(first.min(axis=0) - margin, 0)
+        end = np.minimum(last.max(axis=0) + margin + 1, self.shape)
+        return start, tuple(int(n) for n in end - start)
+
+    def crop(self, margin=0):
+        """Dense grid of the box enclosing the stored points.
+
+        Parameters
+        ----------
+        margin : int, optional
+            Same as `bounds`; a grid stored without its shell needs a margin
+            of 1 for the surface points of `pyKVFinder.spatial`. Defaults
+            to 0.
+
+        Returns
+        -------
+        cavities : numpy.ndarray
+            The cropped grid.
+        start : numpy.ndarray
+            Grid indices of its first point in the whole grid, for
+            `pipeline.subgrid_vertices`.
+        """
+        start, shape = self.bounds(margin)
+        cavities = np.full(shape, self.background, dtype=np.int32)
+        index, labels = self.points()
+        ijk = np.column_stack(np.unravel_index(index, self.shape)) - start
+        cavities[tuple(ijk.T)] = labels
+        return cavities, start
+
+    def state(self):
+        """The runs as a dictionary of arrays, for `from_state`, files and sessions."""
+        return {
+            "shape": np.array(self.shape),
+            "starts": self.starts,
+            "lengths": self.lengths,
+            "values": self.values,
+            "background": np.array(self.background),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Runs from a dictionary returned by `state`."""
+        return cls(tuple(state["shape"]), state["starts"], state["lengths"], state["values"], int(state["background"]))
+
+    def save(self, fn):
+        """Save the runs to a compressed NumPy file."""
+        np.savez_compressed(fn, **self.state())
+
+    @classmethod
+    def load(cls, fn):
+        """Load runs saved with `save`."""
+        with np.load(fn) as data:
+            return cls.from_state(data)
@@ -0,0 +1,179 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Parameter sweeps over the cavity detection parameters.
+
+A sweep extracts the atoms once, computes the grid vertices once per
+distinct Probe Out, runs one detection per (Probe In, Probe Out, removal
+distance) combination with the smallest volume cutoff and derives every
+other volume cutoff from the cavity volumes. Like `pipeline`, this module
+has no ChimeraX or Qt dependency.
+"""
+
+import csv
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyKVFinder
+
+from .pipeline import vertices_from_coords
+
+COLUMNS = ["probe_in", "probe_out", "removal_distance", "volume_cutoff", "ncavs", "total_volume", "largest_volume", "volumes"]
+
+
+def parse_range(text):
+    """Parse a parameter range.
+
+    Accepts a single value (``"4.0"``), a comma separated list
+    (``"3.0, 4.0, 6.0"``) or an inclusive ``start:stop:step`` range
+    (``"3.0:8.0:0.5"``).
+
+    Returns
+    -------
+    list
+        The sorted distinct values.
+
+    Raises
+    ------
+    ValueError
+        If the text cannot be parsed or a range step is not positive.
+    """
+    text = text.strip()
+    if ":" in text:
+        start, stop, step = (float(value) for value in text.split(":"))
+        if step <= 0:
+            raise ValueError(f"Range step must be positive: {text}")
+        values = np.arange(start, stop + step / 2, step)
+    else:
+        values = [float(value) for value in text.split(",") if value.strip()]
+    if len(values) == 0:
+        raise ValueError(f"Empty parameter range: {text}")
+    return sorted(set(round(float(value), 4) for value in values))
+
+
+def cavity_volumes(cavities, step):
+    """Volume (A^3) of each cavity of a labelled grid, in label order."""
+    counts = np.bincount(cavities[cavities >= 2].ravel() - 2)
+    return counts[counts > 0] * step ** 3
+
+
+def sweep(atomic, step=0.6, probe_in=(1.4,), probe_out=(4.0,), removal_distance=(2.4,), volume_cutoff=(5.0,), vertices=None, latomic=None, ligand_cutoff=5.0, surface="SES", box_adjustment=False, nworkers=None, nthreads=None, engine="detect"):
+    """Detect cavities for every combination of the given parameters.
+
+    Parameters
+    ----------
+    atomic : numpy.ndarray
+        An array with atomic data, extracted once for the whole sweep.
+    step : float, optional
+        Grid spacing (A). Defaults to 0.6.
+    probe_in, probe_out, removal_distance, volume_cutoff : sequence of float
+        Values of each parameter.
+    vertices : numpy.ndarray, optional
+        Fixed grid vertices (box adjustment or a cropped ligand grid). By
+        default the whole-structure grid is computed for each Probe Out.
+    latomic, ligand_cutoff, surface, box_adjustment
+        Same as `pyKVFinder.detect`.
+    nworkers : int, optional
+        Number of detections run at the same time. Defaults to 2.
+    nthreads : int, optional
+        Total number of threads; each detection gets an equal share.
+        Defaults to the number of CPUs.
+    engine : str, optional
+        ``"detect"`` runs `pyKVFinder.detect` for each combination.
+        ``"edt"`` computes an `edt.DistanceField` once, on the grid of the
+        largest Probe Out, and derives every combination from it; faster
+        for large sweeps, but a few boundary points may differ from
+        `pyKVFinder.detect`. Defaults to ``"detect"``.
+
+    Returns
+    -------
+    list
+        One dictionary per combination with the `COLUMNS` keys; ``volumes``
+        holds the volumes of the cavities above the cutoff, largest first.
+    """
+    cutoffs = sorted(volume_cutoff)
+    min_cutoff = cutoffs[0]
+
+    if engine == "edt":
+        return _sweep_edt(atomic, step, probe_in, probe_out, removal_distance, cutoffs, vertices, latomic, ligand_cutoff, surface)
+    if engine != "detect":
+        raise ValueError(f"Unknown sweep engine: {engine}")
+
+    # The whole-structure grid only depends on Probe Out
+    if vertices is None:
+        coords = atomic[:, 4:7].astype(np.float64)
+        grids = {po: vertices_from_coords(coords, probe_out=po, step=step) for po in probe_out}
+    else:
+        grids = {po: vertices for po in probe_out}
+
+    combinations = list(itertools.product(probe_in, probe_out, removal_distance))
+    if nworkers is None:
+        nworkers = min(2, len(combinations))
+    nworkers = max(1, nworkers)
+    if nthreads is None:
+        nthreads = os.cpu_count() or 1
+    detect_threads = max(1, nthreads // nworkers)
+
+    def run_combination(combination):
+        pi, po, rd = combination
+        ncavs, cavities = pyKVFinder.detect(
+            atomic, grids[po], step=step, probe_in=pi, probe_out=po, removal_distance=rd,
+            volume_cutoff=min_cutoff, latomic=latomic, ligand_cutoff=ligand_cutoff,
+            box_adjustment=box_adjustment, surface=surface, nthreads=detect_threads,
+        )
+        return combination, cavity_volumes(cavities, step) if ncavs else np.zeros(0)
+
+    rows = []
+    with ThreadPoolExecutor(max_workers=nworkers) as executor:
+        for combination, volumes in executor.map(run_combination, combinations):
+            rows.extend(_rows(combination, volumes, cutoffs))
+    return rows
+
+
+def _sweep_edt(atomic, step, probe_in, probe_out, removal_distance, cutoffs, vertices, latomic, ligand_cutoff, surface):
+    """`sweep` with the distance transform engine."""
+    from .edt import DistanceField
+
+    if vertices is None:
+        vertices = vertices_from_coords(atomic[:, 4:7].astype(np.float64), probe_out=max(probe_out), step=step)
+    field = DistanceField(atomic, vertices, step, latomic=latomic, ligand_cutoff=ligand_cutoff)
+
+    rows = []
+    # Probe Out outermost, so its transforms are computed once
+    for po, pi, rd in itertools.product(probe_out, probe_in, removal_distance):
+        ncavs, cavities = field.detect(probe_in=pi, probe_out=po, removal_distance=rd, volume_cutoff=cutoffs[0], surface=surface)
+        volumes = cavity_volumes(cavities, step) if ncavs else np.zeros(0)
+        rows.extend(_rows((pi, po, rd), volumes, cutoffs))
+    return rows
+
+
+def _rows(combination, volumes, cutoffs):
+    """Table rows of one detection, one per volume cutoff."""
+    pi, po, rd = combination
+    volumes = np.sort(volumes)[::-1]
+    rows = []
+    for cutoff in cutoffs:
+        kept = volumes[volumes >= cutoff]
+        rows.append({
+            "probe_in": pi,
+            "probe_out": po,
+            "removal_distance": rd,
+            "volume_cutoff": cutoff,
+            "ncavs": len(kept),
+            "total_volume": round(float(kept.sum()), 2),
+            "largest_volume": round(float(kept[0]), 2) if len(kept) else 0.0,
+            "volumes": [round(float(v), 2) for v in kept],
+        })
+    return rows
+
+
+def write_table(rows, fn):
+    """Write sweep rows to a CSV file; cavity volumes are separated by semicolons."""
+    with open(fn, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            row = dict(row)
+            row["volumes"] = ";".join(str(v) for v in row["volumes"])
+            writer.writerow(row)
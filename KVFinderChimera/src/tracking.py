@@ -0,0 +1,193 @@
+# vim: set expandtab shiftwidth=4 softtabstop=4:
+
+"""Cavity tracking across trajectory frames and conformational ensembles.
+
+Cavities of every frame are detected on one shared grid, so a cavity is a
+set of linear grid indices. Only the sparse index sets of the cavities seen
+in the last frames are kept; each new frame is matched against them by
+looking their indices up in the new cavity grid and counting shared points
+per pair of labels, which costs one pass over the cavity points. Like
+`pipeline`, this module has no ChimeraX or Qt dependency.
+"""
+
+import csv
+
+import numpy as np
+import pyKVFinder
+
+from .pipeline import cavity_name
+
+COLUMNS = ["track", "frame", "cavity", "volume", "max_depth", "avg_depth", "avg_hydropathy", "overlap"]
+
+
+class CavityTracker(object):
+    """Assign stable track IDs to the cavities of successive frames.
+
+    Parameters
+    ----------
+    min_overlap : float, optional
+        Smallest Jaccard index between two cavities of different frames
+        for them to belong to the same track. Defaults to 0.2.
+    max_gap : int, optional
+        Number of frames a track may miss and still be continued. Defaults
+        to 0.
+    """
+
+    def __init__(self, min_overlap=0.2, max_gap=0):
+        self.min_overlap = min_overlap
+        self.max_gap = max_gap
+        self.frame = -1
+        self.ntracks = 0
+        # track -> (last frame, sorted linear indices of its last cavity)
+        self._active = {}
+        # track -> list of per-frame dictionaries
+        self.series = {}
+
+    def update(self, cavities, descriptors=None):
+        """Match the cavities of the next frame to the current tracks.
+
+        Parameters
+        ----------
+        cavities : numpy.ndarray
+            Cavity grid of the frame, on the same grid as previous frames.
+        descriptors : dict, optional
+            Per-cavity descriptors of the frame, as dictionaries keyed by
+            cavity name (``"volume"``, ``"max_depth"``, ``"avg_depth"``,
+            ``"avg_hydropathy"``), recorded in the track time series.
+
+        Returns
+        -------
+        dict
+            A dictionary mapping each cavity name of the frame to its track.
+        """
+        self.frame += 1
+        descriptors = descriptors or {}
+        flat = cavities.ravel()
+
+        # Sparse index sets of this frame, grouped by label
+        keys = np.flatnonzero(flat >= 2)
+        labels = flat[keys]
+        order = np.argsort(labels, kind="stable")
+        keys, labels = keys[order], labels[order]
+        unique_labels, starts, sizes = np.unique(labels, return_index=True, return_counts=True)
+
+        # Shared points of every (track, label) pair
+        candidates = []
+        for track, (_, track_keys) in self._active.items():
+            hits = flat[track_keys]
+            hits = hits[hits >= 2]
+            if len(hits) == 0:
+                continue
+            hit_labels, counts = np.unique(hits, return_counts=True)
+            positions = np.searchsorted(unique_labels, hit_labels)
+            for position, count in zip(positions, counts):
+                jaccard = count / (len(track_keys) + sizes[position] - count)
+                if jaccard >= self.min_overlap:
+                    candidates.append((jaccard, track, position))
+
+        # Greedy one-to-one matching, best overlaps first
+        assigned = {}
+        overlaps = {}
+        used_tracks = set()
+        for jaccard, track, position in sorted(candidates, reverse=True):
+            if track in used_tracks or position in assigned:
+                continue
+            assigned[position] = track
+            overlaps[position] = jaccard
+            used_tracks.add(track)
+
+        result = {}
+        for position, label in enumerate(unique_labels):
+            track = assigned.get(position)
+            if track is None:
+                self.ntracks += 1
+                track = self.ntracks
+                self.series[track] = []
+            name = cavity_name(int(label) - 2)
+            self._active[track] = (self.frame, keys[starts[position]:starts[position] + sizes[position]])
+            entry = {"frame": self.frame, "cavity": name, "overlap": round(float(overlaps.get(position, 0.0)), 3)}
+            for descriptor in ("volume", "max_depth", "avg_depth", "avg_hydropathy"):
+                entry[descriptor] = descriptors.get(descriptor, {}).get(name)
+            self.series[track].append(entry)
+            result[name] = track
+
+        # Forget tracks missing for more than max_gap frames
+        for track in [t for t, (frame, _) in self._active.items() if self.frame - frame > self.max_gap]:
+            del self._active[track]
+        return result
+
+    def rows(self):
+        """Time series of every track as rows with the `COLUMNS` keys."""
+        return [dict(track=track, **entry) for track, entries in self.series.items() for entry in entries]
+
+    def summary(self):
+        """One row per track: first and last frame, number of frames, mean and largest volume."""
+        rows = []
+        for track, entries in self.series.items():
+            volumes = [entry["volume"] for entry in entries if entry["volume"] is not None]
+            rows.append({
+                "track": track,
+                "first_frame": entries[0]["frame"],
+                "last_frame": entries[-1]["frame"],
+                "frames": len(entries),
+                "mean_volume": round(float(np.mean(volumes)), 2) if volumes else 0.0,
+                "max_volume": round(float(np.max(volumes)), 2) if volumes else 0.0,
+            })
+        return rows
+
+
+def track_frames(atomic, frames, vertices, step=0.6, probe_in=1.4, probe_out=4.0, removal_distance=2.4, volume_cutoff=5.0, surface="SES", box_adjustment=False, min_overlap=0.2, max_gap=0, characterize=True, nthreads=None):
+    """Detect and track cavities over a sequence of frames.
+
+    Parameters
+    ----------
+    atomic : numpy.ndarray
+        Atomic data of the first frame; its coordinates are replaced by
+        those of each frame.
+    frames : iterable
+        Coordinates of each frame, arrays with shape (n, 3) in the order of
+        ``atomic``.
+    vertices : numpy.ndarray
+        Vertices of the grid shared by all frames; it must enclose every
+        frame (see `pipeline.vertices_from_coords`), or be the box of
+        `pyKVFinder.get_vertices_from_file` in box adjustment mode.
+    step, probe_in, probe_out, removal_distance, volume_cutoff, surface, box_adjustment
+        Same as `pyKVFinder.detect`.
+    min_overlap, max_gap
+        Same as `CavityTracker`.
+    characterize : bool, optional
+        Whether depth and hydropathy are computed for the time series, in
+        addition to volume. Defaults to True.
+    nthreads : int, optional
+        Number of threads given to pyKVFinder.
+
+    Returns
+    -------
+    CavityTracker
+        The tracker holding the time series of every track.
+    """
+    tracker = CavityTracker(min_overlap=min_overlap, max_gap=max_gap)
+    atomic = atomic.copy()
+    for coords in frames:
+        atomic[:, 4:7] = np.asarray(coords, dtype=np.float64).astype(str)
+        ncavs, cavities = pyKVFinder.detect(
+            atomic, vertices, step=step, probe_in=probe_in, probe_out=probe_out,
+            removal_distance=removal_distance, volume_cutoff=volume_cutoff, surface=surface,
+            box_adjustment=box_adjustment, nthreads=nthreads,
+        )
+        descriptors = {}
+        if ncavs > 0:
+            surface_points, descriptors["volume"], _ = pyKVFinder.spatial(cavities, step=step, nthreads=nthreads)
+            if characterize:
+                _, descriptors["max_depth"], descriptors["avg_depth"] = pyKVFinder.depth(cavities, step=step, nthreads=nthreads)
+                _, descriptors["avg_hydropathy"] = pyKVFinder.hydropathy(surface_points, atomic, vertices, step=step, probe_in=probe_in, nthreads=nthreads)
+        tracker.update(cavities, descriptors)
+    return tracker
+
+
+def write_table(rows, fn, columns=COLUMNS):
+    """Write tracking rows to a CSV file."""
+    with open(fn, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
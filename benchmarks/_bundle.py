@@ -0,0 +1,26 @@
+"""Import bundle modules from ``KVFinderChimera/src`` outside ChimeraX.
+
+The bundle's ``__init__`` registers the tool with the ChimeraX toolshed, so
+it cannot be imported in a plain interpreter.  The source directory is
+instead mounted as a bare package, which keeps relative imports between
+bundle modules working without executing ``__init__``.
+"""
+
+import importlib
+import os
+import sys
+import types
+
+SRC = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "KVFinderChimera", "src")
+)
+PACKAGE = "kvfinder_bundle"
+
+
+def load(module):
+    """Import ``module`` from the bundle source directory."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [SRC]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{module}")
@@ -0,0 +1,224 @@
+"""Offscreen benchmark of the interactive paths of the KVFinder tool.
+
+The tool is instantiated on a stub ChimeraX session (see `chimerax_stub`)
+under Qt's offscreen platform, so it runs on a headless Linux box.  A
+synthetic results file with many cavities is written and the tool's real
+methods are driven against it:
+
+    python benchmarks/bench_gui.py --cavities 1000 --points 200
+
+Reported timings cover loading results, saving them in a session snapshot,
+filling, sorting and filtering the results table, model lookups in a crowded session,
+selection-driven recoloring and level-of-detail frames.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+import toml  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import chimerax_stub  # noqa: E402
+from _bundle import load  # noqa: E402
+
+_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+def cavity_name(index):
+    """Cavity identifier in the KAA, KAB, ... sequence used by pyKVFinder."""
+    return f"K{_LETTERS[index // 26]}{_LETTERS[index % 26]}"
+
+
+def _pdb_line(serial, name, resname, resnum, xyz, occupancy, bfactor, element):
+    x, y, z = xyz
+    return (
+        f"HETATM{serial % 100000:5d}  {name:<3s} {resname:>3s} A{resnum % 10000:4d}    "
+        f"{x:8.3f}{y:8.3f}{z:8.3f}{occupancy:6.2f}{bfactor:6.2f}          {element:>2s}\n"
+    )
+
+
+def write_synthetic_results(directory, ncavities, points, seed=0):
+    """Write an input PDB, a cavity PDB and a results TOML file.
+
+    Parameters
+    ----------
+    directory : str
+        Output directory.
+    ncavities : int
+        Number of cavities.
+    points : int
+        Number of grid points per cavity; about a third are surface (HA) points.
+    seed : int, optional
+        Seed of the random generator.
+
+    Returns
+    -------
+    str
+        Path of the results TOML file.
+    """
+    rng = np.random.default_rng(seed)
+    names = [cavity_name(i) for i in range(ncavities)]
+    input_fn = os.path.join(directory, "synthetic.pdb")
+    cavity_fn = os.path.join(directory, "synthetic.cavity.pdb")
+    results_fn = os.path.join(directory, "synthetic.KVFinder.results.toml")
+
+    with open(input_fn, "w") as f:
+        for i in range(ncavities):
+            f.write(_pdb_line(i + 1, "CA", "ALA", i + 1, rng.normal(scale=40.0, size=3), 1.0, 0.0, "C"))
+        f.write("END\n")
+
+    serial = 1
+    with open(cavity_fn, "w") as f:
+        centers = rng.normal(scale=40.0, size=(ncavities, 3))
+        for index, (name, center) in enumerate(zip(names, centers)):
+            xyz = center + rng.normal(scale=2.0, size=(points, 3))
+            depth = rng.random(points) * 8.0
+            hydropathy = rng.normal(size=points)
+            for p in range(points):
+                surface = p < points // 3
+                f.write(_pdb_line(
+                    serial, "HA" if surface else "H", name, index + 1, xyz[p],
+                    hydropathy[p] if surface else 0.0, depth[p], "H",
+                ))
+                serial += 1
+        f.write("END\n")
+
+    residues = {
+        name: [[str(r), "A", "ALA"] for r in rng.choice(ncavities, size=min(8, ncavities), replace=False) + 1]
+        for name in names
+    }
+    avg_hydropathy = {name: round(float(v), 2) for name, v in zip(names, rng.normal(size=ncavities))}
+    avg_hydropathy["EisenbergWeiss"] = [-1.42, 2.6]
+    results = {
+        "FILES": {"INPUT": input_fn, "OUTPUT": cavity_fn},
+        "PARAMETERS": {"STEP": 0.6},
+        "RESULTS": {
+            "VOLUME": {name: round(float(v), 2) for name, v in zip(names, rng.random(ncavities) * 1000)},
+            "AREA": {name: round(float(v), 2) for name, v in zip(names, rng.random(ncavities) * 600)},
+            "MAX_DEPTH": {name: round(float(v), 2) for name, v in zip(names, rng.random(ncavities) * 10)},
+            "AVG_DEPTH": {name: round(float(v), 2) for name, v in zip(names, rng.random(ncavities) * 5)},
+            "AVG_HYDROPATHY": avg_hydropathy,
+            "RESIDUES": residues,
+        },
+    }
+    with open(results_fn, "w") as f:
+        toml.dump(results, f)
+    return results_fn
+
+
+class Harness(object):
+    """Creates the tool on a stub session and times its methods."""
+
+    def __init__(self, extra_models=0):
+        self.session = chimerax_stub.StubSession()
+        chimerax_stub.install(self.session)
+        for i in range(extra_models):
+            self.session.models.add([chimerax_stub.StubModel(self.session, f"model_{i}")])
+        self.kvfinder = load("kvfinder")
+        self.timings = {}
+        start = time.perf_counter()
+        self.tool = self.kvfinder.KVFinder(self.session, "Cavities")
+        self.timings["startup"] = time.perf_counter() - start
+
+    def measure(self, name, func, *args, **kwargs):
+        ncommands = len(self.session.commands)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.timings[name] = time.perf_counter() - start
+        self.timings[f"{name} (commands)"] = len(self.session.commands) - ncommands
+        return result
+
+    def select_rows(self, column, count):
+        """Click the first ``count`` rows of the results table in a column one by one, then click them again."""
+        table = self.tool.ui.results_table
+        model, selection = table.model(), table.selectionModel()
+        flags = selection.Toggle | selection.Rows
+        count = min(count, model.rowCount())
+        for _ in range(2):
+            for i in range(count):
+                selection.setCurrentIndex(model.index(i, column), flags)
+
+    def run(self, results_fn, selections, lookups):
+        tool, ui = self.tool, self.tool.ui
+        ui.results_file_entry.setText(results_fn)
+
+        self.measure("load_results", tool.load_results)
+        self.measure("take_snapshot", tool.take_snapshot, self.session, 0)
+        ui.results_model.set_table(None)
+        self.measure("refresh_descriptors", tool.refresh_descriptors)
+        self.measure("sort by volume", ui.results_table.sortByColumn, 1, self.kvfinder.QtCore.Qt.DescendingOrder)
+        self.measure("filter", ui.results_filter.setText, "volume>500 A")
+        ui.results_filter.setText("")
+        ui.results_table.sortByColumn(0, self.kvfinder.QtCore.Qt.AscendingOrder)
+
+        names = [m.name for m in self.session.models]
+        missing = "not-a-model"
+        self.measure(f"_get_model x{lookups}", lambda: [tool._get_model(names[i % len(names)]) for i in range(lookups)])
+        self.measure(f"_get_model miss x{lookups}", lambda: [tool._get_model(missing) for _ in range(lookups)])
+
+        self.measure(f"show_cavities x{2 * selections}", self.select_rows, 1, selections)
+        self.measure(f"show_depth x{2 * selections}", self.select_rows, 3, selections)
+        self.measure(f"show_hydropathy x{2 * selections}", self.select_rows, 5, selections)
+        self.measure("show_depth_view", tool.show_depth_view)
+        self.measure("show_hydropathy_view", tool.show_hydropathy_view)
+        self.measure("show_default_view", tool.show_default_view)
+        # View colors are computed once per run, so switching back is cheaper
+        self.measure("show_depth_view again", tool.show_depth_view)
+
+        # Camera motion with the level of detail on, then back to full detail
+        camera = self.session.main_view.camera.position
+
+        def move_camera(frames):
+            for _ in range(frames):
+                camera.matrix = camera.matrix.copy()
+                camera.matrix[0, 3] += 1.0
+                self.session.triggers.fire("new frame")
+
+        self.measure("lod frames x100", move_camera, 100)
+        self.measure("lod restore", tool._restore_detail)
+        return self.timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cavities", type=int, default=1000, help="number of cavities in the results file")
+    parser.add_argument("--points", type=int, default=200, help="grid points per cavity")
+    parser.add_argument("--extra-models", type=int, default=1000, help="unrelated models added to the session")
+    parser.add_argument("--selections", type=int, default=100, help="table rows selected and deselected")
+    parser.add_argument("--lookups", type=int, default=1000, help="number of _get_model calls")
+    parser.add_argument("--output", default=None, help="write timings to a JSON file")
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix="kvfinder-gui-bench-")
+    try:
+        results_fn = write_synthetic_results(tmpdir, args.cavities, args.points)
+        harness = Harness(extra_models=args.extra_models)
+        timings = harness.run(results_fn, args.selections, args.lookups)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(f"\n{args.cavities} cavities x {args.points} points, {args.extra_models} extra models")
+    for name, value in timings.items():
+        if name.endswith("(commands)"):
+            continue
+        commands = timings.get(f"{name} (commands)")
+        suffix = f"   {commands} command(s)" if commands else ""
+        print(f"  {name:<28} {value:10.4f} s{suffix}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(timings, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
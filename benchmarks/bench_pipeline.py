@@ -0,0 +1,253 @@
+"""Benchmark suite for the cavity pipeline.
+
+Runs outside ChimeraX on synthetic proteins held by a stub session and
+times each stage of the pipeline: atom extraction, detection at several
+step sizes, the distance transform engine, sparse cavity encoding, every
+characterization stage, export and results loading (TOML and the binary format).
+
+Timings can be stored as a baseline and later runs compared against it:
+
+    python benchmarks/bench_pipeline.py --update-baseline
+    python benchmarks/bench_pipeline.py --threshold 0.25
+
+The second command exits with status 1 if any stage is slower than the
+baseline by more than the threshold, and with status 2 if there is no
+baseline to compare against.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyKVFinder
+import toml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _bundle import load  # noqa: E402
+from synthetic import synthetic_session  # noqa: E402
+
+pipeline = load("pipeline")
+edt = load("edt")
+results_io = load("results_io")
+sparse = load("sparse")
+
+DEFAULT_SIZES = [1000, 10000, 100000, 500000]
+DEFAULT_STEPS = [1.2, 0.9, 0.6]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+PROBE_IN = 1.4
+PROBE_OUT = 4.0
+REMOVAL_DISTANCE = 2.4
+VOLUME_CUTOFF = 5.0
+
+
+def _timed(timings, stage, repeat, func, *args, **kwargs):
+    """Call ``func`` ``repeat`` times, store the best time and return its result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    timings[stage] = best
+    return result
+
+
+def benchmark_structure(structure, steps, repeat=1, nthreads=None):
+    """Time every pipeline stage on one structure.
+
+    Characterization, export and loading are timed on the detection run with
+    the smallest step, which is the most expensive one.
+
+    Returns
+    -------
+    dict
+        Best wall time in seconds of each stage.
+    """
+    timings = {}
+    atomic, _ = _timed(timings, "extract", repeat, pipeline.atomic_from_atoms, structure.atoms)
+
+    step = min(steps)
+    cavities = vertices = None
+    ncavs = 0
+    for s in sorted(steps, reverse=True):
+        v = _timed(timings, f"vertices[step={s}]", repeat, pyKVFinder.get_vertices, atomic, probe_out=PROBE_OUT, step=s)
+        n, c = _timed(
+            timings, f"detect[step={s}]", repeat, pyKVFinder.detect, atomic, v, step=s,
+            probe_in=PROBE_IN, probe_out=PROBE_OUT, removal_distance=REMOVAL_DISTANCE,
+            volume_cutoff=VOLUME_CUTOFF, nthreads=nthreads,
+        )
+        if s == step:
+            ncavs, cavities, vertices = n, c, v
+
+    if ncavs == 0:
+        print(f"  {structure.name}: no cavities at step {step}, skipping characterization")
+        return timings
+
+    surface, volume, area = _timed(timings, "spatial", repeat, pyKVFinder.spatial, cavities, step=step, nthreads=nthreads)
+    residues = _timed(
+        timings, "constitutional", repeat, pyKVFinder.constitutional, cavities, atomic, vertices,
+        step=step, probe_in=PROBE_IN, nthreads=nthreads,
+    )
+    frequencies = _timed(timings, "frequencies", repeat, pyKVFinder.calculate_frequencies, residues)
+    scales, avg_hydropathy = _timed(
+        timings, "hydropathy", repeat, pyKVFinder.hydropathy, surface, atomic, vertices,
+        step=step, probe_in=PROBE_IN, nthreads=nthreads,
+    )
+    depths, max_depth, avg_depth = _timed(timings, "depth", repeat, pyKVFinder.depth, cavities, step=step, nthreads=nthreads)
+
+    # Distance transform engine: field once, then one detection from it
+    field = _timed(timings, "edt_field", repeat, edt.DistanceField, atomic, vertices, step)
+    _, edt_cavities = _timed(
+        timings, "edt_detect", repeat, field.detect, probe_in=PROBE_IN, probe_out=PROBE_OUT,
+        removal_distance=REMOVAL_DISTANCE, volume_cutoff=VOLUME_CUTOFF,
+    )
+    a, b = edt_cavities >= 2, cavities >= 2
+    print(f"  {structure.name}: distance transform vs pyKVFinder.detect, Jaccard {np.count_nonzero(a & b) / max(1, np.count_nonzero(a | b)):.3f}")
+    del field, edt_cavities
+
+    # Sparse cavity grid: encoding and the dense box around the cavities
+    sparse_cavities = _timed(timings, "sparse_encode", repeat, sparse.SparseCavities.from_dense, cavities)
+    _timed(timings, "sparse_crop", repeat, sparse_cavities.crop)
+    print(f"  {structure.name}: sparse cavity grid {sparse_cavities.nbytes} bytes, dense {cavities.nbytes} bytes")
+
+    tmpdir = tempfile.mkdtemp(prefix="kvfinder-bench-")
+    try:
+        output_cavity = os.path.join(tmpdir, f"{structure.name}.cavity.pdb")
+        _timed(
+            timings, "export", repeat, pyKVFinder.export, output_cavity, cavities, surface, vertices,
+            step=step, B=depths, Q=scales, nthreads=nthreads,
+        )
+        output_results = os.path.join(tmpdir, f"{structure.name}.KVFinder.results.toml")
+        _timed(
+            timings, "write_results", repeat, pyKVFinder.write_results, output_results,
+            input=f"{structure.name}.pdb", ligand=None, output=output_cavity, volume=volume, area=area,
+            max_depth=max_depth, avg_depth=avg_depth, avg_hydropathy=avg_hydropathy,
+            residues=residues, frequencies=frequencies, step=step,
+        )
+        _timed(timings, "load_results", repeat, toml.load, output_results)
+        output_npz = os.path.join(tmpdir, f"{structure.name}.KVFinder.results.npz")
+        _timed(
+            timings, "write_results_npz", repeat, results_io.write_results, output_npz,
+            input=f"{structure.name}.pdb", ligand=None, output=output_cavity, volume=volume, area=area,
+            max_depth=max_depth, avg_depth=avg_depth, avg_hydropathy=avg_hydropathy,
+            residues=residues, step=step, cavities=cavities, vertices=vertices,
+        )
+        _timed(timings, "load_results_npz", repeat, results_io.read_results, output_npz)
+        prefix = results_io.results_prefix(output_npz)
+        _timed(timings, "write_grids", repeat, results_io.write_grids, prefix, cavities, vertices, step, depths=depths, scales=scales)
+        _timed(timings, "read_grids", repeat, results_io.read_grids, prefix)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return timings
+
+
+def compare(current, baseline, threshold, min_seconds):
+    """Compare timings against a baseline.
+
+    A stage regresses when it is slower than the baseline by more than
+    ``threshold`` (a fraction) and by more than ``min_seconds``, so that
+    noise on very fast stages is not reported.
+
+    Returns
+    -------
+    list
+        (size, stage, baseline, current) tuples of the regressed stages.
+    """
+    regressions = []
+    for size, stages in current.items():
+        for stage, seconds in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if reference is None:
+                continue
+            if seconds > reference * (1.0 + threshold) and seconds - reference > min_seconds:
+                regressions.append((size, stage, reference, seconds))
+    return regressions
+
+
+def _print_table(current, baseline):
+    for size, stages in current.items():
+        print(f"\n{size} atoms")
+        for stage, seconds in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if reference:
+                print(f"  {stage:<24} {seconds:10.4f} s   baseline {reference:10.4f} s   ({seconds / reference:5.2f}x)")
+            else:
+                print(f"  {stage:<24} {seconds:10.4f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="number of atoms of each synthetic protein")
+    parser.add_argument("--steps", type=float, nargs="+", default=DEFAULT_STEPS, help="grid steps used in detection")
+    parser.add_argument("--repeat", type=int, default=1, help="repetitions of each stage, the best time is kept")
+    parser.add_argument("--nthreads", type=int, default=None, help="number of threads given to pyKVFinder")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown relative to the baseline")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--output", default=None, help="also write this run's timings to a JSON file")
+    args = parser.parse_args(argv)
+
+    # Baselines are machine specific and none is shipped; a comparison run
+    # without one must not pass silently
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print(f"> No baseline at {args.baseline}; run with --update-baseline to create it")
+        return 2
+
+    session = synthetic_session(args.sizes)
+    current = {}
+    for size, structure in zip(args.sizes, session.models):
+        print(f"> Benchmarking {structure.name} ({len(structure.atoms)} atoms)")
+        current[str(size)] = benchmark_structure(structure, args.steps, repeat=args.repeat, nthreads=args.nthreads)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pyKVFinder": getattr(pyKVFinder, "__version__", "unknown"),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+        },
+        "timings": current,
+    }
+
+    baseline = {}
+    if not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["timings"]
+
+    _print_table(current, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n> Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(current, baseline, args.threshold, args.min_seconds)
+    if regressions:
+        print(f"\n> {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for size, stage, reference, seconds in regressions:
+            print(f"  {size} atoms, {stage}: {reference:.4f} s -> {seconds:.4f} s")
+        return 1
+
+    print("\n> No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
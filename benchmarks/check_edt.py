@@ -0,0 +1,74 @@
+"""Agreement check of the distance transform engine with pyKVFinder.detect.
+
+Runs `edt.compare_with_detect` on synthetic proteins over a grid of Probe
+Out and removal distance values, the parameters varied by parameter
+sweeps, in both surface modes:
+
+    python benchmarks/check_edt.py
+    python benchmarks/check_edt.py --sizes 3000 --probe-out 4.0 --removal-distance 1.5 2.4
+
+Exits with status 1 if any combination finds a different number of
+cavities or cavity points with a Jaccard index below the threshold.
+"""
+
+import argparse
+import os
+import sys
+
+import pyKVFinder
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _bundle import load  # noqa: E402
+from synthetic import synthetic_session  # noqa: E402
+
+pipeline = load("pipeline")
+edt = load("edt")
+
+DEFAULT_SIZES = [3000, 8000]
+DEFAULT_PROBE_OUT = [3.0, 4.0, 6.0, 8.0]
+DEFAULT_REMOVAL_DISTANCE = [0.0, 0.6, 1.0, 1.3, 1.5, 2.0, 2.4, 3.0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="number of atoms of each synthetic protein")
+    parser.add_argument("--step", type=float, default=0.6, help="grid step")
+    parser.add_argument("--probe-in", type=float, default=1.4, help="Probe In size")
+    parser.add_argument("--probe-out", type=float, nargs="+", default=DEFAULT_PROBE_OUT, help="Probe Out sizes")
+    parser.add_argument("--removal-distance", type=float, nargs="+", default=DEFAULT_REMOVAL_DISTANCE, help="removal distances")
+    parser.add_argument("--surface", nargs="+", default=["SES", "SAS"], choices=["SES", "SAS"], help="surface modes")
+    parser.add_argument("--min-jaccard", type=float, default=0.99, help="lowest accepted Jaccard index of cavity points")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    session = synthetic_session(args.sizes)
+    for size, structure in zip(args.sizes, session.models):
+        atomic, _ = pipeline.atomic_from_atoms(structure.atoms)
+        print(f"\n{size} atoms")
+        print(f"  {'surface':<8}{'probe_out':>10}{'removal':>9}{'edt':>6}{'detect':>8}{'jaccard':>9}")
+        for surface in args.surface:
+            for probe_out in args.probe_out:
+                vertices = pyKVFinder.get_vertices(atomic, probe_out=probe_out, step=args.step)
+                for removal_distance in args.removal_distance:
+                    result = edt.compare_with_detect(
+                        atomic, vertices, step=args.step, probe_in=args.probe_in, probe_out=probe_out,
+                        removal_distance=removal_distance, surface=surface,
+                    )
+                    ok = result["edt_ncavs"] == result["detect_ncavs"] and result["jaccard"] >= args.min_jaccard
+                    failures += not ok
+                    print(
+                        f"  {surface:<8}{probe_out:>10.2f}{removal_distance:>9.2f}{result['edt_ncavs']:>6}"
+                        f"{result['detect_ncavs']:>8}{result['jaccard']:>9.3f}{'' if ok else '   MISMATCH'}",
+                        flush=True,
+                    )
+
+    if failures:
+        print(f"\n> {failures} combination(s) disagree with pyKVFinder.detect")
+        return 1
+    print("\n> The distance transform engine agrees with pyKVFinder.detect")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Lightweight stand-ins for the parts of ChimeraX used by the KVFinder tool.
+
+`install` registers ``chimerax.*`` modules in ``sys.modules`` so that the
+tool module can be imported and driven in a plain interpreter.  Models are
+kept in a `StubSession`; commands sent through ``run`` are recorded instead
+of being executed, so the harness measures the tool's own cost plus the
+number of commands it issues.
+
+Only use this from benchmark scripts: it must never be imported inside a
+real ChimeraX session.
+"""
+
+import sys
+import types
+
+import numpy as np
+
+
+class StubResidues(object):
+
+    def __init__(self, names, numbers, chain_ids):
+        self.names = names
+        self.numbers = numbers
+        self.chain_ids = chain_ids
+
+    def __len__(self):
+        return len(self.names)
+
+
+class StubAtoms(object):
+    """Numpy-backed stand-in for ``chimerax.atomic.Atoms``."""
+
+    def __init__(self, names, element_names, coords, residue_names, residue_numbers, chain_ids, bfactors=None, occupancies=None):
+        n = len(names)
+        self.names = np.asarray(names)
+        self.element_names = np.asarray(element_names)
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(n, 3)
+        self.residues = StubResidues(np.asarray(residue_names), np.asarray(residue_numbers), np.asarray(chain_ids))
+        self.bfactors = np.zeros(n, dtype=np.float32) if bfactors is None else np.asarray(bfactors, dtype=np.float32)
+        self.occupancies = np.ones(n, dtype=np.float32) if occupancies is None else np.asarray(occupancies, dtype=np.float32)
+        # Subsets from `filter` write colors and displays through to these arrays
+        self._colors = np.full((n, 4), 255, dtype=np.uint8)
+        self._displays = np.ones(n, dtype=bool)
+        self._index = np.arange(n)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def colors(self):
+        return self._colors[self._index]
+
+    @colors.setter
+    def colors(self, value):
+        self._colors[self._index] = value
+
+    @property
+    def displays(self):
+        return self._displays[self._index]
+
+    @displays.setter
+    def displays(self, value):
+        self._displays[self._index] = value
+
+    def filter(self, mask_or_indices):
+        atoms = StubAtoms.__new__(StubAtoms)
+        atoms.names = self.names[mask_or_indices]
+        atoms.element_names = self.element_names[mask_or_indices]
+        atoms.coords = self.coords[mask_or_indices]
+        atoms.residues = StubResidues(
+            self.residues.names[mask_or_indices],
+            self.residues.numbers[mask_or_indices],
+            self.residues.chain_ids[mask_or_indices],
+        )
+        atoms.bfactors = self.bfactors[mask_or_indices]
+        atoms.occupancies = self.occupancies[mask_or_indices]
+        atoms._colors = self._colors
+        atoms._displays = self._displays
+        atoms._index = self._index[mask_or_indices]
+        return atoms
+
+    @staticmethod
+    def empty():
+        return StubAtoms([], [], np.zeros((0, 3)), [], [], [])
+
+
+# Names of the model triggers of ``chimerax.core.models``
+ADD_MODELS = "add models"
+REMOVE_MODELS = "remove models"
+
+
+class StubModel(object):
+    """Stand-in for a ChimeraX model or atomic structure."""
+
+    def __init__(self, session, name, atoms=None):
+        self.session = session
+        self.name = name
+        self.atoms = atoms if atoms is not None else StubAtoms.empty()
+        self.id = None
+        self.display = True
+        self.deleted = False
+
+    @property
+    def atomspec(self):
+        return "#" + ".".join(str(i) for i in self.id)
+
+    def delete(self):
+        self.session.models.remove([self])
+        self.deleted = True
+
+
+class StubModels(object):
+    """Stand-in for the session model manager."""
+
+    def __init__(self, session):
+        self.session = session
+        self._models = []
+        self._next_id = 1
+
+    def __iter__(self):
+        return iter(list(self._models))
+
+    def __len__(self):
+        return len(self._models)
+
+    def add(self, models):
+        for model in models:
+            if model.id is None:
+                model.id = (self._next_id,)
+                self._next_id += 1
+            self._models.append(model)
+        self.session.triggers.fire(ADD_MODELS, list(models))
+
+    def remove(self, models):
+        removed = [model for model in models if model in self._models]
+        for model in removed:
+            self._models.remove(model)
+        self.session.triggers.fire(REMOVE_MODELS, removed)
+
+    def list(self):
+        return list(self._models)
+
+
+class StubLogger(object):
+
+    def __init__(self):
+        self.messages = []
+
+    def info(self, text):
+        self.messages.append(text)
+
+    warning = error = status = info
+
+
+class StubTriggers(object):
+    """Stand-in for a ChimeraX trigger set; `fire` calls the handlers of a trigger."""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def add_handler(self, name, func):
+        handler = (name, func)
+        self.handlers.setdefault(name, []).append(handler)
+        return handler
+
+    def remove_handler(self, handler):
+        self.handlers.get(handler[0], []).remove(handler)
+
+    def fire(self, name, data=None):
+        for _, func in list(self.handlers.get(name, [])):
+            func(name, data)
+
+
+class StubPlace(object):
+    """Stand-in for a camera position; `matrix` is its 3x4 transform."""
+
+    def __init__(self):
+        self.matrix = np.eye(3, 4)
+
+
+class StubSession(object):
+    """Stand-in for ``chimerax.core.session.Session``."""
+
+    def __init__(self):
+        self.models = StubModels(self)
+        self.logger = StubLogger()
+        self.triggers = StubTriggers()
+        self.main_view = types.SimpleNamespace(camera=types.SimpleNamespace(position=StubPlace()))
+        self.commands = []
+
+
+def read_pdb_atoms(fname):
+    """Parse the ATOM/HETATM records of a PDB file into `StubAtoms`."""
+    names, elements, coords, resnames, resnums, chains, bfactors, occupancies = [], [], [], [], [], [], [], []
+    with open(fname) as f:
+        for line in f:
+            if not line.startswith(("ATOM", "HETATM")):
+                continue
+            names.append(line[12:16].strip())
+            resnames.append(line[17:20].strip())
+            chains.append(line[21:22].strip())
+            resnums.append(int(line[22:26]))
+            coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+            occupancies.append(float(line[54:60] or 1.0))
+            bfactors.append(float(line[60:66] or 0.0))
+            elements.append(line[76:78].strip() or names[-1][0])
+    return StubAtoms(names, elements, np.array(coords).reshape(-1, 3), resnames, resnums, chains, bfactors, occupancies)
+
+
+def install(session):
+    """Register stub ``chimerax`` modules bound to ``session``.
+
+    Returns
+    -------
+    types.ModuleType
+        The stub ``chimerax`` package.
+    """
+
+    def module(name, **attrs):
+        m = types.ModuleType(name)
+        m.__dict__.update(attrs)
+        sys.modules[name] = m
+        return m
+
+    def all_objects(session):
+        return types.SimpleNamespace(models=session.models.list())
+
+    class _Structures(list):
+        @property
+        def names(self):
+            return np.array([m.name for m in self], dtype=str)
+
+    def all_atomic_structures(session):
+        return _Structures(m for m in session.models if isinstance(m, StubModel))
+
+    def selected_atoms(session):
+        return StubAtoms.empty()
+
+    def run(session, command, **kw):
+        session.commands.append(command)
+
+    def open_pdb(session, fname, **kw):
+        import os
+        model = StubModel(session, os.path.basename(fname), read_pdb_atoms(fname))
+        return [model], f"Opened {fname}"
+
+    def save_pdb(session, fname, models=None, **kw):
+        with open(fname, "w") as f:
+            f.write("END\n")
+
+    def _show_surface(session, **kw):
+        model = StubModel(session, kw.get("shape_name", "shape"))
+        session.models.add([model])
+        return model
+
+    class ToolInstance(object):
+        def __init__(self, session, tool_name):
+            self.session = session
+            self.tool_name = tool_name
+
+        def delete(self):
+            pass
+
+    chimerax = module("chimerax")
+    chimerax.__path__ = []
+    module("chimerax.core", __path__=[])
+    module("chimerax.core.models", ADD_MODELS=ADD_MODELS, REMOVE_MODELS=REMOVE_MODELS, Model=StubModel)
+    module("chimerax.core.objects", all_objects=all_objects)
+    module("chimerax.core.tools", ToolInstance=ToolInstance)
+    module("chimerax.core.commands", run=run)
+    module("chimerax.core.toolshed", BundleAPI=object)
+    module(
+        "chimerax.atomic", __path__=[],
+        StructureSeq=object, Structure=StubModel, AtomicStructure=StubModel,
+        selected_atoms=selected_atoms, all_atoms=lambda session: StubAtoms.empty(),
+        structure_atoms=lambda structures: StubAtoms.empty(),
+        all_atomic_structures=all_atomic_structures,
+    )
+    module("chimerax.atomic.structure", AtomicStructure=StubModel)
+    module("chimerax.std_commands", style=None)
+    module("chimerax.pdb", open_pdb=open_pdb, save_pdb=save_pdb)
+    module("chimerax.shape", __path__=[])
+    module("chimerax.shape.shape", _show_surface=_show_surface)
+    return chimerax
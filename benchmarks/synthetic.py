@@ -0,0 +1,127 @@
+"""Synthetic proteins and a stub session for benchmarking outside ChimeraX.
+
+A synthetic protein is a sphere of alanine-like residues on a jittered
+lattice, with spherical pockets carved out of it so that cavity detection
+has something to find.  The atoms are exposed through the same vectorized
+attributes as a ChimeraX ``Atoms`` collection, so the extraction code of
+the bundle runs on them unchanged.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+# Backbone and CB of an alanine, relative to the residue position
+_TEMPLATE_NAMES = np.array(["N", "CA", "C", "O", "CB"])
+_TEMPLATE_ELEMENTS = np.array(["N", "C", "C", "O", "C"])
+_TEMPLATE_OFFSETS = np.array([
+    [-1.2, -0.6, 0.0],
+    [0.0, 0.0, 0.0],
+    [1.2, -0.6, 0.3],
+    [1.4, -1.6, 1.0],
+    [0.0, 1.2, -0.9],
+])
+
+# Volume per residue (A^3) giving roughly the heavy-atom density of a protein
+_RESIDUE_SPACING = 4.5
+_RESIDUES_PER_CHAIN = 9999
+
+
+class SyntheticAtoms(object):
+    """Stand-in for ``chimerax.atomic.Atoms`` holding plain numpy arrays."""
+
+    def __init__(self, coords, names, element_names, residue_numbers, chain_ids, residue_names):
+        self.coords = coords
+        self.names = names
+        self.element_names = element_names
+        self.residues = SimpleNamespace(numbers=residue_numbers, chain_ids=chain_ids, names=residue_names)
+
+    def __len__(self):
+        return len(self.coords)
+
+
+class StubStructure(object):
+    """Stand-in for ``chimerax.atomic.AtomicStructure``."""
+
+    def __init__(self, name, atoms):
+        self.name = name
+        self.atoms = atoms
+
+
+class StubSession(object):
+    """Stand-in for the ChimeraX session, holding a list of structures."""
+
+    def __init__(self, structures=()):
+        self.models = list(structures)
+
+    def structure(self, name):
+        for model in self.models:
+            if model.name == name:
+                return model
+        raise KeyError(name)
+
+
+def synthetic_atoms(natoms, seed=0):
+    """Create a synthetic protein with about ``natoms`` atoms.
+
+    Parameters
+    ----------
+    natoms : int
+        Target number of atoms. The result is rounded to whole residues.
+    seed : int, optional
+        Seed of the random generator, so runs are reproducible.
+
+    Returns
+    -------
+    SyntheticAtoms
+        The atoms of the synthetic protein.
+    """
+    rng = np.random.default_rng(seed)
+    nres = max(1, natoms // len(_TEMPLATE_NAMES))
+
+    # Sphere radius holding nres lattice sites, with slack for carved pockets
+    radius = (3.0 * nres * _RESIDUE_SPACING ** 3 / (4.0 * np.pi)) ** (1.0 / 3.0) * 1.15
+    n = int(np.ceil(radius / _RESIDUE_SPACING))
+    axis = np.arange(-n, n + 1) * _RESIDUE_SPACING
+    sites = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+    sites = sites[np.linalg.norm(sites, axis=1) <= radius]
+
+    # Carve pockets just below the surface
+    npockets = max(4, nres // 2000)
+    directions = rng.normal(size=(npockets, 3))
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    centers = directions * radius * 0.75
+    pocket_radius = 4.0 + 4.0 * rng.random(npockets)
+    keep = np.ones(len(sites), dtype=bool)
+    for center, r in zip(centers, pocket_radius):
+        keep &= np.linalg.norm(sites - center, axis=1) > r
+    sites = sites[keep]
+
+    # Keep the sites closest to the center to reach the requested size
+    order = np.argsort(np.linalg.norm(sites, axis=1), kind="stable")
+    sites = sites[order[:nres]]
+    sites += rng.normal(scale=0.3, size=sites.shape)
+    nres = len(sites)
+
+    natoms = nres * len(_TEMPLATE_NAMES)
+    coords = (sites[:, None, :] + _TEMPLATE_OFFSETS[None, :, :]).reshape(-1, 3)
+    residue_index = np.repeat(np.arange(nres), len(_TEMPLATE_NAMES))
+    residue_numbers = residue_index % _RESIDUES_PER_CHAIN + 1
+    chain_letters = np.array([chr(ord("A") + i % 26) for i in range(nres // _RESIDUES_PER_CHAIN + 1)])
+    chain_ids = chain_letters[residue_index // _RESIDUES_PER_CHAIN]
+
+    return SyntheticAtoms(
+        coords=coords,
+        names=np.tile(_TEMPLATE_NAMES, nres),
+        element_names=np.tile(_TEMPLATE_ELEMENTS, nres),
+        residue_numbers=residue_numbers,
+        chain_ids=chain_ids,
+        residue_names=np.full(natoms, "ALA"),
+    )
+
+
+def synthetic_session(sizes, seed=0):
+    """Create a stub session holding one synthetic protein per size."""
+    return StubSession(
+        StubStructure(f"synthetic_{size}", synthetic_atoms(size, seed=seed)) for size in sizes
+    )